@@ -0,0 +1,202 @@
+"""Nightly batch scoring of a whole customer file outside the dashboard.
+
+The customer CSV (cleaned schema) is cut into byte ranges of roughly
+``--chunk-rows`` rows at line boundaries. A process pool parses and scores
+the ranges independently, so no process reads more than its own chunks and
+throughput grows with the number of workers. Each chunk gets:
+
+- ``risk_segment`` from the same compiled rules the dashboard uses
+  (``risk_segments.RISK_RULES``);
+- ``score``, the churn probability from a churn model artifact (the newest
+  one in ``models/`` unless ``--model`` is given), empty with ``--no-model``.
+
+Workers write one part per chunk and the parts are appended to the output
+in file order as they complete, as CSV or, for a ``.parquet`` path, as one
+Parquet row group per chunk (needs pyarrow).
+
+Usage:
+    python streamlit/batch_scoring.py score INPUT OUTPUT [--workers N] [--chunk-rows N] [--model PATH]
+    python streamlit/batch_scoring.py benchmark INPUT [--workers N ...]
+"""
+import argparse
+import csv
+import io
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from churn_model import ChurnModel, latest_model_path
+from risk_segments import RISK_RULES, SEGMENTS, compile_rules, rule_columns
+
+DEFAULT_CHUNK_ROWS = 500_000
+OUTPUT_COLUMNS = ['clientnum', 'risk_segment', 'score']
+
+# Per-process scorer, set up once by the pool initializer
+_worker = {}
+
+
+def plan_ranges(path, chunk_rows=DEFAULT_CHUNK_ROWS, sample_lines=1000):
+    """Header names and (start, end) byte ranges of about `chunk_rows` lines each."""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        header = next(csv.reader([f.readline().decode()]))
+        first = f.tell()
+        sample = [len(f.readline()) for _ in range(sample_lines)]
+        line_bytes = max(1, int(np.mean([n for n in sample if n] or [1])))
+        target = chunk_rows * line_bytes
+        bounds = [first]
+        while bounds[-1] + target < size:
+            f.seek(bounds[-1] + target)
+            f.readline()
+            if f.tell() >= size:
+                break
+            bounds.append(f.tell())
+    bounds.append(size)
+    return header, [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def _init_worker(model_path, rules):
+    _worker['evaluate'] = compile_rules(rules)
+    _worker['model'] = ChurnModel.load(model_path) if model_path else None
+
+
+def score_frame(chunk, evaluate, model=None):
+    """(clientnum, risk_segment, score) for one parsed chunk."""
+    return pd.DataFrame({
+        'clientnum': chunk['clientnum'].to_numpy(),
+        'risk_segment': np.asarray(SEGMENTS, dtype=object)[evaluate(chunk)],
+        'score': model.score(chunk) if model is not None else np.full(len(chunk), np.nan, dtype=np.float32),
+    })
+
+
+def _score_range(path, start, end, names, usecols, part_path, columnar):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    chunk = pd.read_csv(io.BytesIO(data), header=None, names=names, usecols=usecols)
+    result = score_frame(chunk, _worker['evaluate'], _worker['model'])
+    if columnar:
+        result.to_parquet(part_path, index=False)
+    else:
+        result.to_csv(part_path, header=False, index=False, float_format='%.6f')
+    return len(result)
+
+
+class _OutputWriter:
+    # Appends finished parts to the output in chunk order
+    def __init__(self, path, columnar):
+        self.columnar = columnar
+        if columnar:
+            try:
+                import pyarrow.parquet as pq
+            except ImportError as error:
+                raise RuntimeError('writing Parquet output needs pyarrow') from error
+            self._pq = pq
+            self._writer = None
+        else:
+            self._file = open(path, 'w', newline='')
+            self._file.write(','.join(OUTPUT_COLUMNS) + '\n')
+        self.path = path
+
+    def append(self, part_path):
+        if self.columnar:
+            table = self._pq.read_table(part_path)
+            if self._writer is None:
+                self._writer = self._pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            with open(part_path) as f:
+                shutil.copyfileobj(f, self._file, 1 << 22)
+        os.remove(part_path)
+
+    def close(self):
+        if self.columnar:
+            if self._writer is not None:
+                self._writer.close()
+        else:
+            self._file.close()
+
+
+def score_file(input_path, output_path, workers=None, chunk_rows=DEFAULT_CHUNK_ROWS,
+               model_path=None, rules=RISK_RULES):
+    """Score every customer in `input_path` into `output_path` and return throughput stats."""
+    start_time = time.perf_counter()
+    names, ranges = plan_ranges(input_path, chunk_rows)
+    needed = {'clientnum', *rule_columns(rules)}
+    if model_path:
+        model = ChurnModel.load(model_path)
+        needed |= {column for _, column in model.transforms} | set(model.levels)
+    usecols = [name for name in names if name in needed]
+    columnar = output_path.endswith('.parquet')
+    workers = workers or os.cpu_count()
+
+    rows = 0
+    writer = _OutputWriter(output_path, columnar)
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output_path))) as parts_dir:
+        parts = [os.path.join(parts_dir, f'part-{i:05d}') for i in range(len(ranges))]
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(model_path, rules)) as pool:
+                futures = [
+                    pool.submit(_score_range, input_path, start, end, names, usecols, part, columnar)
+                    for (start, end), part in zip(ranges, parts)
+                ]
+                # Parts are appended in file order while later chunks are still being scored
+                for future, part in zip(futures, parts):
+                    rows += future.result()
+                    writer.append(part)
+        finally:
+            writer.close()
+    seconds = time.perf_counter() - start_time
+    return {
+        'rows': rows,
+        'chunks': len(ranges),
+        'workers': workers,
+        'seconds': round(seconds, 3),
+        'rows_per_second': round(rows / seconds),
+        'rows_per_second_per_worker': round(rows / seconds / workers),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['score', 'benchmark'])
+    parser.add_argument('input', help='customer CSV in the cleaned schema')
+    parser.add_argument('output', nargs='?', help='.csv or .parquet file to write')
+    parser.add_argument('--workers', type=int, nargs='+', help='worker processes (benchmark: one run per count)')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help='rows per chunk')
+    parser.add_argument('--model', help='churn model artifact (default: newest in models/)')
+    parser.add_argument('--no-model', action='store_true', help='write risk segments only')
+    args = parser.parse_args(argv)
+
+    model_path = None if args.no_model else (args.model or latest_model_path())
+    if args.command == 'score':
+        if not args.output:
+            parser.error('score needs an output path')
+        workers = args.workers[0] if args.workers else None
+        stats = score_file(args.input, args.output, workers, args.chunk_rows, model_path)
+        print(
+            f"Scored {stats['rows']:,} rows in {stats['seconds']:.1f}s with {stats['workers']} workers: "
+            f"{stats['rows_per_second']:,} rows/s, {stats['rows_per_second_per_worker']:,} rows/s per worker"
+        )
+    else:
+        counts = args.workers or sorted({1, 2, os.cpu_count()})
+        with tempfile.TemporaryDirectory() as tmp:
+            baseline = None
+            for workers in counts:
+                stats = score_file(args.input, os.path.join(tmp, 'scores.csv'), workers, args.chunk_rows, model_path)
+                baseline = baseline or stats['rows_per_second']
+                print(
+                    f"{workers:>3} workers: {stats['rows_per_second']:>10,} rows/s "
+                    f"({stats['rows_per_second_per_worker']:,} per worker, "
+                    f"{stats['rows_per_second'] / baseline:.2f}x of {counts[0]} worker)"
+                )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Server-side box plot summaries for the Behavioral Patterns tab.
+
+``px.box`` ships every value of the column to the browser, which then computes
+the quartiles itself. Here the quartiles, whiskers and a capped sample of
+outliers are computed per churn group in NumPy and drawn as precomputed
+boxes, so the figure payload no longer grows with the segment size.
+"""
+import numpy as np
+import plotly.graph_objects as go
+from plotly.colors import qualitative
+
+MAX_OUTLIERS = 100
+
+
+def summarize_groups(values, groups, max_outliers=MAX_OUTLIERS, seed=0):
+    """Quartiles, 1.5 IQR whiskers and sampled outliers of `values` per group.
+
+    Returns one dict per distinct group value, in sorted order. Outliers are
+    de-duplicated (identical points overlap on the chart) and at most
+    `max_outliers` of them are kept, sampled with a fixed seed.
+    """
+    rng = np.random.default_rng(seed)
+    order = np.lexsort((values, groups))
+    sorted_values = values[order]
+    group_values, starts = np.unique(groups[order], return_index=True)
+    ends = np.append(starts[1:], len(order))
+
+    summaries = []
+    for group, start, end in zip(group_values, starts, ends):
+        group_sorted = sorted_values[start:end]
+        q1, median, q3 = np.percentile(group_sorted, [25, 50, 75])
+        iqr = q3 - q1
+        # Whiskers stop at the most extreme points within 1.5 IQR of the box
+        low_pos = np.searchsorted(group_sorted, q1 - 1.5 * iqr, side='left')
+        high_pos = np.searchsorted(group_sorted, q3 + 1.5 * iqr, side='right') - 1
+        outliers = np.unique(np.concatenate([group_sorted[:low_pos], group_sorted[high_pos + 1:]]))
+        if len(outliers) > max_outliers:
+            outliers = np.sort(rng.choice(outliers, size=max_outliers, replace=False))
+        summaries.append({
+            'group': group.item(),
+            'count': int(end - start),
+            'q1': float(q1),
+            'median': float(median),
+            'q3': float(q3),
+            'lowerfence': float(group_sorted[low_pos]),
+            'upperfence': float(group_sorted[high_pos]),
+            'outliers': outliers.tolist(),
+        })
+    return summaries
+
+
+def _weighted_percentiles(values, counts, percentiles):
+    # np.percentile's linear interpolation over the expanded (value, count) data
+    cumulative = np.cumsum(counts)
+    positions = np.asarray(percentiles) / 100 * (cumulative[-1] - 1)
+    below = values[np.searchsorted(cumulative, np.floor(positions), side='right')]
+    above = values[np.searchsorted(cumulative, np.ceil(positions), side='right')]
+    return below + (above - below) * (positions - np.floor(positions))
+
+
+def summarize_counts(group, values, counts, max_outliers=MAX_OUTLIERS, seed=0):
+    """Box summary of one group given sorted distinct `values` and their `counts`.
+
+    Produces the same fields as ``summarize_groups`` from a histogram, such as
+    the value sketches kept by the streaming aggregation mode.
+    """
+    rng = np.random.default_rng(seed)
+    q1, median, q3 = _weighted_percentiles(values, counts, [25, 50, 75])
+    iqr = q3 - q1
+    low_pos = np.searchsorted(values, q1 - 1.5 * iqr, side='left')
+    high_pos = np.searchsorted(values, q3 + 1.5 * iqr, side='right') - 1
+    outliers = np.concatenate([values[:low_pos], values[high_pos + 1:]])
+    if len(outliers) > max_outliers:
+        outliers = np.sort(rng.choice(outliers, size=max_outliers, replace=False))
+    return {
+        'group': group,
+        'count': int(counts.sum()),
+        'q1': float(q1),
+        'median': float(median),
+        'q3': float(q3),
+        'lowerfence': float(values[low_pos]),
+        'upperfence': float(values[high_pos]),
+        'outliers': outliers.tolist(),
+    }
+
+
+def summary_box_figure(summaries, column, title, group_label='churn'):
+    """Draw precomputed boxes laid out like ``px.box(x=group_label, y=column, color=group_label)``."""
+    fig = go.Figure()
+    colors = qualitative.Plotly
+    for i, summary in enumerate(summaries):
+        color = colors[i % len(colors)]
+        name = str(summary['group'])
+        fig.add_trace(go.Box(
+            x=[summary['group']],
+            q1=[summary['q1']],
+            median=[summary['median']],
+            q3=[summary['q3']],
+            lowerfence=[summary['lowerfence']],
+            upperfence=[summary['upperfence']],
+            name=name,
+            legendgroup=name,
+            marker_color=color,
+            boxpoints=False,
+        ))
+        if summary['outliers']:
+            fig.add_trace(go.Scatter(
+                x=[summary['group']] * len(summary['outliers']),
+                y=summary['outliers'],
+                mode='markers',
+                name=name,
+                legendgroup=name,
+                showlegend=False,
+                marker=dict(color=color, size=4),
+                hovertemplate=f'{column}=%{{y}}<extra>{group_label}={name}</extra>',
+            ))
+    fig.update_layout(
+        title=title,
+        xaxis_title=group_label,
+        yaxis_title=column,
+        legend_title_text=group_label,
+        boxmode='overlay',
+    )
+    return fig
@@ -0,0 +1,248 @@
+"""Pre-aggregated churn cube behind the header metrics and the Churn Overview
+and Demographic Analysis tabs.
+
+The cube covers the cross-product of the low-cardinality dimensions (the
+sidebar filter columns, education level and age) and holds the row count,
+churn sum, age sum and utilization sum of every non-empty cell. A sidebar
+filter state becomes a slice-and-sum over those cells, whose number is bounded
+by the dimension cardinalities rather than by the number of customers.
+
+Usage:
+    python streamlit/churn_cube.py        # parity check against pandas
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+DIMS = ['income_category', 'education_level', 'marital_status', 'utilization_cat', 'card_category', 'age']
+MEASURES = ['count', 'churn', 'age', 'avg_utilization_ratio']
+# Chart dimension answered through the age axis
+AGE_BRACKET = 'age_bracket'
+
+
+def _axis_codes(domain, series):
+    # Positions of `series` values in `domain`, with -1 for missing values
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        lookup = pd.Index(domain).get_indexer(series.cat.categories)
+        codes = series.cat.codes.to_numpy()
+        return np.where(codes >= 0, lookup[codes], -1)
+    return pd.Index(domain).get_indexer(series.to_numpy())
+
+
+class ChurnCube:
+    """Measure sums (count, churn, age, utilization by default) for every non-empty cell.
+
+    ``keys`` holds one row of domain positions per cell (-1 for a missing
+    value) and ``sums`` the matching measure totals. Domains only ever grow by
+    appending, so existing keys stay valid when new values arrive. The first
+    measure is always the row count.
+    """
+
+    def __init__(self, dims=DIMS, measures=MEASURES):
+        self.dims = list(dims)
+        self.measures = list(measures)
+        self.domains = {dim: [] for dim in self.dims}
+        self.keys = np.empty((0, len(self.dims)), dtype=np.int32)
+        self.sums = np.empty((0, len(self.measures)))
+        self.age_brackets = {}
+
+    @classmethod
+    def from_frame(cls, df, dims=DIMS, measures=MEASURES):
+        cube = cls(dims, measures)
+        cube.add_frame(df)
+        return cube
+
+    def copy(self):
+        """Independent copy; folding rows into it leaves this cube unchanged."""
+        cube = ChurnCube(self.dims, self.measures)
+        cube.domains = {dim: list(values) for dim, values in self.domains.items()}
+        cube.keys = self.keys
+        cube.sums = self.sums
+        cube.age_brackets = dict(self.age_brackets)
+        return cube
+
+    def extended(self, df):
+        """Copy of the cube with the rows of `df` folded in."""
+        cube = self.copy()
+        cube.add_frame(df)
+        return cube
+
+    def _extend_domains(self, df):
+        for dim in self.dims:
+            seen = set(self.domains[dim])
+            new_values = [v for v in pd.unique(df[dim].dropna()) if v not in seen]
+            self.domains[dim].extend(sorted(new_values))
+
+    def _extend_age_brackets(self, df):
+        pairs = df[['age', AGE_BRACKET]].drop_duplicates()
+        for age, bracket in zip(pairs['age'], pairs[AGE_BRACKET]):
+            bracket = None if pd.isna(bracket) else bracket
+            if self.age_brackets.setdefault(age, bracket) != bracket:
+                raise ValueError(f'age {age} maps to more than one {AGE_BRACKET}')
+
+    def add_frame(self, df):
+        """Fold the rows of `df` into the cube, growing domains for unseen values."""
+        self._extend_domains(df)
+        self._extend_age_brackets(df)
+        keys = np.column_stack([_axis_codes(self.domains[dim], df[dim]) for dim in self.dims])
+        sums = np.column_stack(
+            [np.ones(len(df))] + [df[measure].to_numpy(dtype=np.float64) for measure in self.measures[1:]]
+        )
+
+        # Merge with the existing cells through one mixed-radix key per cell;
+        # missing values take the extra slot at the end of each axis
+        shape = tuple(len(self.domains[dim]) + 1 for dim in self.dims)
+        all_keys = np.concatenate([self.keys, keys])
+        flat = np.ravel_multi_index(tuple(np.where(all_keys < 0, np.array(shape) - 1, all_keys).T), shape)
+        cells, first, inverse = np.unique(flat, return_index=True, return_inverse=True)
+        all_sums = np.concatenate([self.sums, sums])
+        self.keys = all_keys[first].astype(np.int32)
+        self.sums = np.column_stack([
+            np.bincount(inverse, weights=all_sums[:, j], minlength=len(cells)) for j in range(len(self.measures))
+        ])
+
+    @property
+    def n_cells(self):
+        return len(self.keys)
+
+    @property
+    def totals(self):
+        """Measure sums over every row folded into the cube."""
+        return self.sums.sum(axis=0)
+
+    def slice(self, age_range, filters):
+        """Keep only the cells matching a sidebar filter state.
+
+        `age_range` is the inclusive (low, high) age bound and `filters` maps
+        dimensions to their selected values; missing values are never
+        selected by a filtered dimension, matching ``Series.isin``.
+        """
+        keep = np.ones(self.n_cells, dtype=bool)
+        for axis, dim in enumerate(self.dims):
+            domain = self.domains[dim]
+            if dim == 'age':
+                values = np.asarray(domain)
+                allowed = (values >= age_range[0]) & (values <= age_range[1])
+            elif dim in filters:
+                selected = set(filters[dim])
+                allowed = np.array([v in selected for v in domain], dtype=bool)
+            else:
+                continue
+            # Trailing False covers the -1 (missing) position
+            keep &= np.append(allowed, False)[self.keys[:, axis]]
+        return CubeSlice(self, self.keys[keep], self.sums[keep])
+
+
+class CubeSlice:
+    """The cells of a ChurnCube left after applying a filter state."""
+
+    def __init__(self, cube, keys, sums):
+        self.cube = cube
+        self.keys = keys
+        self.sums = sums
+        self.totals = sums.sum(axis=0)
+
+    @property
+    def count(self):
+        return int(self.totals[0])
+
+    def mean(self, measure):
+        """Mean of `measure` over the filtered rows, NaN when nothing matches."""
+        if self.count == 0:
+            return np.nan
+        return self.totals[self.cube.measures.index(measure)] / self.count
+
+    def group_mean(self, dim, measure='churn'):
+        """Equivalent of ``filtered_df.groupby(dim)[measure].mean().reset_index()``."""
+        summary = self.group_summary(dim, [measure])
+        return summary[measure].reset_index()
+
+    def group_summary(self, dim, measures):
+        """Row count and mean of each of `measures` per value of `dim`.
+
+        Returns a DataFrame indexed by the observed `dim` values in sorted order,
+        with a ``count`` column followed by one column per measure.
+        """
+        if dim == AGE_BRACKET:
+            ages = self.cube.domains['age']
+            labels = sorted({b for b in self.cube.age_brackets.values() if b is not None})
+            bracket_of_age = np.array(
+                [labels.index(b) if b is not None else -1 for b in map(self.cube.age_brackets.get, ages)] + [-1]
+            )
+            codes = bracket_of_age[self.keys[:, self.cube.dims.index('age')]]
+        else:
+            labels = self.cube.domains[dim]
+            codes = self.keys[:, self.cube.dims.index(dim)]
+        observed = codes >= 0
+        codes = codes[observed]
+        counts = np.bincount(codes, weights=self.sums[observed, 0], minlength=len(labels))
+        order = [i for i in np.argsort(np.array(labels, dtype=object), kind='stable') if counts[i] > 0]
+        summary = pd.DataFrame(
+            {'count': counts[order].astype(np.int64)},
+            index=pd.Index([labels[i] for i in order], name=dim),
+        )
+        for measure in measures:
+            totals = np.bincount(
+                codes, weights=self.sums[observed, self.cube.measures.index(measure)], minlength=len(labels)
+            )
+            summary[measure] = totals[order] / counts[order]
+        return summary
+
+
+def check_parity(df, cube, age_range, filters):
+    """Compare a cube slice with the pandas results the dashboard used to compute.
+
+    Returns a list of mismatch descriptions, empty when everything agrees.
+    """
+    mask = df['age'].between(*age_range)
+    for dim, values in filters.items():
+        mask &= df[dim].isin(values)
+    filtered_df = df[mask]
+    cube_slice = cube.slice(age_range, filters)
+
+    problems = []
+    if cube_slice.count != len(filtered_df):
+        problems.append(f'count {cube_slice.count} != {len(filtered_df)}')
+    for measure in MEASURES[1:]:
+        expected = filtered_df[measure].mean()
+        if not np.isclose(cube_slice.mean(measure), expected, equal_nan=True):
+            problems.append(f'mean {measure} {cube_slice.mean(measure)} != {expected}')
+    for dim in ['income_category', AGE_BRACKET, 'education_level', 'marital_status']:
+        expected = filtered_df.groupby(dim, observed=True)['churn'].mean().reset_index()
+        actual = cube_slice.group_mean(dim)
+        same_groups = [str(v) for v in actual[dim]] == [str(v) for v in expected[dim]]
+        if not same_groups or not np.allclose(actual['churn'], expected['churn']):
+            problems.append(f'churn by {dim} differs')
+    return problems
+
+
+def main(argv=None):
+    import data_snapshot
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--states', type=int, default=200, help='number of random filter states to check')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    df = data_snapshot.load_customers()
+    cube = ChurnCube.from_frame(df)
+    rng = np.random.default_rng(args.seed)
+    filter_dims = ['income_category', 'marital_status', 'utilization_cat', 'card_category']
+    failures = 0
+    for _ in range(args.states):
+        low, high = sorted(rng.integers(df['age'].min(), df['age'].max() + 1, size=2))
+        filters = {
+            dim: [v for v in df[dim].cat.categories if rng.random() < 0.75] for dim in filter_dims
+        }
+        problems = check_parity(df, cube, (low, high), filters)
+        if problems:
+            failures += 1
+            print(f'age {low}-{high}, {filters}: ' + '; '.join(problems))
+    print(f'{args.states - failures}/{args.states} filter states match pandas '
+          f'({cube.n_cells:,} cells for {len(df):,} rows)')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,243 @@
+"""Churn probability model: training entry point and NumPy scorer.
+
+Training fits a regularized logistic regression with scikit-learn on the
+cleaned table. The features are the numeric columns, a few log and squared
+transforms, and one indicator per level of the categorical columns. The fit
+is exported as a small JSON artifact holding the intercept, one coefficient
+per numeric feature (with the standardization folded in) and one weight per
+categorical level. Artifacts are versioned as ``models/churn_model_v<N>.json``
+with hold-out metrics and the hash of the training data.
+
+Scoring needs neither scikit-learn nor pickle: ``ChurnModel.score`` computes
+the logit for a whole table in one pass of NumPy arithmetic plus one weight
+lookup per categorical column, so loading is a JSON read and scoring the
+full table takes milliseconds.
+
+Usage:
+    python streamlit/churn_model.py train [--csv PATH] [--model-dir DIR]
+    python streamlit/churn_model.py evaluate [--model PATH] [--csv PATH]
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_snapshot import CLEANED_CSV, file_sha256, read_csv_frame
+
+MODEL_DIR = 'models'
+ARTIFACT_FORMAT = 1
+NUMERIC_FEATURES = [
+    'age',
+    'dependencies',
+    'months_on_book',
+    'no_of_products',
+    'months_inactive_12_mon',
+    'contacts_count_12_mon',
+    'credit_limit',
+    'total_revolving_bal',
+    'total_trans_amt',
+    'total_trans_ct',
+    'avg_utilization_ratio',
+]
+# Transforms for the columns whose effect on churn is far from linear
+LOG_FEATURES = ['total_trans_amt', 'credit_limit']
+SQUARED_FEATURES = ['total_trans_ct', 'total_revolving_bal']
+CATEGORICAL_FEATURES = ['gender', 'education_level', 'marital_status', 'income_category', 'card_category']
+HOLDOUT_FRACTION = 0.25
+
+
+def _numeric_matrix(data, transforms):
+    # One float64 column per (kind, column) transform
+    columns = []
+    for kind, column in transforms:
+        values = np.asarray(data[column], dtype=np.float64)
+        if kind == 'log':
+            values = np.log1p(values)
+        elif kind == 'square':
+            values = values * values
+        columns.append(values)
+    return np.column_stack(columns)
+
+
+def _level_codes(values, levels):
+    # Index into `levels` per value, -1 for values the model has not seen
+    if isinstance(values, pd.Series):
+        values = values.array
+    if isinstance(values, pd.Categorical):
+        lookup = np.array([levels.index(c) if c in levels else -1 for c in values.categories] + [-1])
+        return lookup[values.codes]
+    return pd.Categorical(np.asarray(values), categories=levels).codes
+
+
+def _transforms():
+    return (
+        [('identity', column) for column in NUMERIC_FEATURES]
+        + [('log', column) for column in LOG_FEATURES]
+        + [('square', column) for column in SQUARED_FEATURES]
+    )
+
+
+class ChurnModel:
+    """Logistic churn model loaded from a JSON artifact."""
+
+    def __init__(self, artifact):
+        self.artifact = artifact
+        self.version = artifact['version']
+        self.transforms = [tuple(t) for t in artifact['numeric']['transforms']]
+        self.coefficients = np.asarray(artifact['numeric']['coefficients'])
+        self.intercept = artifact['intercept']
+        self.levels = {column: entry['levels'] for column, entry in artifact['categorical'].items()}
+        # A trailing zero weight serves values the model has not seen (code -1)
+        self.level_weights = {
+            column: np.append(np.asarray(entry['weights']), 0.0)
+            for column, entry in artifact['categorical'].items()
+        }
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            artifact = json.load(f)
+        if artifact.get('format') != ARTIFACT_FORMAT:
+            raise ValueError(f'{path} is not a format {ARTIFACT_FORMAT} churn model artifact')
+        return cls(artifact)
+
+    def logit(self, data):
+        """Log-odds of churn per row of `data` (a DataFrame or dict of arrays)."""
+        logit = _numeric_matrix(data, self.transforms) @ self.coefficients + self.intercept
+        for column, levels in self.levels.items():
+            logit += self.level_weights[column][_level_codes(data[column], levels)]
+        return logit
+
+    def score(self, data):
+        """Churn probability per row of `data`, as float32."""
+        return (1.0 / (1.0 + np.exp(-self.logit(data)))).astype(np.float32)
+
+
+def fit_artifact(df, churn, c=1.0):
+    """Fit a logistic regression on `df` and return its artifact dict."""
+    from sklearn.linear_model import LogisticRegression
+
+    transforms = _transforms()
+    numeric = _numeric_matrix(df, transforms)
+    mean = numeric.mean(axis=0)
+    scale = numeric.std(axis=0)
+    scale[scale == 0] = 1.0
+    levels = {column: sorted(pd.unique(np.asarray(df[column], dtype=object)).tolist())
+              for column in CATEGORICAL_FEATURES}
+    indicators = [
+        (_level_codes(df[column], levels[column])[:, None] == np.arange(len(levels[column]))).astype(np.float64)
+        for column in CATEGORICAL_FEATURES
+    ]
+    design = np.column_stack([(numeric - mean) / scale] + indicators)
+    fit = LogisticRegression(C=c, max_iter=5000).fit(design, churn)
+
+    weights = fit.coef_[0]
+    numeric_weights = weights[:len(transforms)] / scale
+    categorical = {}
+    offset = len(transforms)
+    for column in CATEGORICAL_FEATURES:
+        n = len(levels[column])
+        categorical[column] = {'levels': levels[column], 'weights': weights[offset:offset + n].tolist()}
+        offset += n
+    return {
+        'format': ARTIFACT_FORMAT,
+        'intercept': float(fit.intercept_[0] - numeric_weights @ mean),
+        'numeric': {'transforms': transforms, 'coefficients': numeric_weights.tolist()},
+        'categorical': categorical,
+    }
+
+
+def evaluate(model, df, churn):
+    """ROC AUC, log loss and Brier score of `model` on a labelled table."""
+    probability = model.score(df).astype(np.float64)
+    order = np.argsort(probability, kind='stable')
+    ranks = np.empty(len(order))
+    ranks[order] = np.arange(1, len(order) + 1)
+    positives = churn.sum()
+    auc = (ranks[churn == 1].sum() - positives * (positives + 1) / 2) / (positives * (len(churn) - positives))
+    clipped = np.clip(probability, 1e-7, 1 - 1e-7)
+    return {
+        'roc_auc': round(float(auc), 4),
+        'log_loss': round(float(-np.mean(churn * np.log(clipped) + (1 - churn) * np.log(1 - clipped))), 4),
+        'brier': round(float(np.mean((probability - churn) ** 2)), 4),
+        'observed_rate': round(float(churn.mean()), 4),
+        'mean_probability': round(float(probability.mean()), 4),
+    }
+
+
+def model_versions(model_dir=MODEL_DIR):
+    """Artifact paths in `model_dir` keyed by version number."""
+    versions = {}
+    for path in glob.glob(os.path.join(model_dir, 'churn_model_v*.json')):
+        match = re.search(r'churn_model_v(\d+)\.json$', path)
+        if match:
+            versions[int(match.group(1))] = path
+    return versions
+
+
+def latest_model_path(model_dir=MODEL_DIR):
+    """Path of the newest artifact, or None when no model has been trained."""
+    versions = model_versions(model_dir)
+    return versions[max(versions)] if versions else None
+
+
+def train(csv_path=CLEANED_CSV, model_dir=MODEL_DIR, seed=0):
+    """Fit on the cleaned table, write the next versioned artifact and return its path."""
+    df = read_csv_frame(csv_path)
+    churn = df['churn'].to_numpy()
+    rng = np.random.default_rng(seed)
+    holdout = rng.random(len(df)) < HOLDOUT_FRACTION
+
+    # Hold-out metrics from a fit on the rest; the saved model is refit on every row
+    holdout_model = ChurnModel(dict(fit_artifact(df[~holdout], churn[~holdout]), version=0))
+    metrics = evaluate(holdout_model, df[holdout], churn[holdout])
+    artifact = fit_artifact(df, churn)
+
+    version = max(model_versions(model_dir), default=0) + 1
+    artifact.update({
+        'version': version,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'training_data': {'path': csv_path, 'sha256': file_sha256(csv_path), 'rows': len(df)},
+        'holdout_metrics': metrics,
+    })
+    os.makedirs(model_dir, exist_ok=True)
+    path = os.path.join(model_dir, f'churn_model_v{version}.json')
+    with open(path, 'w') as f:
+        json.dump(artifact, f, indent=2)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['train', 'evaluate'])
+    parser.add_argument('--csv', default=CLEANED_CSV, help='cleaned customer CSV')
+    parser.add_argument('--model-dir', default=MODEL_DIR, help='directory of versioned artifacts')
+    parser.add_argument('--model', help='artifact to evaluate (default: latest)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'train':
+        path = train(args.csv, args.model_dir)
+        with open(path) as f:
+            metrics = json.load(f)['holdout_metrics']
+        print(f'Wrote {path}; hold-out ' + ', '.join(f'{k} {v}' for k, v in metrics.items()))
+    else:
+        path = args.model or latest_model_path(args.model_dir)
+        if path is None:
+            parser.error(f'no model artifact in {args.model_dir}')
+        model = ChurnModel.load(path)
+        df = read_csv_frame(args.csv)
+        start = time.perf_counter()
+        model.score(df)
+        seconds = time.perf_counter() - start
+        print(f'{path} (v{model.version}) on {len(df):,} rows, scored in {seconds * 1000:.1f} ms')
+        for name, value in evaluate(model, df, df['churn'].to_numpy()).items():
+            print(f'  {name}: {value}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""Cold start of the dashboard: background warm-up and a time-to-first-render breakdown.
+
+A fresh server process (a dyno waking up, an autoscaled replica) pays for
+module imports, the customer data load and every cache the first render
+touches before the first byte reaches the user. ``WarmUp`` runs such work on
+daemon threads instead, once per process and task name: the dashboard's
+fast-start mode (``CHURN_FAST_START=1``) starts the data load while the page
+chrome goes out and fills the caches of the tabs it skipped once the first
+render is done.
+
+``breakdown`` measures the first render from the outside. For each mode it
+starts a fresh interpreter, drives ``streamlit_dashboard.py`` through
+Streamlit's ``AppTest`` with the section profiler on, and splits the time
+into the Streamlit import, the dashboard's own imports, the page chrome and
+every profiled section, and lists the heavy libraries that were imported.
+
+Usage:
+    python streamlit/cold_start.py [--csv PATH] [--snapshot-dir DIR]
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+DASHBOARD = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'streamlit_dashboard.py')
+MODES = {'default': {}, 'fast start': {'CHURN_FAST_START': '1'}}
+# Libraries whose import alone costs hundreds of milliseconds
+HEAVY_MODULES = ['scipy', 'sklearn', 'matplotlib', 'seaborn']
+# Section after which the first visible elements have been sent
+FIRST_PAINT_SECTION = 'page_chrome'
+RUN_TIMEOUT = 600
+THREAD_PREFIX = 'warm-up '
+
+logger = logging.getLogger(__name__)
+
+
+class WarmUp:
+    """Background threads that fill caches ahead of the sessions that read them.
+
+    A warm-up thread has no page to draw on, so cached loaders it calls are
+    declared with ``show_spinner=False`` and the dashboard shows its own
+    spinner where a session calls them.
+    """
+
+    def __init__(self):
+        self.seconds = {}
+        self.failed = {}
+        self._threads = {}
+        self._lock = threading.Lock()
+
+    def start(self, name, func, *args):
+        """Run `func(*args)` on a daemon thread unless a task called `name` was already started."""
+        with self._lock:
+            if name in self._threads:
+                return self._threads[name]
+            thread = threading.Thread(target=self._run, args=(name, func, args), name=THREAD_PREFIX + name, daemon=True)
+            self._threads[name] = thread
+        thread.start()
+        return thread
+
+    def _run(self, name, func, args):
+        start = time.perf_counter()
+        try:
+            func(*args)
+        except Exception as error:
+            # The session that needs the result calls the loader itself and sees the error there
+            logger.exception('warm-up task %s failed', name)
+            self.failed[name] = f'{type(error).__name__}: {error}'
+        else:
+            self.seconds[name] = time.perf_counter() - start
+
+
+def _measure():
+    # Runs in a fresh interpreter, so nothing is imported or cached yet
+    start = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    framework_s = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log = os.path.join(tmp, 'profile.jsonl')
+        os.environ.update(CHURN_PROFILE='1', CHURN_PROFILE_LOG=log, CHURN_REFRESH_SECONDS='0')
+        app = AppTest.from_file(DASHBOARD, default_timeout=RUN_TIMEOUT)
+        start = time.perf_counter()
+        app.run()
+        first_run_s = time.perf_counter() - start
+        if app.exception:
+            raise RuntimeError(f'dashboard raised: {app.exception[0].value}')
+        with open(log) as f:
+            record = json.loads(f.readline())
+
+    # Imports and page configuration run before the profiler's first section
+    imports_s = first_run_s - record['total_ms'] / 1000
+    sections = {name: ms / 1000 for name, ms in record['sections'].items()}
+    first_paint_s = framework_s + imports_s
+    for name, seconds in sections.items():
+        first_paint_s += seconds
+        if name == FIRST_PAINT_SECTION:
+            break
+    return {
+        'streamlit import': framework_s,
+        'dashboard imports': imports_s,
+        **sections,
+        'first paint': first_paint_s,
+        'first render': framework_s + first_run_s,
+        'heavy modules': [name for name in HEAVY_MODULES if name in sys.modules],
+    }
+
+
+def breakdown(csv_path=None, snapshot_dir=None, modes=MODES):
+    """Seconds per phase of the first render, for each mode, each in a fresh interpreter."""
+    results = {}
+    for mode, overrides in modes.items():
+        env = dict(os.environ, **overrides)
+        if csv_path:
+            env['CHURN_CLEANED_CSV'] = csv_path
+        if snapshot_dir:
+            env['CHURN_SNAPSHOT_DIR'] = snapshot_dir
+        output = subprocess.run(
+            [sys.executable, __file__, '_measure'], check=True, capture_output=True, text=True, env=env,
+        ).stdout
+        results[mode] = json.loads(output.strip().splitlines()[-1])
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', nargs='?', default='breakdown', choices=['breakdown', '_measure'])
+    parser.add_argument('--csv', help='customer CSV (default: the cleaned dataset)')
+    parser.add_argument('--snapshot-dir', help='snapshot directory for that CSV')
+    args = parser.parse_args(argv)
+
+    if args.command == '_measure':
+        print(json.dumps(_measure()))
+        return
+    results = breakdown(args.csv, args.snapshot_dir)
+    phases = list(dict.fromkeys(phase for result in results.values() for phase in result if phase != 'heavy modules'))
+    print(f"{'phase':<24}" + ''.join(f'{mode:>14}' for mode in results))
+    for phase in phases:
+        cells = [f"{result[phase]:>13.3f}s" if phase in result else f"{'-':>14}" for result in results.values()]
+        print(f'{phase:<24}' + ''.join(cells))
+    for mode, result in results.items():
+        print(f"{mode}: heavy modules loaded right after the first render "
+              f"(including background warm-up): {', '.join(result['heavy modules']) or 'none'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""Shared fixtures: a small slice of the cleaned customer CSV.
+
+Run the tests from the repository root with ``python -m pytest streamlit``.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_snapshot import prepare_frame
+from filter_index import FILTER_COLUMNS, RANGE_COLUMN
+
+CLEANED_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'cleaned_data', 'bankchurners.csv')
+FIXTURE_ROWS = 2000
+
+
+@pytest.fixture(scope='session')
+def customers_csv(tmp_path_factory):
+    """Path of a CSV holding the first `FIXTURE_ROWS` customers of the cleaned data."""
+    path = tmp_path_factory.mktemp('customers') / 'customers.csv'
+    pd.read_csv(CLEANED_CSV, nrows=FIXTURE_ROWS).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture(scope='session')
+def customers(customers_csv):
+    """The fixture customers with the dashboard's dtypes and churn flag."""
+    return prepare_frame(pd.read_csv(customers_csv))
+
+
+def random_filters(df, rng):
+    """A random sidebar filter state: an age range and a non-empty subset of each filter column."""
+    low, high = np.sort(rng.integers(df[RANGE_COLUMN].min(), df[RANGE_COLUMN].max() + 1, 2))
+    filters = {}
+    for column in FILTER_COLUMNS:
+        categories = list(df[column].cat.categories)
+        filters[column] = list(rng.choice(categories, rng.integers(1, len(categories) + 1), replace=False))
+    return (int(low), int(high)), filters
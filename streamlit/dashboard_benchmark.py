@@ -0,0 +1,195 @@
+"""Headless latency benchmark of the dashboard at increasing data scale.
+
+For every scale a synthetic customer file of that many rows is generated
+(see ``synthetic_customers``) together with its snapshot. Then a
+fresh interpreter drives ``streamlit_dashboard.py`` through Streamlit's
+``AppTest`` harness and times:
+
+- ``cold_start_s``: the first script run, with empty caches;
+- ``load_data_s``: ``data_snapshot.load_customers`` on the fresh snapshot;
+- ``filter_change_s``: a rerun after a sidebar Card Category change;
+- ``calculator_query_s``: a rerun after a Churn Calculator slider change;
+- ``full_rerun_s``: a rerun with no widget change.
+
+Interaction timings are the median over ``--repeats`` distinct widget states,
+so figure cache hits from earlier states do not hide the work. AppTest has
+no fragment support, so the calculator query is timed as a full rerun.
+
+Results are written as JSON. ``check`` compares a results file against a
+baseline and exits non-zero when any timing regressed by more than the
+threshold.
+
+Usage:
+    python streamlit/dashboard_benchmark.py run [--sizes N ...] [--output PATH]
+    python streamlit/dashboard_benchmark.py check RESULTS --baseline PATH [--threshold 0.25]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import data_snapshot
+from synthetic_customers import generate_customers
+
+DASHBOARD = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'streamlit_dashboard.py')
+DEFAULT_SIZES = [10_000, 1_000_000, 10_000_000]
+DEFAULT_REPEATS = 3
+DEFAULT_THRESHOLD = 0.25
+TIMINGS = ['cold_start_s', 'load_data_s', 'filter_change_s', 'calculator_query_s', 'full_rerun_s']
+# Seconds allowed for one script run at the largest scale
+RUN_TIMEOUT = 600
+
+CARD_STATES = [['Blue'], ['Blue', 'Silver'], ['Gold', 'Platinum', 'Silver']]
+MONTHS_INACTIVE_STATES = [(3, 4), (1, 2), (2, 3)]
+
+
+def _timed_run(app):
+    start = time.perf_counter()
+    app.run(timeout=RUN_TIMEOUT)
+    seconds = time.perf_counter() - start
+    if app.exception:
+        raise RuntimeError(f'dashboard raised: {app.exception[0].value}')
+    return seconds
+
+
+def _widget(widgets, label):
+    return next(widget for widget in widgets if widget.label == label)
+
+
+def _measure(csv_path, snapshot_dir, repeats):
+    # Runs in a fresh interpreter so the first AppTest run sees empty caches
+    from streamlit.testing.v1 import AppTest
+
+    os.environ['CHURN_CLEANED_CSV'] = csv_path
+    os.environ['CHURN_SNAPSHOT_DIR'] = snapshot_dir
+    app = AppTest.from_file(DASHBOARD, default_timeout=RUN_TIMEOUT)
+    result = {'cold_start_s': _timed_run(app)}
+
+    filter_times = []
+    for cards in (CARD_STATES * repeats)[:repeats]:
+        _widget(app.multiselect, 'Card Category').set_value(cards)
+        filter_times.append(_timed_run(app))
+    result['filter_change_s'] = statistics.median(filter_times)
+
+    calculator_times = []
+    for months in (MONTHS_INACTIVE_STATES * repeats)[:repeats]:
+        _widget(app.slider, 'Months Inactive (12 months)').set_value(months)
+        calculator_times.append(_timed_run(app))
+    result['calculator_query_s'] = statistics.median(calculator_times)
+
+    result['full_rerun_s'] = statistics.median(_timed_run(app) for _ in range(repeats))
+
+    start = time.perf_counter()
+    df = data_snapshot.load_customers(csv_path, snapshot_dir)
+    result['load_data_s'] = time.perf_counter() - start
+    result['rows'] = len(df)
+    result['load_source'] = df.attrs['source']
+    return result
+
+
+def run_benchmark(sizes=DEFAULT_SIZES, repeats=DEFAULT_REPEATS, workdir=None):
+    """Benchmark the dashboard once per size and return the results document."""
+    results = []
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        for rows in sizes:
+            csv_path = os.path.join(tmp, f'customers_{rows}.csv')
+            snapshot_dir = os.path.join(tmp, f'snapshot_{rows}')
+            generate_customers(csv_path, rows)
+            start = time.perf_counter()
+            data_snapshot.build_snapshot(csv_path, snapshot_dir)
+            snapshot_build_s = time.perf_counter() - start
+            output = subprocess.run(
+                [sys.executable, __file__, '_measure', '--csv', csv_path,
+                 '--snapshot-dir', snapshot_dir, '--repeats', str(repeats)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            result['snapshot_build_s'] = snapshot_build_s
+            results.append({key: round(value, 4) if isinstance(value, float) else value
+                            for key, value in result.items()})
+            os.remove(csv_path)
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'repeats': repeats,
+        'results': results,
+    }
+
+
+def find_regressions(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """Timings in `current` more than `threshold` (a fraction) slower than in `baseline`.
+
+    Scales are matched by row count; scales missing from either file are ignored.
+    """
+    baseline_by_rows = {result['rows']: result for result in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        reference = baseline_by_rows.get(result['rows'])
+        if reference is None:
+            continue
+        for timing in TIMINGS:
+            if timing in result and timing in reference and result[timing] > reference[timing] * (1 + threshold):
+                regressions.append({
+                    'rows': result['rows'],
+                    'timing': timing,
+                    'baseline': reference[timing],
+                    'current': result[timing],
+                })
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['run', 'check', '_measure'])
+    parser.add_argument('results', nargs='?', help='results file to check')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='dataset sizes in rows')
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS, help='widget states timed per interaction')
+    parser.add_argument('--output', default='dashboard_benchmark.json', help='results file to write')
+    parser.add_argument('--workdir', help='directory for the temporary datasets')
+    parser.add_argument('--baseline', help='results file to compare against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='allowed slowdown as a fraction of the baseline')
+    parser.add_argument('--csv', help=argparse.SUPPRESS)
+    parser.add_argument('--snapshot-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.command == '_measure':
+        print(json.dumps(_measure(args.csv, args.snapshot_dir, args.repeats)))
+        return
+
+    if args.command == 'run':
+        document = run_benchmark(args.sizes, args.repeats, args.workdir)
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2)
+        for result in document['results']:
+            print(f"{result['rows']:>12,} rows: " + ', '.join(f'{t} {result[t]:.3f}' for t in TIMINGS))
+        if not args.baseline:
+            return
+    else:
+        if not args.results or not args.baseline:
+            parser.error('check needs a results file and --baseline')
+        with open(args.results) as f:
+            document = json.load(f)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = find_regressions(document, baseline, args.threshold)
+    for regression in regressions:
+        print(
+            f"REGRESSION {regression['rows']:,} rows {regression['timing']}: "
+            f"{regression['baseline']:.3f}s -> {regression['current']:.3f}s"
+        )
+    if regressions:
+        sys.exit(1)
+    print(f'No timing regressed by more than {args.threshold:.0%}')
+
+
+if __name__ == '__main__':
+    main()
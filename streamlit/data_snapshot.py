@@ -0,0 +1,327 @@
+"""Columnar, memory-mapped snapshot of the cleaned customer table.
+
+The build step turns ``data/cleaned_data/bankchurners.csv`` into one ``.npy``
+file per column plus a ``manifest.json`` holding dtypes, categories and the
+SHA-256 of the source CSV. ``load_customers`` memory-maps the snapshot and
+only parses the CSV when the snapshot is missing or stale.
+
+Every process on a host maps the same files, so the table is held once in
+the page cache however many server processes and sessions read it. Indexes
+derived from a data version can be stored next to the snapshot with
+``save_index`` and mapped the same way with ``load_index``.
+
+Usage:
+    python streamlit/data_snapshot.py build
+    python streamlit/data_snapshot.py benchmark
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+CLEANED_CSV = 'data/cleaned_data/bankchurners.csv'
+SNAPSHOT_DIR = 'data/snapshot'
+MANIFEST_FILE = 'manifest.json'
+SNAPSHOT_FORMAT = 1
+
+# Low-cardinality text columns stored as int8 category codes
+CATEGORICAL_COLUMNS = [
+    'customer_status',
+    'gender',
+    'education_level',
+    'marital_status',
+    'income_category',
+    'card_category',
+    'age_bracket',
+    'utilization_cat',
+]
+
+
+def file_sha256(path, block_size=1 << 20):
+    """Return the hex SHA-256 of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _downcast_float(series):
+    # Only narrow to float32 when every value survives the round trip, so
+    # slider comparisons such as `<= 0.07` keep their float64 results
+    narrow = series.astype('float32')
+    if np.array_equal(narrow.astype('float64').to_numpy(), series.to_numpy(), equal_nan=True):
+        return narrow
+    return series
+
+
+def prepare_frame(df):
+    """Apply the compact dtypes and the precomputed churn flag to a raw frame."""
+    df = df.copy()
+    for column in df.columns:
+        if column in CATEGORICAL_COLUMNS:
+            df[column] = df[column].astype('category')
+        elif pd.api.types.is_integer_dtype(df[column]):
+            df[column] = pd.to_numeric(df[column], downcast='integer')
+        elif pd.api.types.is_float_dtype(df[column]):
+            df[column] = _downcast_float(df[column])
+    # Create churn binary column
+    df['churn'] = (df['customer_status'] == 'Attrited Customer').astype('int8')
+    return df
+
+
+def read_csv_frame(csv_path=CLEANED_CSV):
+    """Parse the cleaned CSV and return it with the compact dtypes applied."""
+    return prepare_frame(pd.read_csv(csv_path))
+
+
+def append_frame(df, delta):
+    """Return `df` followed by the prepared rows of `delta`.
+
+    Columns keep their dtype unless the new values need a wider one, and
+    categorical columns take the union of both category sets in sorted order,
+    as ``prepare_frame`` would give for the whole file. `df` is not modified.
+    """
+    data = {}
+    for column in df.columns:
+        old, new = df[column], delta[column]
+        if isinstance(old.dtype, pd.CategoricalDtype):
+            categories = old.cat.categories.union(new.astype(object).dropna().unique())
+            data[column] = pd.Categorical.from_codes(np.concatenate([
+                _recode(old, categories), _recode(new.astype('category'), categories)
+            ]), categories=categories)
+        else:
+            data[column] = np.concatenate([old.to_numpy(), new.to_numpy()])
+    return pd.DataFrame(data, copy=False)
+
+
+def _recode(series, categories):
+    # Codes of a categorical series in the (wider) `categories`, in the narrowest dtype that holds them
+    dtype = np.int8 if len(categories) < 2 ** 7 else np.int16 if len(categories) < 2 ** 15 else np.int32
+    lookup = np.append(categories.get_indexer(series.cat.categories), -1).astype(dtype)
+    return lookup[series.cat.codes.to_numpy()]
+
+
+def build_snapshot(csv_path=CLEANED_CSV, snapshot_dir=SNAPSHOT_DIR, df=None, source_hash=None):
+    """Write the columnar snapshot for `csv_path` and return its manifest.
+
+    `source_hash` saves hashing the file again when the caller already has it.
+    """
+    source_hash = source_hash or file_sha256(csv_path)
+    if df is None:
+        df = read_csv_frame(csv_path)
+
+    tmp_dir = f'{snapshot_dir}.tmp-{os.getpid()}'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    columns = []
+    for column in df.columns:
+        entry = {'name': column, 'file': f'{column}.npy'}
+        series = df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            values = series.cat.codes.to_numpy()
+            entry['dtype'] = 'category'
+            entry['categories'] = [str(c) for c in series.cat.categories]
+        else:
+            values = series.to_numpy()
+            entry['dtype'] = str(values.dtype)
+        np.save(os.path.join(tmp_dir, entry['file']), values)
+        columns.append(entry)
+
+    manifest = {
+        'format': SNAPSHOT_FORMAT,
+        'source': csv_path,
+        'source_sha256': source_hash,
+        'rows': len(df),
+        'columns': columns,
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    # Swap the finished snapshot into place
+    shutil.rmtree(snapshot_dir, ignore_errors=True)
+    os.replace(tmp_dir, snapshot_dir)
+    return manifest
+
+
+def read_manifest(snapshot_dir=SNAPSHOT_DIR):
+    """Return the snapshot manifest, or None when there is no usable snapshot."""
+    try:
+        with open(os.path.join(snapshot_dir, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('format') != SNAPSHOT_FORMAT:
+        return None
+    return manifest
+
+
+def map_snapshot(manifest, snapshot_dir=SNAPSHOT_DIR):
+    """Build a DataFrame whose columns are read-only memory maps of the snapshot."""
+    data = {}
+    for entry in manifest['columns']:
+        # Plain ndarray view over the mapping; pandas keeps it uncopied with copy=False
+        values = np.load(os.path.join(snapshot_dir, entry['file']), mmap_mode='r').view(np.ndarray)
+        if entry['dtype'] == 'category':
+            dtype = pd.CategoricalDtype(entry['categories'])
+            data[entry['name']] = pd.Categorical.from_codes(values, dtype=dtype)
+        else:
+            data[entry['name']] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def load_customers(csv_path=CLEANED_CSV, snapshot_dir=SNAPSHOT_DIR, source_hash=None):
+    """Return the customer table, memory-mapped from the snapshot when it is fresh.
+
+    A stale or missing snapshot falls back to parsing the CSV, rebuilds the
+    snapshot and maps it when the data directory is writable. ``df.attrs``
+    records the data version (source hash), which path was used and, for a
+    mapped table, the snapshot directory.
+    """
+    source_hash = source_hash or file_sha256(csv_path)
+    manifest = read_manifest(snapshot_dir)
+    if manifest is not None and manifest['source_sha256'] == source_hash:
+        return _mapped(manifest, snapshot_dir, source_hash, 'snapshot')
+
+    df = read_csv_frame(csv_path)
+    try:
+        manifest = build_snapshot(csv_path, snapshot_dir, df=df, source_hash=source_hash)
+    except OSError:
+        df.attrs.update(data_version=source_hash, source='csv')
+        return df
+    # Serve the new snapshot's pages rather than this process's private copy
+    return _mapped(manifest, snapshot_dir, source_hash, 'csv')
+
+
+def share_frame(df, csv_path, snapshot_dir, source_hash):
+    """Write `df` as the snapshot for `source_hash` and return the memory-mapped table.
+
+    Another process that already wrote the same version is reused as it is;
+    when the directory is not writable `df` itself is returned.
+    """
+    manifest = read_manifest(snapshot_dir)
+    if manifest is None or manifest['source_sha256'] != source_hash:
+        try:
+            manifest = build_snapshot(csv_path, snapshot_dir, df=df, source_hash=source_hash)
+        except OSError:
+            return df
+    return _mapped(manifest, snapshot_dir, source_hash, df.attrs.get('source', 'snapshot'))
+
+
+def _mapped(manifest, snapshot_dir, source_hash, source):
+    df = map_snapshot(manifest, snapshot_dir)
+    df.attrs.update(data_version=source_hash, source=source, snapshot_dir=snapshot_dir)
+    return df
+
+
+def _index_path(snapshot_dir, name, data_version, key):
+    return os.path.join(snapshot_dir, f'{name}-{data_version[:16]}-{key}.npy')
+
+
+def save_index(snapshot_dir, name, data_version, arrays):
+    """Store arrays derived from one data version next to its snapshot.
+
+    Files are named after the data version and each one is moved into place
+    whole, so processes on older or newer versions never read each other's.
+    """
+    for key, values in arrays.items():
+        path = _index_path(snapshot_dir, name, data_version, key)
+        tmp_path = f'{path}.tmp-{os.getpid()}.npy'
+        np.save(tmp_path, values)
+        os.replace(tmp_path, path)
+
+
+def load_index(snapshot_dir, name, data_version, keys):
+    """Read-only memory maps of the arrays saved by ``save_index``, or None when any is missing."""
+    try:
+        return {
+            key: np.load(_index_path(snapshot_dir, name, data_version, key), mmap_mode='r').view(np.ndarray)
+            for key in keys
+        }
+    except (OSError, ValueError):
+        return None
+
+
+def rss_bytes():
+    # Current resident set size; Linux only, 0 elsewhere
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _measure(path, csv_path, snapshot_dir):
+    # Runs in a fresh interpreter so each path starts from a cold process
+    rss_before = rss_bytes()
+    start = time.perf_counter()
+    if path == 'csv':
+        df = read_csv_frame(csv_path)
+    else:
+        df = map_snapshot(read_manifest(snapshot_dir), snapshot_dir)
+    load_seconds = time.perf_counter() - start
+    rss_loaded = rss_bytes()
+    # Touch every column the dashboard reads so mapped pages are counted too
+    for column in df.columns:
+        series = df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.cat.codes
+        series.to_numpy().sum()
+    rss_touched = rss_bytes()
+    return {
+        'path': path,
+        'rows': len(df),
+        'load_ms': round(load_seconds * 1000, 2),
+        'rss_after_load_mb': round((rss_loaded - rss_before) / 1e6, 2),
+        'rss_after_scan_mb': round((rss_touched - rss_before) / 1e6, 2),
+        'frame_mb': round(df.memory_usage(deep=True).sum() / 1e6, 2),
+    }
+
+
+def benchmark(csv_path=CLEANED_CSV, snapshot_dir=SNAPSHOT_DIR):
+    """Report startup time and resident memory for the CSV and snapshot paths."""
+    if read_manifest(snapshot_dir) is None:
+        build_snapshot(csv_path, snapshot_dir)
+    results = []
+    for path in ('csv', 'snapshot'):
+        output = subprocess.run(
+            [sys.executable, __file__, '_measure', path, '--csv', csv_path, '--snapshot-dir', snapshot_dir],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results.append(json.loads(output))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['build', 'benchmark', '_measure'])
+    parser.add_argument('path', nargs='?', choices=['csv', 'snapshot'], help=argparse.SUPPRESS)
+    parser.add_argument('--csv', default=CLEANED_CSV, help='cleaned customer CSV')
+    parser.add_argument('--snapshot-dir', default=SNAPSHOT_DIR, help='snapshot output directory')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        manifest = build_snapshot(args.csv, args.snapshot_dir)
+        print(f"Wrote {manifest['rows']:,} rows to {args.snapshot_dir} ({manifest['source_sha256'][:12]})")
+    elif args.command == 'benchmark':
+        for result in benchmark(args.csv, args.snapshot_dir):
+            print(
+                f"{result['path']:>8}: {result['load_ms']:8.2f} ms  "
+                f"RSS +{result['rss_after_load_mb']:.2f} MB after load, "
+                f"+{result['rss_after_scan_mb']:.2f} MB after full scan  "
+                f"(frame {result['frame_mb']:.2f} MB, {result['rows']:,} rows)"
+            )
+    else:
+        print(json.dumps(_measure(args.path, args.csv, args.snapshot_dir)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Server-side 2D density grids for the Behavioral Patterns tab.
+
+A scatter plot of two columns ships one point per customer, which a browser
+cannot draw for a million-customer segment. Here the two columns of the
+selected customers are binned on a fixed grid with a single ``np.bincount``
+over the flattened cell index, giving the customer and churn count of every
+cell, and only the grid is drawn as a Plotly heatmap. The payload is set by
+the number of cells, not by the segment size.
+
+The bin edges come from the whole customer table, so the grid stays put while
+the sidebar filters change the segment.
+"""
+import numpy as np
+import plotly.graph_objects as go
+
+DENSITY_COLUMNS = [
+    'avg_utilization_ratio',
+    'total_trans_ct',
+    'total_trans_amt',
+    'credit_limit',
+    'total_revolving_bal',
+    'months_inactive_12_mon',
+    'contacts_count_12_mon',
+    'no_of_products',
+    'months_on_book',
+    'age',
+]
+MAX_BINS = 40
+
+
+def axis_edges(values, max_bins=MAX_BINS):
+    """At most `max_bins` equal-width bin edges spanning `values`.
+
+    Integer columns get whole-number bin widths with edges halfway between
+    values, so a column with few distinct values gets one bin per value.
+    """
+    low, high = values.min(), values.max()
+    if np.issubdtype(values.dtype, np.integer):
+        span = int(high) - int(low) + 1
+        width = -(-span // max_bins)
+        return low - 0.5 + width * np.arange(-(-span // width) + 1, dtype=np.float64)
+    if high == low:
+        high = low + 1
+    return np.linspace(low, high, max_bins + 1)
+
+
+def _bin_index(values, edges):
+    # Equal-width bins: the index is arithmetic, and the top edge falls into the last bin
+    n_bins = len(edges) - 1
+    index = ((values - edges[0]) * (n_bins / (edges[-1] - edges[0]))).astype(np.intp)
+    return np.clip(index, 0, n_bins - 1)
+
+
+def bin_counts(x, y, churn, x_edges, y_edges):
+    """Customers and churned customers per cell, each shaped (x bins, y bins)."""
+    shape = (len(x_edges) - 1, len(y_edges) - 1)
+    cells = _bin_index(x, x_edges) * shape[1] + _bin_index(y, y_edges)
+    customers = np.bincount(cells, minlength=shape[0] * shape[1]).reshape(shape)
+    churned = np.bincount(cells, weights=churn, minlength=shape[0] * shape[1]).reshape(shape)
+    return customers, churned.astype(np.int64)
+
+
+def density_figure(x_edges, y_edges, customers, churned, x_column, y_column, color='churn_rate', title=None):
+    """Heatmap of the grid colored by churn rate or by customer count; empty cells are blank."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        churn_rate = np.where(customers > 0, churned / customers, np.nan)
+    if color == 'churn_rate':
+        z, colorscale, colorbar, zmin, zmax = churn_rate, 'RdYlGn_r', 'Churn rate', 0, 1
+    else:
+        z = np.where(customers > 0, customers, np.nan)
+        colorscale, colorbar, zmin, zmax = 'Blues', 'Customers', None, None
+    x_centers = (x_edges[:-1] + x_edges[1:]) / 2
+    y_centers = (y_edges[:-1] + y_edges[1:]) / 2
+    fig = go.Figure(go.Heatmap(
+        # Plotly puts y on the rows
+        z=z.T,
+        x=x_centers,
+        y=y_centers,
+        # Hover values travel as a binary array; float32 is exact for counts up to 16M per cell
+        customdata=np.dstack([customers.T, churned.T, churn_rate.T]).astype(np.float32),
+        colorscale=colorscale,
+        zmin=zmin,
+        zmax=zmax,
+        colorbar=dict(title=colorbar, tickformat='.0%' if color == 'churn_rate' else None),
+        hovertemplate=(
+            f'{x_column}=%{{x}}<br>{y_column}=%{{y}}<br>customers=%{{customdata[0]:,}}'
+            '<br>churned=%{customdata[1]:,}<br>churn rate=%{customdata[2]:.1%}<extra></extra>'
+        ),
+    ))
+    fig.update_layout(
+        title=title or f'Churn by {x_column} and {y_column}',
+        xaxis_title=x_column,
+        yaxis_title=y_column,
+    )
+    return fig
@@ -0,0 +1,80 @@
+"""Process-wide cache of serialized Plotly figures.
+
+Figures are stored as JSON under a (data version, normalized filter state,
+chart id) key, so a widget toggled back to an earlier value, or another
+session looking at the same filters, reuses the figure instead of rebuilding
+it. The cache is bounded by the total size of the stored JSON and evicts the
+least recently used figures first.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def normalize_state(state):
+    """Turn a filter state dict into a hashable key that ignores selection order."""
+    def normalize(value):
+        if isinstance(value, dict):
+            return normalize_state(value)
+        if isinstance(value, (list, set)):
+            return tuple(sorted(normalize(v) for v in value))
+        if isinstance(value, tuple):
+            return tuple(normalize(v) for v in value)
+        if isinstance(value, np.generic):
+            return value.item()
+        return value
+
+    return tuple(sorted((key, normalize(value)) for key, value in state.items()))
+
+
+class FigureCache:
+    """Thread-safe, byte-bounded LRU cache of figure JSON with hit/miss counters."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build_json):
+        """Return the cached JSON for `key`, calling `build_json()` on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # Build outside the lock so one slow figure does not block other sessions
+        figure_json = build_json()
+        size = len(figure_json)
+        with self._lock:
+            if key not in self._entries and size <= self.max_bytes:
+                self._entries[key] = figure_json
+                self.current_bytes += size
+                while self.current_bytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self.current_bytes -= len(evicted)
+                    self.evictions += 1
+        return figure_json
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
@@ -0,0 +1,181 @@
+"""Precomputed bitmap index for the dashboard's sidebar filters.
+
+Every value of a categorical filter column gets one packed bitmap (one bit per
+customer), and the age filter gets cumulative bitmaps over the sorted distinct
+ages, so ``age <= a`` is a single stored bitmap. A filter state resolves to a
+``Selection`` through bitwise AND/OR over 64-bit words instead of building
+full-length boolean masks and copying the frame on every rerun.
+"""
+import numpy as np
+import pandas as pd
+
+# Sidebar multiselect filters, all categorical columns of the customer table
+FILTER_COLUMNS = ['income_category', 'marital_status', 'utilization_cat', 'card_category']
+RANGE_COLUMN = 'age'
+
+
+def pack_mask(mask):
+    """Pack a boolean mask into uint64 words, padding the tail with zero bits."""
+    n_words = -(-len(mask) // 64)
+    packed = np.zeros(n_words * 8, dtype=np.uint8)
+    packed[:-(-len(mask) // 8)] = np.packbits(mask)
+    return packed.view(np.uint64)
+
+
+def unpack_bits(bits, n_rows):
+    """Return the boolean mask for the first `n_rows` bits of a packed bitmap."""
+    return np.unpackbits(bits.view(np.uint8), count=n_rows).view(bool)
+
+
+def append_bits(bits, n_rows, mask):
+    """Packed bitmap of the first `n_rows` bits of `bits` followed by `mask`.
+
+    Only the last partial word of `bits` is unpacked, so the cost follows the
+    number of appended rows rather than the bitmap length.
+    """
+    first_word = n_rows // 64
+    head = unpack_bits(bits[first_word:first_word + 1], n_rows - first_word * 64)
+    return np.concatenate([bits[:first_word], pack_mask(np.concatenate([head, mask]))])
+
+
+def popcount(bits):
+    """Number of set bits in a packed bitmap."""
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(bits).sum())
+    return int(np.unpackbits(bits.view(np.uint8)).sum())
+
+
+class FilterIndex:
+    """Bitmaps for the sidebar filter columns of one data version."""
+
+    def __init__(self, df, columns=FILTER_COLUMNS, range_column=RANGE_COLUMN):
+        self.df = df
+        self.n_rows = len(df)
+        self.all_rows = pack_mask(np.ones(self.n_rows, dtype=bool))
+
+        self.bitmaps = {}
+        for column in columns:
+            codes = df[column].cat.codes.to_numpy()
+            categories = df[column].cat.categories
+            self.bitmaps[column] = {
+                value: pack_mask(codes == code) for code, value in enumerate(categories)
+            }
+
+        # Cumulative bitmaps over the sorted distinct values: at_most[i] has
+        # every row whose value is <= range_values[i]
+        self.range_column = range_column
+        values = df[range_column].to_numpy()
+        self.range_values, inverse = np.unique(values, return_inverse=True)
+        order = np.argsort(inverse, kind='stable')
+        bounds = np.searchsorted(inverse[order], np.arange(len(self.range_values)), side='right')
+        self.at_most = np.empty((len(self.range_values), len(self.all_rows)), dtype=np.uint64)
+        mask = np.zeros(self.n_rows, dtype=bool)
+        start = 0
+        for i, end in enumerate(bounds):
+            mask[order[start:end]] = True
+            self.at_most[i] = pack_mask(mask)
+            start = end
+
+    def extended(self, df):
+        """Index for `df`, whose first rows are the ones indexed here, packing only the new rows."""
+        start = self.n_rows
+        index = object.__new__(FilterIndex)
+        index.df = df
+        index.n_rows = len(df)
+        index.all_rows = pack_mask(np.ones(index.n_rows, dtype=bool))
+        empty = np.zeros_like(self.all_rows)
+
+        index.bitmaps = {}
+        for column, bitmaps in self.bitmaps.items():
+            codes = df[column].cat.codes.to_numpy()[start:]
+            index.bitmaps[column] = {
+                value: append_bits(bitmaps.get(value, empty), start, codes == code)
+                for code, value in enumerate(df[column].cat.categories)
+            }
+
+        # A new distinct value covers the same existing rows as the largest value below it
+        index.range_column = self.range_column
+        values = df[self.range_column].to_numpy()[start:]
+        index.range_values = np.union1d(self.range_values, values)
+        below = np.searchsorted(self.range_values, index.range_values, side='right') - 1
+        index.at_most = np.empty((len(index.range_values), len(index.all_rows)), dtype=np.uint64)
+        for i, value in enumerate(index.range_values):
+            existing = self.at_most[below[i]] if below[i] >= 0 else empty
+            index.at_most[i] = append_bits(existing, start, values <= value)
+        return index
+
+    def range_bits(self, low, high):
+        """Bitmap of rows whose range column lies within [low, high]."""
+        hi = np.searchsorted(self.range_values, high, side='right') - 1
+        lo = np.searchsorted(self.range_values, low, side='left') - 1
+        if hi < 0 or hi <= lo:
+            return np.zeros_like(self.all_rows)
+        bits = self.at_most[hi]
+        if lo >= 0:
+            bits = bits & ~self.at_most[lo]
+        return bits
+
+    def isin_bits(self, column, values):
+        """Bitmap of rows whose `column` value is one of `values`."""
+        column_bitmaps = self.bitmaps[column]
+        selected = [column_bitmaps[v] for v in values if v in column_bitmaps]
+        if len(selected) == len(column_bitmaps):
+            return self.all_rows
+        if not selected:
+            return np.zeros_like(self.all_rows)
+        return np.bitwise_or.reduce(selected)
+
+    def select(self, value_range, filters):
+        """Resolve a filter state to a Selection.
+
+        `value_range` is the (low, high) bound for the range column and
+        `filters` maps each categorical filter column to its selected values.
+        """
+        bits = self.range_bits(*value_range)
+        for column, values in filters.items():
+            bits = bits & self.isin_bits(column, values)
+        return Selection(self.df, bits)
+
+
+class Selection:
+    """A filtered view of the customer table held as a packed row bitmap.
+
+    Nothing is copied from the table: the bitmap costs one bit per customer,
+    and the positions of the selected rows are materialized on first use and
+    dropped again by ``release``.
+    """
+
+    def __init__(self, df, bits):
+        self.df = df
+        self.bits = bits
+        self._rows = None
+
+    def __len__(self):
+        return popcount(self.bits)
+
+    @property
+    def rows(self):
+        """Sorted positional indices of the selected rows."""
+        if self._rows is None:
+            rows = np.flatnonzero(unpack_bits(self.bits, len(self.df)))
+            self._rows = rows.astype(np.int32) if len(self.df) < 2 ** 31 else rows
+        return self._rows
+
+    def release(self):
+        """Drop the materialized row positions; a selection kept between reruns holds only its bitmap."""
+        self._rows = None
+
+    def nbytes(self):
+        """Bytes held by this selection, not counting the shared table."""
+        return self.bits.nbytes + (self._rows.nbytes if self._rows is not None else 0)
+
+    def values(self, column):
+        """NumPy values of `column` for the selected rows (category codes for categoricals)."""
+        series = self.df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.cat.codes
+        return series.to_numpy()[self.rows]
+
+    def frame(self, columns):
+        """Materialize only `columns` for the selected rows."""
+        return self.df[columns].take(self.rows)
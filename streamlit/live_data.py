@@ -0,0 +1,430 @@
+"""Live customer data: source change detection and incremental refresh.
+
+A ``LiveSource`` holds the current version of everything built from the
+customer CSV and moves it forward when the file changes:
+
+- a change check first compares the file's size and mtime with the last
+  version, and only hashes the file when they differ;
+- when the file grew and its first bytes still hash to the last version's
+  SHA-256, only the appended rows are parsed and folded into the previous
+  version as deltas. Rows are taken up to the last complete line, so a row
+  still being written waits for the next check;
+- any other change rebuilds the version from scratch.
+
+A new version is built off to the side and published by swapping a single
+reference. A rerun that already holds a version keeps using it, and the next
+call to ``current()`` from any session returns the new one.
+
+``LiveCustomers`` is the in-memory table with its derived structures (filter
+index, churn cube, range engine and any per-customer arrays the dashboard
+registers). An append is published as soon as the grown table and its
+structures are extended in memory; a background thread then writes the
+table and the range indexes as the new snapshot and swaps in a version
+mapping them, so the table is shared with other processes again, which map
+it instead of parsing the CSV. Appends that arrive during a write are
+written together on the next pass.
+``LiveStreamState`` does the same for the streaming aggregates.
+
+Usage:
+    python streamlit/live_data.py benchmark [--csv PATH] [--append-rows N]
+"""
+import argparse
+import csv
+import copy
+import hashlib
+import io
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import deque, namedtuple
+
+import numpy as np
+import pandas as pd
+
+from churn_cube import ChurnCube
+from data_snapshot import CLEANED_CSV, SNAPSHOT_DIR, append_frame, load_customers, prepare_frame, share_frame
+from filter_index import FilterIndex
+from range_engine import RangeEngine
+from streaming_aggregates import DEFAULT_CHUNK_ROWS, build_state
+
+DEFAULT_CHECK_SECONDS = 5.0
+# Appended bytes are parsed in blocks of about this size
+BLOCK_BYTES = 1 << 26
+MAX_KEPT_REFRESHES = 20
+
+logger = logging.getLogger(__name__)
+
+# `size` is the number of bytes the version was built from
+SourceState = namedtuple('SourceState', ['size', 'mtime_ns', 'sha256'])
+
+
+def source_state(path, block_size=1 << 20):
+    """SourceState of the whole file at `path`."""
+    mtime_ns = os.stat(path).st_mtime_ns
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+            size += len(block)
+    return SourceState(size, mtime_ns, digest.hexdigest())
+
+
+def _complete_end(f, size, block_size):
+    # Offset just past the last newline in the file
+    position = size
+    while position > 0:
+        start = max(0, position - block_size)
+        f.seek(start)
+        newline = f.read(position - start).rfind(b'\n')
+        if newline >= 0:
+            return start + newline + 1
+        position = start
+    return 0
+
+
+def detect_change(path, previous, block_size=1 << 20):
+    """Compare `path` with the SourceState a version was built from.
+
+    Returns ``(kind, state)`` where kind is ``'unchanged'``, ``'appended'``
+    (the new state covers the old bytes plus complete appended lines) or
+    ``'replaced'`` (the new state covers the whole file).
+    """
+    stat = os.stat(path)
+    if (stat.st_size, stat.st_mtime_ns) == (previous.size, previous.mtime_ns):
+        return 'unchanged', previous
+
+    with open(path, 'rb') as f:
+        end = stat.st_size
+        if stat.st_size > previous.size > 0:
+            f.seek(previous.size - 1)
+            if f.read(1) == b'\n':
+                end = _complete_end(f, stat.st_size, block_size)
+
+        # One pass hashes the old prefix and the bytes after it
+        f.seek(0)
+        digest = hashlib.sha256()
+        prefix_sha256 = None
+        position = 0
+        while position < end:
+            block = f.read(min(block_size, end - position))
+            if not block:
+                break
+            if position < previous.size <= position + len(block):
+                digest.update(block[:previous.size - position])
+                prefix_sha256 = digest.hexdigest()
+                digest.update(block[previous.size - position:])
+            else:
+                digest.update(block)
+            position += len(block)
+
+    state = SourceState(position, stat.st_mtime_ns, digest.hexdigest())
+    if state.sha256 == previous.sha256:
+        return 'unchanged', previous._replace(mtime_ns=stat.st_mtime_ns)
+    if prefix_sha256 == previous.sha256 and state.size > previous.size:
+        return 'appended', state
+    if end < stat.st_size:
+        # Only complete lines were hashed, but the whole file is the new version
+        return 'replaced', source_state(path, block_size)
+    return 'replaced', state
+
+
+def read_header(path):
+    with open(path, newline='') as f:
+        return next(csv.reader(f))
+
+
+def read_rows(path, start, end, names, block_bytes=BLOCK_BYTES):
+    """Parse the CSV lines in bytes [start, end) as raw frames of about `block_bytes` each."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        carry = b''
+        while remaining > 0:
+            data = f.read(min(block_bytes, remaining))
+            remaining = remaining - len(data) if data else 0
+            block = carry + data
+            cut = len(block) if remaining == 0 else block.rfind(b'\n') + 1
+            block, carry = block[:cut], block[cut:]
+            if block:
+                yield pd.read_csv(io.BytesIO(block), header=None, names=names)
+
+
+class LiveSource:
+    """The current version of the data built from one source file.
+
+    Subclasses implement ``_load(state)``, building a version from scratch,
+    and ``_append(previous, start, state)``, building the next version from
+    the previous one and the lines in bytes [start, state.size).
+    """
+
+    def __init__(self, path, check_seconds=DEFAULT_CHECK_SECONDS):
+        self.path = path
+        # None turns the automatic checks in current() off
+        self.check_seconds = check_seconds
+        self.refreshes = deque(maxlen=MAX_KEPT_REFRESHES)
+        self._lock = threading.Lock()
+        self.state = source_state(path)
+        self.version = self._load(self.state)
+        self._checked = time.monotonic()
+
+    def current(self):
+        """The current version, after a change check when the last one is `check_seconds` old."""
+        if self.check_seconds is not None and time.monotonic() - self._checked >= self.check_seconds:
+            self.refresh(wait=False)
+        return self.version
+
+    def refresh(self, wait=True):
+        """Check the source and publish a new version when it changed.
+
+        Returns the change kind, or None without waiting when another thread
+        is already refreshing and `wait` is false.
+        """
+        if not self._lock.acquire(blocking=wait):
+            return None
+        try:
+            self._checked = time.monotonic()
+            start = time.perf_counter()
+            kind, state = detect_change(self.path, self.state)
+            if kind == 'unchanged':
+                self.state = state
+                return kind
+            if kind == 'appended':
+                version = self._append(self.version, self.state.size, state)
+            else:
+                version = self._load(state)
+            appended_bytes = state.size - self.state.size
+            # One reference swap publishes the version; the state follows under the lock
+            self.version = version
+            self.state = state
+            self._published(kind)
+            self.refreshes.append({
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'kind': kind,
+                'bytes': appended_bytes if kind == 'appended' else state.size,
+                'ms': round((time.perf_counter() - start) * 1000, 2),
+                'data_version': state.sha256,
+            })
+            return kind
+        finally:
+            self._lock.release()
+
+    def _published(self, kind):
+        """Called under the refresh lock after a version of change `kind` was published."""
+
+
+class CustomerData:
+    """One version of the customer table and the structures derived from it."""
+
+    def __init__(self, df, data_version, derived):
+        self.df = df
+        self.data_version = data_version
+        self.derived = derived
+
+    def __getitem__(self, name):
+        return self.derived[name]
+
+
+def per_row(compute):
+    """Build and extend functions for a per-customer array computed by `compute(frame)`."""
+    return compute, lambda values, df, start: np.concatenate([values, compute(df.iloc[start:])])
+
+
+# name -> (build(df), extend(previous, df, start)); `start` is the first new row
+DERIVED = {
+    'filter_index': (FilterIndex, lambda index, df, start: index.extended(df)),
+    'churn_cube': (ChurnCube.from_frame, lambda cube, df, start: cube.extended(df.iloc[start:])),
+    'range_engine': (RangeEngine.shared, lambda engine, df, start: engine.extended(df)),
+}
+
+
+def _rebind(structure, df):
+    # Shallow copy of `structure` reading the table from `df`
+    structure = copy.copy(structure)
+    structure.df = df
+    return structure
+
+
+# name -> share(structure, df): the same structure over the table once it is mapped from
+# its snapshot; structures without an entry hold no reference to the table
+SHARED = {
+    'filter_index': _rebind,
+    'range_engine': lambda engine, df: engine.persist(df),
+}
+
+
+class LiveCustomers(LiveSource):
+    """The in-memory customer table with its derived structures, refreshed in place."""
+
+    def __init__(self, csv_path=CLEANED_CSV, snapshot_dir=SNAPSHOT_DIR, derived=DERIVED,
+                 check_seconds=DEFAULT_CHECK_SECONDS):
+        self.snapshot_dir = snapshot_dir
+        self.derived = dict(derived)
+        # Background thread writing appended versions as snapshots; None when idle
+        self._sharing = None
+        super().__init__(csv_path, check_seconds)
+
+    def _load(self, state):
+        df = load_customers(self.path, self.snapshot_dir, source_hash=state.sha256)
+        return CustomerData(df, state.sha256, {name: build(df) for name, (build, _) in self.derived.items()})
+
+    def _append(self, previous, start, state):
+        names = read_header(self.path)
+        delta = prepare_frame(pd.concat(list(read_rows(self.path, start, state.size, names)), ignore_index=True))
+        df = append_frame(previous.df, delta)
+        df.attrs.update(data_version=state.sha256, source='append')
+        first_new = len(previous.df)
+        derived = {name: extend(previous[name], df, first_new) for name, (_, extend) in self.derived.items()}
+        return CustomerData(df, state.sha256, derived)
+
+    def _published(self, kind):
+        # Writing the snapshot costs time in the table size, so it stays off the refresh path
+        if kind == 'appended' and self._sharing is None:
+            self._sharing = threading.Thread(target=self._share_versions, name='snapshot publish', daemon=True)
+            self._sharing.start()
+
+    def _share_versions(self):
+        # Writes the newest version until no unshared one is left; the exit is decided under
+        # the refresh lock, so an append published meanwhile is never missed
+        while True:
+            version = self.version
+            try:
+                shared = self._shared(version)
+            except Exception:
+                logger.exception('writing the snapshot of data version %s failed', version.data_version[:16])
+                shared = version
+            with self._lock:
+                if self.version is version:
+                    self.version = shared
+                if self.version is shared or 'snapshot_dir' in self.version.df.attrs:
+                    self._sharing = None
+                    return
+
+    def _shared(self, version):
+        # `version` with its table and range indexes written to the snapshot and mapped from it
+        df = share_frame(version.df, self.path, self.snapshot_dir, version.data_version)
+        if df is version.df:
+            return version
+        derived = {
+            name: SHARED[name](structure, df) if name in SHARED else structure
+            for name, structure in version.derived.items()
+        }
+        return CustomerData(df, version.data_version, derived)
+
+    def wait_shared(self, timeout=None):
+        """Wait until appended versions have been written as the snapshot and mapped."""
+        thread = self._sharing
+        if thread is not None:
+            thread.join(timeout)
+
+
+class LiveStreamState(LiveSource):
+    """Streaming aggregates (``CHURN_DATA_MODE=streaming``) refreshed in place."""
+
+    def __init__(self, csv_path=CLEANED_CSV, chunk_rows=DEFAULT_CHUNK_ROWS, check_seconds=DEFAULT_CHECK_SECONDS):
+        self.chunk_rows = chunk_rows
+        super().__init__(csv_path, check_seconds)
+
+    def _load(self, state):
+        return build_state(self.path, self.chunk_rows, source_hash=state.sha256)
+
+    def _append(self, previous, start, state):
+        names = read_header(self.path)
+        version = previous.copy()
+        for chunk in read_rows(self.path, start, state.size, names):
+            version.add_chunk(chunk)
+        version.data_version = state.sha256
+        return version
+
+
+def _append_copies(path, rows, seed=0):
+    # Appends `rows` existing customers under new client numbers
+    df = pd.read_csv(path)
+    rng = np.random.default_rng(seed)
+    extra = df.iloc[rng.integers(0, len(df), size=rows)].copy()
+    extra['clientnum'] = df['clientnum'].max() + 1 + np.arange(rows)
+    extra.to_csv(path, mode='a', header=False, index=False)
+
+
+def check_parity(live):
+    """Compare the live version with one built from scratch; returns mismatch descriptions."""
+    version = live.version
+    fresh = LiveCustomers(live.path, live.snapshot_dir + '.parity', live.derived, check_seconds=None).version
+    shutil.rmtree(live.snapshot_dir + '.parity', ignore_errors=True)
+    problems = []
+    if version.data_version != fresh.data_version:
+        problems.append('data version differs')
+    for column in fresh.df.columns:
+        if not version.df[column].astype(object).equals(fresh.df[column].astype(object)):
+            problems.append(f'column {column} differs')
+    index, fresh_index = version['filter_index'], fresh['filter_index']
+    for column, bitmaps in fresh_index.bitmaps.items():
+        if any(not np.array_equal(index.bitmaps[column][value], bits) for value, bits in bitmaps.items()):
+            problems.append(f'filter bitmaps for {column} differ')
+    if not np.array_equal(index.at_most, fresh_index.at_most):
+        problems.append('age bitmaps differ')
+    engine, fresh_engine = version['range_engine'], fresh['range_engine']
+    for column in fresh_engine.order:
+        if not np.array_equal(engine.order[column], fresh_engine.order[column]):
+            problems.append(f'range order for {column} differs')
+    if engine.totals != fresh_engine.totals:
+        problems.append('range totals differ')
+    cube, fresh_cube = version['churn_cube'], fresh['churn_cube']
+    if not np.allclose(cube.totals, fresh_cube.totals) or cube.n_cells != fresh_cube.n_cells:
+        problems.append('churn cube differs')
+    return problems
+
+
+def benchmark(csv_path=CLEANED_CSV, append_rows=1000, workdir=None):
+    """Time an incremental refresh against a full reload after appending rows to a copy of the CSV."""
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        path = os.path.join(tmp, 'customers.csv')
+        shutil.copyfile(csv_path, path)
+        live = LiveCustomers(path, os.path.join(tmp, 'snapshot'), check_seconds=None)
+        rows_before = len(live.version.df)
+        _append_copies(path, append_rows)
+
+        start = time.perf_counter()
+        kind = live.refresh()
+        refresh_seconds = time.perf_counter() - start
+        live.wait_shared()
+        shared_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        shutil.rmtree(os.path.join(tmp, 'snapshot'))
+        LiveCustomers(path, os.path.join(tmp, 'reload'), check_seconds=None)
+        reload_seconds = time.perf_counter() - start
+        return {
+            'rows_before': rows_before,
+            'rows_after': len(live.version.df),
+            'kind': kind,
+            'refresh_ms': round(refresh_seconds * 1000, 1),
+            'shared_ms': round(shared_seconds * 1000, 1),
+            'full_reload_ms': round(reload_seconds * 1000, 1),
+            'problems': check_parity(live),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['benchmark'])
+    parser.add_argument('--csv', default=CLEANED_CSV, help='cleaned customer CSV to copy')
+    parser.add_argument('--append-rows', type=int, default=1000, help='rows appended to the copy')
+    parser.add_argument('--workdir', help='directory for the temporary copy')
+    args = parser.parse_args(argv)
+
+    result = benchmark(args.csv, args.append_rows, args.workdir)
+    print(
+        f"{result['rows_before']:,} + {args.append_rows:,} rows: {result['kind']} refresh "
+        f"{result['refresh_ms']:.1f} ms (snapshot written and mapped after {result['shared_ms']:.1f} ms), "
+        f"full reload {result['full_reload_ms']:.1f} ms"
+    )
+    print('parity with a full rebuild: ' + ('; '.join(result['problems']) or 'ok'))
+    return 1 if result['problems'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,154 @@
+"""Memory accounting for the dashboard: what is shared and what a session adds.
+
+``footprint`` walks an object graph (frames, arrays, dicts, deques, plain
+objects) and counts each NumPy buffer once, split into:
+
+- ``mapped``: pages of a memory-mapped file such as the snapshot, held once
+  per host in the page cache whatever the number of processes and sessions;
+- ``heap``: private memory of this process.
+
+The dashboard's readout applies it to three tiers: the shared customer table
+and the structures derived from it (once per process or per host), what one
+browser session keeps between reruns, and what a rerun allocates and drops.
+The session tier is the marginal cost of one more user.
+
+``sessions`` measures the same thing from the outside: it opens dashboard
+sessions one after another in a single process and reports the resident
+memory each one adds.
+
+Usage:
+    python streamlit/memory_accounting.py sessions [--sessions N] [--csv PATH]
+"""
+import argparse
+import json
+import mmap
+import os
+import subprocess
+import sys
+from collections import deque
+from types import FunctionType, MethodType, ModuleType
+
+import numpy as np
+import pandas as pd
+
+from data_snapshot import rss_bytes
+
+MAX_DEPTH = 8
+
+
+def _owner(array):
+    # The object that owns the buffer behind `array`, and whether it is a file mapping
+    base = array
+    while isinstance(base, np.ndarray) and base.base is not None:
+        if isinstance(base.base, mmap.mmap):
+            return base, True
+        base = base.base
+    return base, isinstance(base, np.memmap)
+
+
+def _children(obj):
+    if isinstance(obj, pd.DataFrame):
+        return [obj[column] for column in obj.columns]
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return [obj.array]
+    if isinstance(obj, pd.Categorical):
+        return [obj.codes, obj.categories]
+    if isinstance(obj, pd.api.extensions.ExtensionArray):
+        return [np.asarray(obj)]
+    if isinstance(obj, dict):
+        return list(obj.values())
+    if isinstance(obj, (list, tuple, set, frozenset, deque)):
+        return list(obj)
+    if isinstance(obj, (type, ModuleType, FunctionType, MethodType)):
+        return []
+    return list(getattr(obj, '__dict__', {}).values())
+
+
+def footprint(*objects, exclude=()):
+    """Bytes of the NumPy buffers reachable from `objects`, as {'mapped': n, 'heap': n}.
+
+    A buffer shared by several views or objects is counted once, at the size
+    of the array that owns it. Nothing is counted through the objects in
+    `exclude`, such as the shared table a selection refers to.
+    """
+    totals = {'mapped': 0, 'heap': 0}
+    # Visited objects stay referenced here, so the temporary Series and
+    # arrays created on the way cannot free their ids for reuse
+    owners = {}
+    seen = {id(obj): obj for obj in exclude}
+    stack = [(obj, 0) for obj in objects]
+    while stack:
+        obj, depth = stack.pop()
+        if id(obj) in seen or depth > MAX_DEPTH:
+            continue
+        seen[id(obj)] = obj
+        if isinstance(obj, np.ndarray):
+            owner, mapped = _owner(obj)
+            if id(owner) not in owners:
+                owners[id(owner)] = owner
+                totals['mapped' if mapped else 'heap'] += owner.nbytes if isinstance(owner, np.ndarray) else obj.nbytes
+            continue
+        stack.extend((child, depth + 1) for child in _children(obj))
+    return totals
+
+
+def readout(shared, session, rerun):
+    """Rows for the dashboard's memory panel from the footprints of each tier."""
+    rows = [
+        {'tier': 'Customer table and derived structures', 'scope': 'per process / host',
+         'heap MB': shared['heap'] / 1e6, 'mapped MB': shared['mapped'] / 1e6},
+        {'tier': 'This session, kept between reruns', 'scope': 'per user',
+         'heap MB': session['heap'] / 1e6, 'mapped MB': session['mapped'] / 1e6},
+        {'tier': 'This rerun, released at its end', 'scope': 'per rerun',
+         'heap MB': rerun['heap'] / 1e6, 'mapped MB': rerun['mapped'] / 1e6},
+    ]
+    return pd.DataFrame(rows)
+
+
+def _measure_sessions(sessions):
+    # Runs in a fresh interpreter; every AppTest session shares this process's caches
+    from streamlit.testing.v1 import AppTest
+
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'streamlit_dashboard.py')
+    kept = []
+    rss = [rss_bytes()]
+    for _ in range(sessions):
+        session = AppTest.from_file(script, default_timeout=600)
+        session.run()
+        kept.append(session)
+        rss.append(rss_bytes())
+    print(json.dumps(rss))
+
+
+def measure_sessions(sessions=4, csv_path=None):
+    """Resident memory after starting the process and after each added session."""
+    env = dict(os.environ)
+    if csv_path:
+        env['CHURN_CLEANED_CSV'] = csv_path
+    output = subprocess.run(
+        [sys.executable, __file__, '_measure', '--sessions', str(sessions)],
+        check=True, capture_output=True, text=True, env=env,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['sessions', '_measure'])
+    parser.add_argument('--sessions', type=int, default=4, help='sessions to open one after another')
+    parser.add_argument('--csv', help='customer CSV (default: the cleaned dataset)')
+    args = parser.parse_args(argv)
+
+    if args.command == '_measure':
+        _measure_sessions(args.sessions)
+        return
+    rss = measure_sessions(args.sessions, args.csv)
+    print(f'first session (loads the shared table): +{(rss[1] - rss[0]) / 1e6:.1f} MB')
+    for i in range(2, len(rss)):
+        print(f'session {i}: +{(rss[i] - rss[i - 1]) / 1e6:.2f} MB')
+    if len(rss) > 2:
+        print(f'marginal cost per extra session: {(rss[-1] - rss[1]) / (len(rss) - 2) / 1e6:.2f} MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""Range-count engine for the Churn Calculator tab.
+
+Each calculator column keeps a sorted copy of its values and the row order
+that sorts it. A query locates every range with a binary search, walks only
+the rows of the most selective restricted column and checks the remaining
+ranges on those rows, returning segment size and churn count without building
+any intermediate frame. Columns whose range covers all their values are
+skipped, so the default (unfiltered) state is answered from stored totals.
+
+A query costs time in the number of rows in the narrowest restricted range,
+not in the table size: narrowing one slider to a tenth of the customers
+walks a tenth of the table. The worst case is every slider narrowed only
+slightly, where the narrowest range still holds most rows and a query is
+close to a scan of the table, plus the positions and values of those rows.
+The remaining ranges are checked most selective first, each on the rows that
+survived the previous ones, so those arrays shrink as the checks go. Sweeps
+over two columns, which have no such worst case, go through the cumulative
+counts of ``segment_sweep`` instead.
+
+The sorted copies and row orders take about twice the memory of the columns
+themselves. For a table mapped from a snapshot, ``RangeEngine.shared`` stores
+them next to the snapshot, so every process on the host maps one copy.
+"""
+import numpy as np
+
+from data_snapshot import load_index, save_index
+
+CALCULATOR_COLUMNS = [
+    'avg_utilization_ratio',
+    'months_inactive_12_mon',
+    'contacts_count_12_mon',
+    'no_of_products',
+    'total_trans_ct',
+    'total_trans_amt',
+    'age',
+    'credit_limit',
+]
+
+
+class RangeEngine:
+    """Sorted per-column indexes over the calculator columns of one data version."""
+
+    def __init__(self, df, columns=CALCULATOR_COLUMNS):
+        self.n_rows = len(df)
+        index_dtype = np.int32 if self.n_rows < 2 ** 31 else np.int64
+        self.values = {}
+        self.order = {}
+        self.sorted_values = {}
+        for column in columns:
+            values = df[column].to_numpy()
+            order = np.argsort(values, kind='stable').astype(index_dtype)
+            self.values[column] = values
+            self.order[column] = order
+            self.sorted_values[column] = values[order]
+
+        self._set_totals(df)
+
+    @classmethod
+    def shared(cls, df, columns=CALCULATOR_COLUMNS):
+        """Engine whose sorted indexes are mapped from `df`'s snapshot directory.
+
+        The first process to need them builds and saves them; later ones map
+        the saved files. A table not mapped from a snapshot gets a private engine.
+        """
+        snapshot_dir = df.attrs.get('snapshot_dir')
+        if snapshot_dir is None:
+            return cls(df, columns)
+        keys = [f'{kind}.{column}' for column in columns for kind in ('order', 'sorted')]
+        arrays = load_index(snapshot_dir, 'range_engine', df.attrs['data_version'], keys)
+        if arrays is None or any(len(values) != len(df) for values in arrays.values()):
+            return cls(df, columns).persist(df)
+        engine = object.__new__(cls)
+        engine.n_rows = len(df)
+        engine.values = {column: df[column].to_numpy() for column in columns}
+        engine.order = {column: arrays[f'order.{column}'] for column in columns}
+        engine.sorted_values = {column: arrays[f'sorted.{column}'] for column in columns}
+        engine._set_totals(df)
+        return engine
+
+    def persist(self, df):
+        """Save the indexes next to `df`'s snapshot and return an engine mapping them."""
+        snapshot_dir = df.attrs.get('snapshot_dir')
+        if snapshot_dir is None:
+            return self
+        arrays = {f'order.{column}': order for column, order in self.order.items()}
+        arrays.update({f'sorted.{column}': values for column, values in self.sorted_values.items()})
+        try:
+            save_index(snapshot_dir, 'range_engine', df.attrs['data_version'], arrays)
+        except OSError:
+            return self
+        return RangeEngine.shared(df, list(self.values))
+
+    def _set_totals(self, df):
+        self.churn = df['churn'].to_numpy()
+        self.gender_categories = list(df['gender'].cat.categories)
+        self.gender_codes = df['gender'].cat.codes.to_numpy()
+        # Totals for queries where no range restricts anything
+        self.totals = {None: (self.n_rows, int(self.churn.sum()))}
+        for code, gender in enumerate(self.gender_categories):
+            matches = self.gender_codes == code
+            self.totals[gender] = (int(matches.sum()), int(self.churn[matches].sum()))
+
+    def extended(self, df):
+        """Engine for `df`, whose first rows are the ones indexed here.
+
+        Only the new rows are sorted; they are merged into each sorted index
+        after the existing rows with equal values, so the result matches a
+        stable sort of the whole column.
+        """
+        start = self.n_rows
+        engine = object.__new__(RangeEngine)
+        engine.n_rows = len(df)
+        index_dtype = np.int32 if engine.n_rows < 2 ** 31 else np.int64
+        engine.values = {}
+        engine.order = {}
+        engine.sorted_values = {}
+        for column in self.values:
+            values = df[column].to_numpy()
+            new_order = (np.argsort(values[start:], kind='stable') + start).astype(index_dtype)
+            new_sorted = values[new_order]
+            sorted_values = self.sorted_values[column].astype(values.dtype, copy=False)
+            positions = np.searchsorted(sorted_values, new_sorted, side='right')
+            engine.values[column] = values
+            engine.order[column] = np.insert(self.order[column].astype(index_dtype, copy=False), positions, new_order)
+            engine.sorted_values[column] = np.insert(sorted_values, positions, new_sorted)
+        engine._set_totals(df)
+        return engine
+
+    def bounds(self, column):
+        """Smallest and largest value of `column`, read off its sorted index."""
+        sorted_values = self.sorted_values[column]
+        return sorted_values[0], sorted_values[-1]
+
+    def _span(self, column, low, high):
+        sorted_values = self.sorted_values[column]
+        return (
+            int(np.searchsorted(sorted_values, low, side='left')),
+            int(np.searchsorted(sorted_values, high, side='right')),
+        )
+
+    def _matches(self, ranges, gender):
+        # Row positions matching every range and `gender`; None when no range restricts anything
+        spans = {column: self._span(column, low, high) for column, (low, high) in ranges.items()}
+        restricted = {column: span for column, span in spans.items() if span != (0, self.n_rows)}
+        if not restricted:
+            return None
+
+        # Drive the query from the narrowest range and check the others most selective
+        # first, each on the rows that passed the previous checks
+        by_width = sorted(restricted, key=lambda column: restricted[column][1] - restricted[column][0])
+        start, end = restricted[by_width[0]]
+        rows = self.order[by_width[0]][start:end]
+        for column in by_width[1:]:
+            low, high = ranges[column]
+            values = self.values[column][rows]
+            rows = rows[(values >= low) & (values <= high)]
+        if gender is not None:
+            rows = rows[self.gender_codes[rows] == self._gender_code(gender)]
+        return rows
+
+    def _gender_code(self, gender):
+        return self.gender_categories.index(gender) if gender in self.gender_categories else -2
+
+    def count(self, ranges, gender=None):
+        """Return (segment_size, churn_count) for inclusive `ranges` and an optional gender.
+
+        `ranges` maps calculator columns to (min, max); `gender` is a value of
+        the gender column ('M'/'F') or None for everyone.
+        """
+        rows = self._matches(ranges, gender)
+        if rows is None:
+            return self.totals.get(gender, (0, 0))
+        return self.count_rows(rows)
+
+    def count_rows(self, rows):
+        """(segment_size, churn_count) of row positions returned by ``rows``."""
+        return len(rows), int(self.churn[rows].sum())
+
+    def rows(self, ranges, gender=None):
+        """Row positions of the segment `count` describes, for per-customer measures."""
+        rows = self._matches(ranges, gender)
+        if rows is None:
+            if gender is None:
+                return np.arange(self.n_rows)
+            return np.flatnonzero(self.gender_codes == self._gender_code(gender))
+        return rows
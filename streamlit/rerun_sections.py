@@ -0,0 +1,71 @@
+"""Per-session record of which dashboard sections ran in each rerun.
+
+A full script run and a fragment-only rerun (a widget inside an
+``st.fragment`` changed) both count as one rerun. Each section entered through
+``SectionTracker.section`` is logged against the current rerun together with
+whether the inputs it declared changed since its previous execution, so the
+sidebar panel can show how much work a widget interaction actually caused.
+"""
+from collections import Counter, deque
+from contextlib import contextmanager
+
+from figure_cache import normalize_state
+
+MAX_LOGGED_RUNS = 20
+
+
+class SectionTracker:
+    """Rerun log kept in ``st.session_state`` for one browser session."""
+
+    def __init__(self):
+        self.run_number = 0
+        self.in_full_run = False
+        self.runs = deque(maxlen=MAX_LOGGED_RUNS)
+        self.executions = Counter()
+        self.recomputations = Counter()
+        self._last_inputs = {}
+
+    @classmethod
+    def for_session(cls, session_state, key='_section_tracker'):
+        if key not in session_state:
+            session_state[key] = cls()
+        return session_state[key]
+
+    def _start_run(self, kind):
+        self.run_number += 1
+        self.runs.append({'run': self.run_number, 'kind': kind, 'sections': []})
+
+    def begin_full_run(self):
+        """Call at the top of the script; every section until end_full_run belongs to it."""
+        self.in_full_run = True
+        self._start_run('full')
+
+    def end_full_run(self):
+        self.in_full_run = False
+
+    @contextmanager
+    def section(self, name, inputs=None):
+        """Log `name` as executed in the current rerun.
+
+        `inputs` is the state the section reads; the logged entry records
+        whether it differs from the previous execution of the same section.
+        Outside a full run the section starts a new fragment rerun, so each
+        fragment should wrap its body in exactly one section.
+        """
+        if not self.in_full_run:
+            self._start_run('fragment')
+        key = normalize_state(inputs or {})
+        changed = self._last_inputs.get(name) != key
+        self._last_inputs[name] = key
+        self.executions[name] += 1
+        if changed:
+            self.recomputations[name] += 1
+        self.runs[-1]['sections'].append({'section': name, 'inputs_changed': changed})
+        yield changed
+
+    def summary_rows(self):
+        """One row per section with execution and recomputation counts."""
+        return [
+            {'section': name, 'executions': count, 'input changes': self.recomputations[name]}
+            for name, count in self.executions.items()
+        ]
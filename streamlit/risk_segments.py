@@ -0,0 +1,119 @@
+"""Configurable, vectorized risk segmentation.
+
+The risk rules are plain data: each rule names a segment, how its conditions
+combine ('any' or 'all') and a list of (column, operator, threshold)
+conditions. Rules are checked in order and the first match wins, like
+``np.select``; customers matching no rule get the default segment.
+``compile_rules`` turns the rules into one evaluator returning an int8
+segment code per customer, so segments are computed once per data version
+and then only counted for each filter selection.
+"""
+import operator
+
+import numpy as np
+import pandas as pd
+
+SEGMENTS = ['Low', 'Medium', 'High']
+DEFAULT_SEGMENT = 'Medium'
+
+RISK_RULES = [
+    # High risk conditions
+    {
+        'segment': 'High',
+        'combine': 'any',
+        'conditions': [
+            ('avg_utilization_ratio', '>', 0.7),
+            ('months_inactive_12_mon', '>', 2),
+            ('no_of_products', '<', 2),
+            ('total_trans_ct', '<', 20),
+        ],
+    },
+    # Low risk conditions
+    {
+        'segment': 'Low',
+        'combine': 'all',
+        'conditions': [
+            ('avg_utilization_ratio', '<', 0.3),
+            ('months_inactive_12_mon', '<', 2),
+            ('no_of_products', '>', 2),
+            ('total_trans_ct', '>', 40),
+        ],
+    },
+]
+
+OPERATORS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+COMBINERS = {'any': np.logical_or, 'all': np.logical_and}
+
+
+def rule_columns(rules=RISK_RULES):
+    """Columns read by the rules, in first-use order."""
+    columns = []
+    for rule in rules:
+        for column, _, _ in rule['conditions']:
+            if column not in columns:
+                columns.append(column)
+    return columns
+
+
+def compile_rules(rules=RISK_RULES, segments=SEGMENTS, default=DEFAULT_SEGMENT):
+    """Validate `rules` and return ``evaluate(data) -> int8 codes into segments``.
+
+    `data` is anything indexable by column name that yields arrays, such as a
+    DataFrame or a dict of NumPy arrays.
+    """
+    columns = rule_columns(rules)
+    if not columns:
+        raise ValueError('at least one rule condition is required')
+    compiled = []
+    for rule in rules:
+        if rule['segment'] not in segments:
+            raise ValueError(f"unknown segment {rule['segment']!r}")
+        if not rule['conditions']:
+            raise ValueError(f"rule for segment {rule['segment']!r} has no conditions")
+        if rule['combine'] not in COMBINERS:
+            raise ValueError(f"combine must be 'any' or 'all', got {rule['combine']!r}")
+        conditions = []
+        for column, op, threshold in rule['conditions']:
+            if op not in OPERATORS:
+                raise ValueError(f'unknown operator {op!r} for {column}')
+            conditions.append((column, OPERATORS[op], threshold))
+        compiled.append((segments.index(rule['segment']), COMBINERS[rule['combine']], conditions))
+    default_code = segments.index(default)
+
+    def evaluate(data):
+        codes = np.full(len(data[columns[0]]), default_code, dtype=np.int8)
+        # Apply in reverse so earlier rules overwrite later ones, as np.select does
+        for code, combine, conditions in reversed(compiled):
+            matches = combine.reduce([np.asarray(op(np.asarray(data[column]), threshold))
+                                      for column, op, threshold in conditions])
+            codes[matches] = code
+        return codes
+
+    return evaluate
+
+
+def summarize_segments(codes, rows, df, measures=('churn',), segments=SEGMENTS, arrays=None):
+    """Count and average `measures` per segment for the selected `rows`.
+
+    Measures are columns of `df` or, when named in `arrays`, per-customer
+    arrays aligned with it (such as model scores). Returns a DataFrame indexed
+    by segment name with a ``count`` column and one mean column per measure,
+    listing only segments that have customers.
+    """
+    arrays = arrays or {}
+    selected = codes[rows]
+    counts = np.bincount(selected, minlength=len(segments))
+    summary = pd.DataFrame({'count': counts}, index=pd.Index(segments, name='risk_segment'))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for measure in measures:
+            values = arrays[measure] if measure in arrays else df[measure].to_numpy()
+            sums = np.bincount(selected, weights=values[rows], minlength=len(segments))
+            summary[measure] = sums / counts
+    return summary[summary['count'] > 0]
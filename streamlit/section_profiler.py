@@ -0,0 +1,208 @@
+"""Opt-in per-section profiler for the dashboard.
+
+Enabled with ``CHURN_PROFILE=1``. Every rerun (a full script run or a
+fragment rerun) produces one record holding:
+
+- the wall time of each named section;
+- hit or miss of the cached loaders such as ``load_live_customers``;
+- per chart, the figure JSON size in bytes, whether the figure cache had
+  it, and the time spent building and serializing it on a miss.
+
+Records are kept per session for the sidebar panel and appended as JSON
+lines, tagged with a session id and the sidebar filter state, to
+``CHURN_PROFILE_LOG`` (``logs/dashboard_profile.jsonl`` by default).
+``summarize`` aggregates a log into p50/p95 per section and per chart.
+
+When disabled every hook is a no-op.
+
+Usage:
+    python streamlit/section_profiler.py summarize [LOG]
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_LOG = 'logs/dashboard_profile.jsonl'
+MAX_KEPT_RUNS = 50
+
+# Bodies of cached loaders count their executions here; an unchanged count
+# around a call means it was served from the cache
+_loader_executions = Counter()
+_log_lock = threading.Lock()
+
+
+def count_execution(loader):
+    """Call first thing inside a cached loader's body."""
+    _loader_executions[loader] += 1
+
+
+class SectionProfiler:
+    """Rerun timings for one browser session, kept in ``st.session_state``."""
+
+    def __init__(self, enabled=False, log_path=DEFAULT_LOG):
+        self.enabled = enabled
+        self.log_path = log_path
+        self.session_id = uuid.uuid4().hex[:12]
+        self.runs = deque(maxlen=MAX_KEPT_RUNS)
+        self.current = None
+        self.filters = {}
+        self._run_start = None
+
+    @classmethod
+    def for_session(cls, session_state, enabled, log_path=DEFAULT_LOG, key='_section_profiler'):
+        if key not in session_state:
+            session_state[key] = cls(enabled, log_path)
+        profiler = session_state[key]
+        profiler.enabled = enabled
+        return profiler
+
+    def _start_run(self, kind):
+        self._run_start = time.perf_counter()
+        self.current = {
+            'session': self.session_id,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'kind': kind,
+            'filters': self.filters,
+            'sections': {},
+            'loaders': {},
+            'charts': [],
+        }
+
+    def _finish_run(self):
+        record, self.current = self.current, None
+        record['total_ms'] = round((time.perf_counter() - self._run_start) * 1000, 2)
+        self.runs.append(record)
+        if self.log_path:
+            os.makedirs(os.path.dirname(self.log_path) or '.', exist_ok=True)
+            line = json.dumps(record, default=str)
+            with _log_lock, open(self.log_path, 'a') as f:
+                f.write(line + '\n')
+
+    def begin_full_run(self):
+        if self.enabled:
+            self._start_run('full')
+
+    def end_full_run(self):
+        if self.enabled and self.current is not None:
+            self._finish_run()
+
+    def set_filters(self, state):
+        """Record the sidebar filter state the current and later fragment runs use."""
+        if self.enabled:
+            self.filters = {key: list(value) if isinstance(value, tuple) else value for key, value in state.items()}
+            if self.current is not None:
+                self.current['filters'] = self.filters
+
+    @contextmanager
+    def _timed_section(self, name):
+        fragment = self.current is None
+        if fragment:
+            self._start_run('fragment')
+        record = self.current
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record['sections'][name] = round((time.perf_counter() - start) * 1000, 2)
+            if fragment:
+                self._finish_run()
+
+    def section(self, name):
+        """Time the enclosed block as section `name`; outside a full run it is a fragment run."""
+        return self._timed_section(name) if self.enabled else nullcontext()
+
+    def cached_call(self, loader, func, *args):
+        """Call a cached loader, recording whether its body ran and how long the call took."""
+        if not self.enabled or self.current is None:
+            return func(*args)
+        executions = _loader_executions[loader]
+        start = time.perf_counter()
+        result = func(*args)
+        self.current['loaders'][loader] = {
+            'hit': _loader_executions[loader] == executions,
+            'ms': round((time.perf_counter() - start) * 1000, 2),
+        }
+        return result
+
+    def build_timer(self, build):
+        """Wrap a figure builder so a cache miss records its build time."""
+        if not self.enabled:
+            return build, None
+        timing = {}
+
+        def timed_build():
+            start = time.perf_counter()
+            try:
+                return build()
+            finally:
+                timing['build_ms'] = round((time.perf_counter() - start) * 1000, 2)
+
+        return timed_build, timing
+
+    def chart(self, chart_id, payload_bytes, timing):
+        if self.enabled and self.current is not None:
+            self.current['charts'].append({
+                'chart': chart_id,
+                'bytes': payload_bytes,
+                'hit': 'build_ms' not in timing,
+                'build_ms': timing.get('build_ms', 0.0),
+            })
+
+    def session_percentiles(self):
+        """p50/p95 per section over the runs kept for this session."""
+        return percentiles(self.runs)
+
+
+def percentiles(records):
+    """p50/p95 of section times and of chart build times on cache misses, over run records."""
+    sections = {}
+    for record in records:
+        for name, ms in record['sections'].items():
+            sections.setdefault(name, []).append(ms)
+        for chart in record['charts']:
+            if not chart['hit']:
+                sections.setdefault(f"chart:{chart['chart']}", []).append(chart['build_ms'])
+    return pd.DataFrame([
+        {
+            'section': name,
+            'runs': len(values),
+            'p50 ms': float(np.percentile(values, 50)),
+            'p95 ms': float(np.percentile(values, 95)),
+        }
+        for name, values in sections.items()
+    ])
+
+
+def read_log(path=DEFAULT_LOG):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['summarize'])
+    parser.add_argument('log', nargs='?', default=DEFAULT_LOG, help='profile log to aggregate')
+    args = parser.parse_args(argv)
+
+    records = read_log(args.log)
+    sessions = {record['session'] for record in records}
+    print(f'{len(records):,} reruns from {len(sessions):,} sessions')
+    print(percentiles(records).round(2).to_string(index=False))
+    charts = pd.DataFrame([chart for record in records for chart in record['charts']])
+    if not charts.empty:
+        print()
+        print(charts.groupby('chart').agg(
+            views=('bytes', 'size'), hit_rate=('hit', 'mean'), mean_bytes=('bytes', 'mean')
+        ).round(2).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""Chunked export of a customer selection to CSV or Parquet.
+
+A selection is the shared customer table plus the positions of the selected
+rows (a ``Selection`` from the sidebar filters, or ``RangeEngine.rows`` for a
+Churn Calculator segment). The export walks the positions ``chunk_rows`` at a
+time, takes only the exported columns of those rows from the table, and
+writes the chunk out before taking the next one: a CSV block per chunk, or a
+Parquet row group per chunk (offered only when pyarrow is installed). No
+filtered copy of the segment is built, so writing to a file never holds more
+than one chunk of the exported columns, whatever the segment size.
+
+``export_file`` is the dashboard's download: it writes the export to a
+temporary file and returns it opened for reading. Streamlit still keeps the
+file it serves in memory, as the bytes of the encoded export.
+
+Per-customer arrays aligned with the table, such as risk segments or model
+scores, can be exported next to the table columns.
+
+Usage:
+    python streamlit/segment_export.py OUTPUT [--csv PATH] [--range COLUMN LOW HIGH ...] [--gender M|F]
+                                              [--columns COLUMN ...] [--chunk-rows N]
+"""
+import argparse
+import importlib.util
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from data_snapshot import CLEANED_CSV, load_customers
+from range_engine import CALCULATOR_COLUMNS, RangeEngine
+
+DEFAULT_CHUNK_ROWS = 50_000
+# Customer id plus the fields a retention campaign filters and prioritizes on
+EXPORT_COLUMNS = [
+    'clientnum',
+    'age',
+    'gender',
+    'income_category',
+    'card_category',
+    'months_inactive_12_mon',
+    'contacts_count_12_mon',
+    'total_trans_ct',
+    'avg_utilization_ratio',
+    'churn',
+]
+# Download formats as (extension, MIME type); Parquet needs pyarrow, an optional dependency
+FORMATS = {'CSV': ('csv', 'text/csv')}
+if importlib.util.find_spec('pyarrow') is not None:
+    FORMATS['Parquet'] = ('parquet', 'application/vnd.apache.parquet')
+
+
+def export_chunks(df, rows, columns=EXPORT_COLUMNS, chunk_rows=DEFAULT_CHUNK_ROWS, arrays=None):
+    """Frames of `columns` for successive blocks of at most `chunk_rows` of `rows`.
+
+    Columns named in `arrays` come from those per-customer arrays (NumPy
+    arrays or Categoricals aligned with `df`) instead of the table.
+    """
+    arrays = arrays or {}
+    table_columns = [column for column in columns if column not in arrays]
+    for start in range(0, len(rows), chunk_rows):
+        block = rows[start:start + chunk_rows]
+        chunk = df[table_columns].take(block).reset_index(drop=True)
+        for column in columns:
+            if column in arrays:
+                chunk[column] = arrays[column][block]
+        yield chunk[columns]
+
+
+def write_export(file, df, rows, columns=EXPORT_COLUMNS, file_format='csv',
+                 chunk_rows=DEFAULT_CHUNK_ROWS, arrays=None):
+    """Write the selected rows to the binary file object `file`, one chunk at a time; returns the row count."""
+    chunks = export_chunks(df, rows, columns, chunk_rows, arrays)
+    if file_format == 'parquet':
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as error:
+            raise RuntimeError('writing Parquet output needs pyarrow') from error
+        # An empty selection still gets the schema, from the first row of the table
+        first = next(chunks, None)
+        if first is None:
+            first = next(export_chunks(df, np.arange(min(len(df), 1)), columns, 1, arrays)).iloc[:0]
+        schema = pa.Schema.from_pandas(first, preserve_index=False)
+        with pq.ParquetWriter(file, schema) as writer:
+            writer.write_table(pa.Table.from_pandas(first, schema=schema, preserve_index=False))
+            for chunk in chunks:
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    else:
+        text = io.TextIOWrapper(file, encoding='utf-8', newline='', write_through=True)
+        text.write(','.join(columns) + '\n')
+        for chunk in chunks:
+            chunk.to_csv(text, header=False, index=False)
+        # Leave `file` open for the caller
+        text.detach()
+    return len(rows)
+
+
+def export_file(df, rows, columns=EXPORT_COLUMNS, file_format='csv', chunk_rows=DEFAULT_CHUNK_ROWS, arrays=None):
+    """The export written chunk by chunk to a temporary file, returned open for reading.
+
+    The file has no name left on disk and goes away when the returned file
+    object is closed or garbage collected.
+    """
+    f = tempfile.NamedTemporaryFile(suffix=f'.{file_format}', delete=False)
+    try:
+        with f:
+            write_export(f, df, rows, columns, file_format, chunk_rows, arrays)
+        return open(f.name, 'rb')
+    finally:
+        os.remove(f.name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('output', help='.csv or .parquet file to write')
+    parser.add_argument('--csv', default=CLEANED_CSV, help='cleaned customer CSV')
+    parser.add_argument('--range', nargs=3, action='append', default=[], metavar=('COLUMN', 'LOW', 'HIGH'),
+                        help='inclusive range on a calculator column (repeatable)')
+    parser.add_argument('--gender', choices=['M', 'F'], help='only customers of this gender')
+    parser.add_argument('--columns', nargs='+', default=EXPORT_COLUMNS, help='columns to export')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help='rows per chunk')
+    args = parser.parse_args(argv)
+
+    ranges = {}
+    for column, low, high in args.range:
+        if column not in CALCULATOR_COLUMNS:
+            parser.error(f'--range column must be one of {", ".join(CALCULATOR_COLUMNS)}')
+        ranges[column] = (float(low), float(high))
+    file_format = 'parquet' if args.output.endswith('.parquet') else 'csv'
+
+    df = load_customers(args.csv)
+    rows = RangeEngine(df).rows(ranges, args.gender)
+    # A filtered copy of the exported columns is what the chunks replace
+    copy_bytes = int(df[args.columns].memory_usage(index=False, deep=True).sum() * len(rows) / max(len(df), 1))
+    start = time.perf_counter()
+    with open(args.output, 'wb') as f:
+        exported = write_export(f, df, rows, args.columns, file_format, args.chunk_rows)
+    seconds = time.perf_counter() - start
+    # tracemalloc slows the CSV writer down severalfold, so memory is traced on a second pass
+    tracemalloc.start()
+    with open(os.devnull, 'wb') as f:
+        write_export(f, df, rows, args.columns, file_format, args.chunk_rows)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    print(f'{exported:,} of {len(df):,} customers to {args.output} '
+          f'({os.path.getsize(args.output) / 1e6:.1f} MB) in {seconds:.2f} s')
+    print(f'peak memory while exporting: {peak / 1e6:.1f} MB '
+          f'(a filtered copy of the exported columns: {copy_bytes / 1e6:.1f} MB)')
+
+
+if __name__ == '__main__':
+    main()
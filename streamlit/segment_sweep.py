@@ -0,0 +1,253 @@
+"""Batch evaluation of calculator segments through cumulative-count arrays.
+
+A segment is a box of inclusive ranges on calculator columns, as in the Churn
+Calculator. For the columns being swept (typically two), the customers are
+counted per combination of column bins into a dense array of customer counts
+and one of churn counts, and both are turned into prefix sums along every
+axis. The total inside any box is then an inclusion-exclusion over its 2^d
+corners: O(1) per segment whatever the number of customers, and a whole
+batch of segments is one fancy-indexing pass per corner.
+
+An axis has one bin per distinct value of the column, or at most
+``MAX_AXIS_VALUES`` bins of equally many distinct values for columns such as
+credit limit. Counts are exact for ranges whose bounds fall on bin edges,
+which every value does on a one-value-per-bin axis; ``table_ranges`` lets a
+binned column's range restrict the counted rows instead.
+
+Usage:
+    python streamlit/segment_sweep.py [--csv PATH] [--columns X Y] [--segments N]
+"""
+import argparse
+import itertools
+import time
+from collections import namedtuple
+
+import numpy as np
+import plotly.graph_objects as go
+
+from data_snapshot import CLEANED_CSV, load_customers
+from range_engine import RangeEngine
+
+MAX_AXIS_VALUES = 1024
+MAX_SWEEP_STEPS = 12
+SWEEP_PRESETS = {
+    'Months inactive × Contacts count': ('months_inactive_12_mon', 'contacts_count_12_mon'),
+    'Transaction count × Utilization ratio': ('total_trans_ct', 'avg_utilization_ratio'),
+}
+
+Axis = namedtuple('Axis', ['lows', 'highs'])
+Axis.__doc__ = 'Smallest and largest value of each bin along one column, both sorted.'
+
+
+def make_axis(sorted_values, max_values=MAX_AXIS_VALUES):
+    """Bins of one column from all of its values in sorted order."""
+    distinct = sorted_values[np.r_[True, sorted_values[1:] != sorted_values[:-1]]]
+    if len(distinct) <= max_values:
+        return Axis(distinct, distinct)
+    starts = np.linspace(0, len(distinct), max_values, endpoint=False).astype(np.intp)
+    return Axis(distinct[starts], distinct[np.append(starts[1:], len(distinct)) - 1])
+
+
+def _prefix_sums(counts):
+    # Inclusive prefix sums along every axis, padded with a leading zero plane per axis
+    padded = np.zeros([n + 1 for n in counts.shape], dtype=np.int64)
+    padded[(slice(1, None),) * counts.ndim] = counts
+    for axis in range(counts.ndim):
+        np.cumsum(padded, axis=axis, out=padded)
+    return padded
+
+
+class CumulativeTable:
+    """Prefix sums of customers and churned customers over the bins of a few columns."""
+
+    def __init__(self, axes, values, churn):
+        """Count the rows given by `values` (column -> array) and `churn` on `axes` (column -> Axis)."""
+        self.columns = list(axes)
+        self.axes = axes
+        shape = tuple(len(axes[column].lows) for column in self.columns)
+        cells = np.ravel_multi_index(
+            [np.searchsorted(axes[column].lows, values[column], side='right') - 1 for column in self.columns],
+            shape,
+        )
+        size = int(np.prod(shape))
+        self.rows = len(cells)
+        self.customers = _prefix_sums(np.bincount(cells, minlength=size).reshape(shape))
+        self.churned = _prefix_sums(
+            np.bincount(cells, weights=churn, minlength=size).astype(np.int64).reshape(shape)
+        )
+
+    def positions(self, segments):
+        """Inclusive bin positions (lows, highs), each shaped (segments, columns).
+
+        `segments` is a list of dicts mapping columns to inclusive (low, high)
+        value ranges; a column left out spans its whole axis.
+        """
+        lows = np.zeros((len(segments), len(self.columns)), dtype=np.intp)
+        highs = np.empty_like(lows)
+        for k, column in enumerate(self.columns):
+            axis = self.axes[column]
+            bounds = np.array([segment.get(column, (axis.lows[0], axis.highs[-1])) for segment in segments])
+            lows[:, k] = np.searchsorted(axis.highs, bounds[:, 0], side='left')
+            highs[:, k] = np.searchsorted(axis.lows, bounds[:, 1], side='right') - 1
+        return lows, highs
+
+    def evaluate(self, lows, highs):
+        """Customers and churned customers inside each box of bin positions, as two arrays."""
+        sizes = np.zeros(len(lows), dtype=np.int64)
+        churned = np.zeros(len(lows), dtype=np.int64)
+        empty = (highs < lows).any(axis=1)
+        lows, highs = np.where(empty[:, None], 0, lows), np.where(empty[:, None], 0, highs)
+        d = len(self.columns)
+        for corner in itertools.product((0, 1), repeat=d):
+            index = tuple(highs[:, k] + 1 if upper else lows[:, k] for k, upper in enumerate(corner))
+            sign = 1 if (d - sum(corner)) % 2 == 0 else -1
+            sizes += sign * self.customers[index]
+            churned += sign * self.churned[index]
+        sizes[empty] = 0
+        churned[empty] = 0
+        return sizes, churned
+
+    def count(self, segments):
+        """Customers and churned customers of each segment in `segments` (see ``positions``)."""
+        return self.evaluate(*self.positions(segments))
+
+    def grid(self, ranges=None, max_steps=MAX_SWEEP_STEPS):
+        """A sweep cutting each axis, within `ranges`, into at most `max_steps` steps of whole bins.
+
+        Returns the value range of every step per column and the (lows, highs)
+        bin positions of every cell of the grid, in row-major order. A range
+        that falls between two bins of its axis leaves the grid empty.
+        """
+        ranges = ranges or {}
+        first, last = self.positions([ranges])
+        if (last[0] < first[0]).any():
+            empty = np.empty((0, len(self.columns)), dtype=np.intp)
+            return {column: [] for column in self.columns}, empty, empty.copy()
+        steps = {}
+        for k, column in enumerate(self.columns):
+            start, stop = first[0, k], last[0, k] + 1
+            cuts = np.unique(np.linspace(start, stop, min(max_steps, max(stop - start, 1)) + 1).astype(np.intp))
+            steps[column] = list(zip(cuts[:-1], cuts[1:] - 1))
+        cells = list(itertools.product(*steps.values()))
+        lows = np.array([[low for low, _ in cell] for cell in cells], dtype=np.intp).reshape(-1, len(self.columns))
+        highs = np.array([[high for _, high in cell] for cell in cells], dtype=np.intp).reshape(-1, len(self.columns))
+        labels = {
+            column: [(self.axes[column].lows[low], self.axes[column].highs[high]) for low, high in steps[column]]
+            for column in self.columns
+        }
+        return labels, lows, highs
+
+
+def _binned(sorted_values, max_values):
+    # Whether the column has more distinct values than its axis has bins
+    return np.count_nonzero(sorted_values[1:] != sorted_values[:-1]) + 1 > max_values
+
+
+def table_ranges(engine, columns, ranges, max_values=MAX_AXIS_VALUES):
+    """The part of `ranges` a table swept over `columns` has to count rows with.
+
+    Ranges on the other columns always restrict the rows. A swept column's
+    range is left to the segments (so the table serves any range on it),
+    except on a binned axis, where bounds inside a bin would be rounded out.
+    """
+    return {
+        column: bounds for column, bounds in ranges.items()
+        if column not in columns or _binned(engine.sorted_values[column], max_values)
+    }
+
+
+def engine_table(engine, columns, ranges=None, gender=None, max_values=MAX_AXIS_VALUES):
+    """Cumulative table over `columns` for the rows a RangeEngine matches with `ranges` and `gender`.
+
+    The axes come from the engine's sorted indexes, so they cover the whole
+    table and stay the same whichever rows are counted.
+    """
+    axes = {column: make_axis(engine.sorted_values[column], max_values) for column in columns}
+    rows = engine.rows(ranges or {}, gender)
+    values = {column: engine.values[column][rows] for column in columns}
+    return CumulativeTable(axes, values, engine.churn[rows])
+
+
+def _format(value):
+    return f'{value:g}' if isinstance(value, (float, np.floating)) else f'{value:,}'
+
+
+def step_label(low, high):
+    return _format(low) if low == high else f'{_format(low)}–{_format(high)}'
+
+
+def sweep_figure(labels, sizes, churned, x_column, y_column, overall_rate=None):
+    """Heatmap of churn rate over a two-column grid from ``CumulativeTable.grid``."""
+    x_labels = [step_label(*step) for step in labels[x_column]]
+    y_labels = [step_label(*step) for step in labels[y_column]]
+    shape = (len(x_labels), len(y_labels))
+    sizes, churned = sizes.reshape(shape), churned.reshape(shape)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        churn_rate = np.where(sizes > 0, churned / sizes, np.nan)
+    fig = go.Figure(go.Heatmap(
+        # Plotly puts y on the rows
+        z=churn_rate.T,
+        x=x_labels,
+        y=y_labels,
+        customdata=np.dstack([sizes.T, churned.T]),
+        colorscale='RdYlGn_r',
+        zmid=overall_rate,
+        colorbar=dict(title='Churn rate', tickformat='.0%'),
+        texttemplate='%{z:.0%}',
+        hovertemplate=(
+            f'{x_column}=%{{x}}<br>{y_column}=%{{y}}<br>customers=%{{customdata[0]:,}}'
+            '<br>churned=%{customdata[1]:,}<br>churn rate=%{z:.1%}<extra></extra>'
+        ),
+    ))
+    fig.update_layout(
+        title=f'Churn rate by {x_column} and {y_column}',
+        xaxis_title=x_column,
+        yaxis_title=y_column,
+        xaxis_type='category',
+        yaxis_type='category',
+    )
+    return fig
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=CLEANED_CSV, help='cleaned customer CSV')
+    parser.add_argument('--columns', nargs='+', default=list(SWEEP_PRESETS['Transaction count × Utilization ratio']),
+                        help='calculator columns to sweep')
+    parser.add_argument('--segments', type=int, default=10_000, help='random segments to evaluate')
+    args = parser.parse_args(argv)
+
+    df = load_customers(args.csv)
+    engine = RangeEngine(df, args.columns)
+    start = time.perf_counter()
+    table = engine_table(engine, args.columns)
+    build_seconds = time.perf_counter() - start
+
+    # Random boxes with bounds on existing values, checked against the range engine
+    rng = np.random.default_rng(0)
+    segments = []
+    for _ in range(args.segments):
+        segment = {}
+        for column in args.columns:
+            low, high = np.sort(rng.choice(table.axes[column].lows, 2))
+            segment[column] = (low, table.axes[column].highs[np.searchsorted(table.axes[column].lows, high)])
+        segments.append(segment)
+    start = time.perf_counter()
+    sizes, churned = table.count(segments)
+    batch_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    expected = [engine.count(segment) for segment in segments]
+    loop_seconds = time.perf_counter() - start
+    mismatches = sum((int(a), int(b)) != e for a, b, e in zip(sizes, churned, expected))
+
+    cells = table.customers.size
+    print(f'{len(df):,} rows, {" x ".join(str(len(table.axes[c].lows)) for c in args.columns)} bins '
+          f'({cells:,} cells), table built in {build_seconds * 1000:.1f} ms')
+    print(f'{len(segments):,} segments in one batch: {batch_seconds * 1000:.1f} ms '
+          f'({batch_seconds / len(segments) * 1e6:.2f} us per segment)')
+    print(f'range engine, one query per segment: {loop_seconds * 1000:.1f} ms; '
+          f'{mismatches} mismatches')
+
+
+if __name__ == '__main__':
+    main()
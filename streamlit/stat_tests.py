@@ -0,0 +1,162 @@
+"""Batch statistical tests behind the dashboard's Statistics tab.
+
+Replaces the one-off tests in ``bankchurners_statistical_analysis.ipynb``
+with every pairwise test computed at once for a data version:
+
+- chi-square test of independence of each categorical column and churn,
+  with Cramér's V;
+- one-way ANOVA of each numeric column across the levels of each
+  categorical column, with eta squared, from per-group sums computed with
+  ``np.bincount`` instead of one filtered Series per group;
+- the Pearson correlation matrix of the numeric columns and churn.
+
+The categorical columns are independent tasks run on a thread pool (the
+heavy lifting is NumPy, which releases the GIL); only the p-values come from
+SciPy's distribution functions, and SciPy is imported on the first test
+rather than with this module, which the dashboard imports at start-up. The
+dashboard caches the results per data version, so no test is rerun per
+request.
+
+Usage:
+    python streamlit/stat_tests.py [--csv PATH] [--workers N]
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from data_snapshot import CLEANED_CSV, load_customers
+
+TEST_CATEGORICALS = [
+    'gender',
+    'education_level',
+    'marital_status',
+    'income_category',
+    'card_category',
+    'age_bracket',
+    'utilization_cat',
+]
+TEST_NUMERICS = [
+    'age',
+    'dependencies',
+    'months_on_book',
+    'no_of_products',
+    'months_inactive_12_mon',
+    'contacts_count_12_mon',
+    'credit_limit',
+    'total_revolving_bal',
+    'total_trans_amt',
+    'total_trans_ct',
+    'avg_utilization_ratio',
+]
+SIGNIFICANCE = 0.05
+
+
+def _codes(series):
+    # Category codes with missing values (-1) dropped from every test
+    codes = series.cat.codes.to_numpy() if isinstance(series.dtype, pd.CategoricalDtype) \
+        else pd.Categorical(series).codes
+    return codes, codes >= 0
+
+
+def chi_square(codes, churn, n_levels):
+    """Chi-square statistic, degrees of freedom, p-value and Cramér's V of codes vs churn."""
+    from scipy import stats
+
+    observed = np.bincount(codes * 2 + churn, minlength=n_levels * 2).reshape(n_levels, 2).astype(np.float64)
+    observed = observed[observed.sum(axis=1) > 0]
+    total = observed.sum()
+    expected = observed.sum(axis=1, keepdims=True) * observed.sum(axis=0, keepdims=True) / total
+    statistic = float(((observed - expected) ** 2 / expected).sum())
+    dof = (observed.shape[0] - 1) * (observed.shape[1] - 1)
+    cramers_v = np.sqrt(statistic / (total * max(1, min(observed.shape) - 1)))
+    return statistic, dof, float(stats.chi2.sf(statistic, dof)), float(cramers_v)
+
+
+def anova(codes, values, n_levels):
+    """One-way ANOVA of each column of `values` (rows x columns) across `codes`.
+
+    Returns arrays of F statistics, p-values and eta squared, one per column.
+    """
+    from scipy import stats
+
+    # Per-group sums of the centered values, one bincount per column
+    centered = values - values.mean(axis=0)
+    counts = np.bincount(codes, minlength=n_levels)
+    present = counts > 0
+    sums = np.column_stack([np.bincount(codes, weights=column, minlength=n_levels) for column in centered.T])
+    counts, sums = counts[present], sums[present]
+
+    n, k = len(codes), len(counts)
+    between = (sums ** 2 / counts[:, None]).sum(axis=0)
+    within = (centered * centered).sum(axis=0) - between
+    with np.errstate(divide='ignore', invalid='ignore'):
+        f_statistic = (between / (k - 1)) / (within / (n - k))
+        eta_squared = between / (between + within)
+    return f_statistic, stats.f.sf(f_statistic, k - 1, n - k), eta_squared
+
+
+def _categorical_tests(df, column, churn, values):
+    codes, valid = _codes(df[column])
+    n_levels = int(codes.max()) + 1
+    codes, column_churn, column_values = codes[valid], churn[valid], values[valid]
+    statistic, dof, p_value, cramers_v = chi_square(codes, column_churn, n_levels)
+    chi_row = {'column': column, 'chi2': statistic, 'dof': dof, 'p_value': p_value, 'cramers_v': cramers_v}
+    f_statistic, p_values, eta_squared = anova(codes, column_values, n_levels)
+    anova_rows = [
+        {'numeric': numeric, 'categorical': column, 'f_statistic': f, 'p_value': p, 'eta_squared': eta}
+        for numeric, f, p, eta in zip(TEST_NUMERICS, f_statistic, p_values, eta_squared)
+    ]
+    return chi_row, anova_rows
+
+
+def run_tests(df, workers=None):
+    """Every chi-square, ANOVA and correlation result for one customer table.
+
+    Returns a dict with ``chi_square`` and ``anova`` DataFrames (sorted by
+    effect size, with a ``significant`` flag at the 5% level) and the
+    ``correlation`` matrix.
+    """
+    churn = df['churn'].to_numpy().astype(np.int64)
+    values = np.column_stack([df[column].to_numpy(dtype=np.float64) for column in TEST_NUMERICS])
+    categoricals = [column for column in TEST_CATEGORICALS if column in df.columns]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        correlation = pool.submit(np.corrcoef, np.column_stack([values, churn]), rowvar=False)
+        results = list(pool.map(lambda column: _categorical_tests(df, column, churn, values), categoricals))
+
+    chi = pd.DataFrame([chi_row for chi_row, _ in results])
+    chi['significant'] = chi['p_value'] < SIGNIFICANCE
+    anova_results = pd.DataFrame([row for _, rows in results for row in rows])
+    anova_results['significant'] = anova_results['p_value'] < SIGNIFICANCE
+    labels = TEST_NUMERICS + ['churn']
+    return {
+        'chi_square': chi.sort_values('cramers_v', ascending=False, ignore_index=True),
+        'anova': anova_results.sort_values('eta_squared', ascending=False, ignore_index=True),
+        'correlation': pd.DataFrame(correlation.result(), index=labels, columns=labels),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=CLEANED_CSV, help='cleaned customer CSV')
+    parser.add_argument('--workers', type=int, help='threads for the per-column tests')
+    args = parser.parse_args(argv)
+
+    df = load_customers(args.csv)
+    start = time.perf_counter()
+    results = run_tests(df, args.workers)
+    seconds = time.perf_counter() - start
+    print(f'{len(results["chi_square"])} chi-square and {len(results["anova"])} ANOVA tests '
+          f'on {len(df):,} rows in {seconds * 1000:.1f} ms\n')
+    print(results['chi_square'].round(4).to_string(index=False))
+    print()
+    print(results['anova'].head(15).round(4).to_string(index=False))
+    print()
+    print(results['correlation']['churn'].drop('churn').sort_values().round(3).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+"""Out-of-core streaming aggregation for customer files larger than RAM.
+
+The customer CSV is read in bounded-size chunks and every chunk is folded
+into the aggregates the dashboard needs, after which the chunk is dropped:
+
+- a churn cube with the risk segment as an extra dimension and the product
+  count as an extra measure, answering group churn rates, header metrics and
+  segment counts for any sidebar filter state;
+- one value sketch (a histogram at fixed resolution) per box-plot column and
+  churn group, from which the Behavioral Patterns boxes are drawn.
+
+Memory is bounded by the chunk size plus the number of cube cells and sketch
+bins, neither of which grows with the number of customers.
+
+The dashboard runs entirely off this state when started with
+``CHURN_DATA_MODE=streaming`` (chunk size from ``CHURN_STREAM_CHUNK_ROWS``).
+
+Usage:
+    python streamlit/streaming_aggregates.py summary [--csv PATH] [--chunk-rows N]
+    python streamlit/streaming_aggregates.py benchmark [--sizes N ...] [--chunk-rows N]
+"""
+import argparse
+import copy
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from box_summary import summarize_counts
+from churn_cube import DIMS, MEASURES, ChurnCube
+from data_snapshot import CLEANED_CSV, file_sha256, prepare_frame
+from risk_segments import RISK_RULES, SEGMENTS, compile_rules
+
+DEFAULT_CHUNK_ROWS = 100_000
+STREAM_DIMS = DIMS + ['risk_segment']
+STREAM_MEASURES = MEASURES + ['no_of_products']
+# Box-plot columns and the resolution their sketches keep values at
+BOX_SKETCH_RESOLUTION = {
+    'avg_utilization_ratio': 0.001,
+    'months_inactive_12_mon': 1,
+    'total_trans_ct': 1,
+    'no_of_products': 1,
+}
+
+
+class ValueSketch:
+    """Mergeable histogram of values rounded to a fixed resolution."""
+
+    def __init__(self, resolution=1):
+        self.resolution = resolution
+        self.decimals = max(0, -int(np.floor(np.log10(resolution))))
+        self.keys = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+
+    def add(self, values):
+        keys = np.rint(np.asarray(values, dtype=np.float64) / self.resolution).astype(np.int64)
+        new_keys, new_counts = np.unique(keys, return_counts=True)
+        self.keys, inverse = np.unique(np.concatenate([self.keys, new_keys]), return_inverse=True)
+        self.counts = np.bincount(
+            inverse, weights=np.concatenate([self.counts, new_counts]), minlength=len(self.keys)
+        ).astype(np.int64)
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    def histogram(self):
+        """Sorted distinct values and their counts."""
+        return np.round(self.keys * self.resolution, self.decimals), self.counts
+
+
+class StreamingState:
+    """Aggregates folded from a customer file one chunk at a time."""
+
+    def __init__(self, rules=RISK_RULES):
+        self.cube = ChurnCube(STREAM_DIMS, STREAM_MEASURES)
+        self.sketches = {
+            (column, group): ValueSketch(resolution)
+            for column, resolution in BOX_SKETCH_RESOLUTION.items()
+            for group in (0, 1)
+        }
+        self.evaluate_risk = compile_rules(rules)
+        self.rows = 0
+        self.chunks = 0
+        self.data_version = None
+
+    def add_chunk(self, chunk):
+        """Fold one raw chunk of the cleaned CSV into the aggregates."""
+        chunk = prepare_frame(chunk)
+        chunk['risk_segment'] = pd.Categorical.from_codes(self.evaluate_risk(chunk), categories=SEGMENTS)
+        self.cube.add_frame(chunk)
+        churn = chunk['churn'].to_numpy()
+        for (column, group), sketch in self.sketches.items():
+            sketch.add(chunk[column].to_numpy()[churn == group])
+        self.rows += len(chunk)
+        self.chunks += 1
+
+    def copy(self):
+        """Independent copy; folding chunks into it leaves this state unchanged."""
+        state = copy.copy(self)
+        state.cube = self.cube.copy()
+        state.sketches = {key: copy.copy(sketch) for key, sketch in self.sketches.items()}
+        return state
+
+    def box_summaries(self, column):
+        """Box summaries per churn group for `column`, over every folded row."""
+        summaries = []
+        for group in (0, 1):
+            sketch = self.sketches[(column, group)]
+            if sketch.total:
+                summaries.append(summarize_counts(group, *sketch.histogram()))
+        return summaries
+
+    def size_bytes(self):
+        """Approximate memory held by the aggregates."""
+        return (
+            self.cube.keys.nbytes + self.cube.sums.nbytes
+            + sum(s.keys.nbytes + s.counts.nbytes for s in self.sketches.values())
+        )
+
+
+def build_state(csv_path=CLEANED_CSV, chunk_rows=DEFAULT_CHUNK_ROWS, rules=RISK_RULES, source_hash=None):
+    """Stream `csv_path` in chunks of `chunk_rows` rows into a StreamingState."""
+    state = StreamingState(rules)
+    state.data_version = source_hash or file_sha256(csv_path)
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+        state.add_chunk(chunk)
+    return state
+
+
+def write_scaled_csv(path, rows, source=CLEANED_CSV, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Write `rows` customers to `path` by repeating the cleaned CSV, chunk by chunk."""
+    base = pd.read_csv(source)
+    written = 0
+    with open(path, 'w', newline='') as f:
+        while written < rows:
+            take = min(chunk_rows, rows - written)
+            chunk = base.iloc[np.arange(written, written + take) % len(base)].copy()
+            chunk['clientnum'] = np.arange(written, written + take) + 1
+            chunk.to_csv(f, header=written == 0, index=False)
+            written += take
+
+
+def _measure(csv_path, chunk_rows):
+    # Runs in a fresh interpreter so peak RSS belongs to this input alone
+    import resource
+
+    start = time.perf_counter()
+    state = build_state(csv_path, chunk_rows)
+    seconds = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        'rows': state.rows,
+        'chunks': state.chunks,
+        'seconds': round(seconds, 2),
+        'rows_per_second': round(state.rows / seconds),
+        'peak_rss_mb': round(peak_kb / 1024, 1),
+        'state_kb': round(state.size_bytes() / 1024, 1),
+    }
+
+
+def benchmark(sizes, chunk_rows=DEFAULT_CHUNK_ROWS, workdir=None):
+    """Peak RSS and throughput of build_state for inputs of increasing size."""
+    results = []
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        for rows in sizes:
+            path = os.path.join(tmp, f'customers_{rows}.csv')
+            write_scaled_csv(path, rows, chunk_rows=chunk_rows)
+            output = subprocess.run(
+                [sys.executable, __file__, '_measure', '--csv', path, '--chunk-rows', str(chunk_rows)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output)
+            result['file_mb'] = round(os.path.getsize(path) / 1e6, 1)
+            results.append(result)
+            os.remove(path)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['summary', 'benchmark', '_measure'])
+    parser.add_argument('--csv', default=CLEANED_CSV, help='customer CSV in the cleaned schema')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help='rows read per chunk')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000, 4_000_000],
+                        help='benchmark input sizes in rows')
+    parser.add_argument('--workdir', help='directory for the temporary benchmark inputs')
+    args = parser.parse_args(argv)
+
+    if args.command == 'summary':
+        state = build_state(args.csv, args.chunk_rows)
+        totals = state.cube.totals
+        print(f'{state.rows:,} rows in {state.chunks} chunks, churn rate {totals[1] / totals[0]:.1%}, '
+              f'{state.cube.n_cells:,} cube cells, state {state.size_bytes() / 1024:.0f} KB')
+    elif args.command == 'benchmark':
+        for result in benchmark(args.sizes, args.chunk_rows, args.workdir):
+            print(
+                f"{result['rows']:>12,} rows ({result['file_mb']:>7.1f} MB): peak RSS {result['peak_rss_mb']:7.1f} MB, "
+                f"{result['rows_per_second']:>9,} rows/s, state {result['state_kb']:.0f} KB"
+            )
+    else:
+        print(json.dumps(_measure(args.csv, args.chunk_rows)))
+
+
+if __name__ == '__main__':
+    main()
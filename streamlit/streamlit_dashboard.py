@@ -2,13 +2,57 @@ import streamlit as st
 import streamlit.components.v1 as components
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
+import io
+import os
 import warnings
+import data_snapshot
+from PIL import Image
+from figure_cache import FigureCache, normalize_state
+from box_summary import summarize_groups, summary_box_figure
+from density_grid import DENSITY_COLUMNS, axis_edges, bin_counts, density_figure
+from range_engine import CALCULATOR_COLUMNS
+from segment_sweep import SWEEP_PRESETS, engine_table, sweep_figure, table_ranges
+from segment_export import EXPORT_COLUMNS, FORMATS, export_file
+from churn_intervals import CONFIDENCE, churn_intervals, compare_intervals, with_intervals
+from risk_segments import SEGMENTS, RISK_RULES, compile_rules, summarize_segments
+from streaming_aggregates import DEFAULT_CHUNK_ROWS
+from live_data import DEFAULT_CHECK_SECONDS, DERIVED, LiveCustomers, LiveStreamState, per_row
+from memory_accounting import footprint, readout
+from rerun_sections import SectionTracker
+from section_profiler import DEFAULT_LOG, SectionProfiler, count_execution
+from churn_model import ChurnModel, latest_model_path
+from stat_tests import TEST_CATEGORICALS, TEST_NUMERICS, run_tests
+from cold_start import WarmUp
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 warnings.filterwarnings('ignore')
 
+# CHURN_DATA_MODE=streaming folds the customer file into aggregates chunk by
+# chunk instead of holding the table in memory
+streaming_mode = os.environ.get('CHURN_DATA_MODE', 'memory') == 'streaming'
+stream_chunk_rows = int(os.environ.get('CHURN_STREAM_CHUNK_ROWS', DEFAULT_CHUNK_ROWS))
+# CHURN_CLEANED_CSV and CHURN_SNAPSHOT_DIR point the dashboard at another customer file
+cleaned_csv = os.environ.get('CHURN_CLEANED_CSV', data_snapshot.CLEANED_CSV)
+snapshot_dir = os.environ.get('CHURN_SNAPSHOT_DIR', data_snapshot.SNAPSHOT_DIR)
+# CHURN_PROFILE=1 times every section and appends the results to CHURN_PROFILE_LOG
+profiling = os.environ.get('CHURN_PROFILE') == '1'
+profile_log = os.environ.get('CHURN_PROFILE_LOG', DEFAULT_LOG)
+# CHURN_MODEL selects a churn model artifact; the newest one in models/ by default
+model_path = os.environ.get('CHURN_MODEL') or latest_model_path()
+# CHURN_REFRESH_SECONDS is how often the CSV is checked for changes; 0 turns live refresh off
+refresh_seconds = float(os.environ.get('CHURN_REFRESH_SECONDS', DEFAULT_CHECK_SECONDS)) or None
+# CHURN_FAST_START=1 runs only the selected tab and loads the data and the
+# other tabs' results on background threads; switching tabs reruns the page
+fast_start = os.environ.get('CHURN_FAST_START') == '1'
+# CHURN_BOOTSTRAP_WORKERS spreads the bootstrap resamples behind churn-rate intervals over that many threads
+bootstrap_workers = int(os.environ.get('CHURN_BOOTSTRAP_WORKERS', 0))
+banner_path = "images/churn.jpg"
+# Streamlit scales wider images down to this width on every rerun
+banner_width = 1460
+
 # Set page configuration
 st.set_page_config(
     page_title="Bank Customer Churn Analysis",
@@ -17,18 +61,161 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Count this rerun; fragment reruns are logged by the sections they execute
+tracker = SectionTracker.for_session(st.session_state)
+tracker.begin_full_run()
+profiler = SectionProfiler.for_session(st.session_state, profiling, profile_log)
+profiler.begin_full_run()
+
+@contextmanager
+def section(name, inputs=None):
+    # Counted by the rerun tracker and timed by the profiler when enabled
+    with tracker.section(name, inputs), profiler.section(name):
+        yield
+
 # Load and prepare data
-@st.cache_data # Cache the data loading function to improve performance
-def load_data():
-    df = pd.read_csv('data/cleaned_data/bankchurners.csv')
-    # Create churn binary column
-    df['churn'] = df['customer_status'].apply(lambda x: 1 if x == 'Attrited Customer' else 0)
-    return df
+# Banner read and scaled down once per process instead of read from disk on every rerun
+@st.cache_resource
+def load_banner(path, mtime_ns, max_width):
+    with open(path, 'rb') as f:
+        banner = f.read()
+    image = Image.open(io.BytesIO(banner))
+    if image.width <= max_width:
+        return banner
+    image = image.convert('RGB').resize((max_width, round(image.height * max_width / image.width)), Image.LANCZOS)
+    resized = io.BytesIO()
+    image.save(resized, format='JPEG', quality=85, optimize=True, progressive=True)
+    return resized.getvalue()
+
+# Background warm-up threads, started once per process
+@st.cache_resource
+def load_warm_up():
+    return WarmUp()
+
+# Churn model artifact, read once per process
+@st.cache_resource(show_spinner=False)
+def load_churn_model(path, mtime_ns):
+    return ChurnModel.load(path)
+
+# One live customer table per process, moved forward in place when the CSV changes
+@st.cache_resource(show_spinner=False)
+def load_live_customers(csv_path, snapshot_dir, _model, model_path, model_version):
+    count_execution('load_live_customers')
+    # Memory-mapped columnar snapshot plus the structures built from it; appended
+    # rows are folded into each of them instead of rebuilding from scratch
+    derived = dict(DERIVED, risk_codes=per_row(compile_rules(RISK_RULES)))
+    if _model is not None:
+        # Churn probability per customer, scored once per data version and model
+        derived['churn_scores'] = per_row(_model.score)
+    return LiveCustomers(csv_path, snapshot_dir, derived, refresh_seconds)
+
+# Streaming aggregates, folded forward in place when rows are appended to the file
+@st.cache_resource
+def load_live_stream_state(path, chunk_rows):
+    count_execution('load_live_stream_state')
+    return LiveStreamState(path, chunk_rows, refresh_seconds)
+
+# One figure cache per server process, shared by every session
+@st.cache_resource
+def load_figure_cache():
+    return FigureCache()
+
+# Thread pool for bootstrap resamples, shared by every session; None runs them inline
+@st.cache_resource
+def load_bootstrap_pool(workers):
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bootstrap') if workers else None
+
+def cached_figure_json(chart_id, state, build_figure):
+    # Serialized figure from the shared cache, built only on a miss
+    key = (data_version, normalize_state(state), chart_id)
+    build_json, timing = profiler.build_timer(lambda: build_figure().to_json())
+    figure_json = figure_cache.get_or_build(key, build_json)
+    profiler.chart(chart_id, len(figure_json), timing)
+    return figure_json
+
+def show_chart(chart_id, state, build_figure):
+    # A Figure rather than the parsed dict: st.plotly_chart rejects a dict with no traces
+    st.plotly_chart(pio.from_json(cached_figure_json(chart_id, state, build_figure)), width="stretch")
+
+# Chi-square, ANOVA and correlation results, run once per data version
+@st.cache_resource(show_spinner=False)
+def load_stat_tests(_df, data_version):
+    count_execution('load_stat_tests')
+    return run_tests(_df)
+
+# Cumulative count tables for the calculator sweep, per data version and counted ranges
+@st.cache_resource(max_entries=32)
+def load_sweep_table(_range_engine, data_version, columns, counted_ranges, gender):
+    count_execution('load_sweep_table')
+    return engine_table(_range_engine, list(columns), dict(counted_ranges), gender)
+
+# Group churn rates with bootstrap intervals, per data version, filter state, table and confidence
+@st.cache_resource(max_entries=64, show_spinner=False)
+def load_intervals(_summary, data_version, state, table_id, confidence, _executor):
+    count_execution('load_intervals')
+    return with_intervals(_summary, confidence=confidence, executor=_executor)
 
-df = load_data()
+def interval_table(table_id, summary):
+    # `summary` must follow from the sidebar filters alone, which key the cached intervals
+    return profiler.cached_call(
+        'load_intervals', load_intervals,
+        summary, data_version, normalize_state(sidebar_state), table_id, CONFIDENCE, bootstrap_pool
+    )
+
+def load_model():
+    # Model scores need row-level data, so streaming mode shows observed churn only
+    if model_path and not streaming_mode:
+        return load_churn_model(model_path, os.stat(model_path).st_mtime_ns)
+    return None
+
+def live_customers_args(model):
+    return cleaned_csv, snapshot_dir, model, model_path, model.version if model else None
+
+warm_up = load_warm_up()
+if fast_start and not streaming_mode:
+    # The first session's data load starts now and the page chrome goes out meanwhile;
+    # data_loading below waits for the same cached load instead of starting another
+    warm_up.start('load_live_customers', lambda: load_live_customers(*live_customers_args(load_model())))
+
+# Page chrome is sent before the data is loaded, so the first paint does not wait for it
+with section('page_chrome'):
+    st.image(load_banner(banner_path, os.stat(banner_path).st_mtime_ns, banner_width), width='stretch')
+    st.title("🏦 Bank Customer Churn Analysis")
+
+with section('data_loading'):
+    # Loaders also run on warm-up threads, which have no page for a spinner, so the spinner is drawn here
+    with st.spinner("Loading churn model..."):
+        churn_model = load_model()
+    # Every section of this run reads the one version taken here; later runs see newer ones
+    if streaming_mode:
+        live_source = profiler.cached_call(
+            'load_live_stream_state', load_live_stream_state, cleaned_csv, stream_chunk_rows
+        )
+        stream_state = live_source.current()
+        data_version = stream_state.data_version
+        churn_cube = stream_state.cube
+        churn_scores = None
+    else:
+        with st.spinner("Loading customer data..."):
+            live_source = profiler.cached_call(
+                'load_live_customers', load_live_customers, *live_customers_args(churn_model)
+            )
+        customers = live_source.current()
+        df = customers.df
+        data_version = customers.data_version
+        filter_index = customers['filter_index']
+        churn_cube = customers['churn_cube']
+        range_engine = customers['range_engine']
+        risk_codes = customers['risk_codes']
+        churn_scores = customers['churn_scores'] if churn_model else None
+    figure_cache = load_figure_cache()
+    bootstrap_pool = load_bootstrap_pool(bootstrap_workers)
 
-# show the banner
-st.image("images/churn.jpg", width=2000)
+# Polls for a new data version and reruns the page when one is published
+@st.fragment(run_every=refresh_seconds)
+def data_version_watch(shown_version):
+    if live_source.current().data_version != shown_version:
+        st.rerun()
 
 # Sidebar for filters
 st.sidebar.title("🔍 Filter Options")
@@ -37,556 +224,919 @@ st.sidebar.title("🔍 Filter Options")
 st.sidebar.subheader("Demographic Filters")
 age_range = st.sidebar.slider(
     "Age Range",
-    min_value=int(df['age'].min()),
-    max_value=int(df['age'].max()),
-    value=(int(df['age'].min()), int(df['age'].max()))
+    min_value=int(min(churn_cube.domains['age'])),
+    max_value=int(max(churn_cube.domains['age'])),
+    value=(int(min(churn_cube.domains['age'])), int(max(churn_cube.domains['age'])))
 )
 
 income_filter = st.sidebar.multiselect(
     "Income Category",
-    options=df['income_category'].unique(),
-    default=df['income_category'].unique()
+    options=churn_cube.domains['income_category'],
+    default=churn_cube.domains['income_category']
 )
 
 marital_filter = st.sidebar.multiselect(
     "Marital Status",
-    options=df['marital_status'].unique(),
-    default=df['marital_status'].unique()
+    options=churn_cube.domains['marital_status'],
+    default=churn_cube.domains['marital_status']
 )
 
 # Behavioral filters
 st.sidebar.subheader("Behavioral Filters")
 utilization_filter = st.sidebar.multiselect(
     "Utilization Category",
-    options=df['utilization_cat'].unique(),
-    default=df['utilization_cat'].unique()
+    options=churn_cube.domains['utilization_cat'],
+    default=churn_cube.domains['utilization_cat']
 )
 
 card_filter = st.sidebar.multiselect(
     "Card Category",
-    options=df['card_category'].unique(),
-    default=df['card_category'].unique()
+    options=churn_cube.domains['card_category'],
+    default=churn_cube.domains['card_category']
 )
 
-# Apply filters
-filtered_df = df[
-    (df['age'].between(age_range[0], age_range[1])) &
-    (df['income_category'].isin(income_filter)) &
-    (df['marital_status'].isin(marital_filter)) &
-    (df['utilization_cat'].isin(utilization_filter)) &
-    (df['card_category'].isin(card_filter))
-]
+# Apply filters through the bitmap index; metrics and group charts come from the cube
+sidebar_filters = {
+    'income_category': income_filter,
+    'marital_status': marital_filter,
+    'utilization_cat': utilization_filter,
+    'card_category': card_filter,
+}
+sidebar_state = {'age_range': age_range, **sidebar_filters}
+profiler.set_filters(sidebar_state)
+with section('sidebar_filters', sidebar_state):
+    selection = None if streaming_mode else filter_index.select(age_range, sidebar_filters)
+    cube_slice = churn_cube.slice(age_range, sidebar_filters)
 
 # Main dashboard
-st.title("🏦 Bank Customer Churn Analysis")
+data_version_watch(data_version)
+if streaming_mode:
+    # The aggregates keep no customer rows; every view that needs them says so where it would be
+    st.info(
+        "Streaming mode: metrics, group churn rates and risk segments follow the sidebar filters, but the "
+        "Behavioral Patterns box plots summarize every customer, and the Churn Calculator, statistical tests, "
+        "churn density grid, model churn scores and customer exports are unavailable."
+    )
 st.markdown("---")
 
 # Key Metrics
-col1, col2, col3, col4 = st.columns(4)
+with section('key_metrics', sidebar_state):
+    col1, col2, col3, col4 = st.columns(4)
 
-with col1:
-    total_customers = len(filtered_df)
-    st.metric("Total Customers", total_customers)
+    with col1:
+        total_customers = cube_slice.count
+        st.metric("Total Customers", total_customers)
 
-with col2:
-    churn_rate = filtered_df['churn'].mean() * 100
-    st.metric("Churn Rate", f"{churn_rate:.1f}%")
+    with col2:
+        churn_rate = cube_slice.mean('churn') * 100
+        st.metric("Churn Rate", f"{churn_rate:.1f}%")
 
-with col3:
-    avg_age = filtered_df['age'].mean()
-    st.metric("Average Age", f"{avg_age:.1f} years")
+    with col3:
+        avg_age = cube_slice.mean('age')
+        st.metric("Average Age", f"{avg_age:.1f} years")
 
-with col4:
-    avg_utilization = filtered_df['avg_utilization_ratio'].mean() * 100
-    st.metric("Avg Utilization", f"{avg_utilization:.1f}%")
+    with col4:
+        avg_utilization = cube_slice.mean('avg_utilization_ratio') * 100
+        st.metric("Avg Utilization", f"{avg_utilization:.1f}%")
 
-st.markdown("---")
+    st.markdown("---")
 
 # Descriptive Statistics Section
 st.header("📊 Descriptive Statistics")
 
-tab1, tab2, tab3, tab4, tab5 = st.tabs(["Churn Overview", "Demographic Analysis", "Behavioral Patterns", "Churn Calculator", "PowerBI Dashboard"])
+# In fast-start mode only the selected tab runs (the others have open=False) and opening one reruns the page
+tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(
+    ["Churn Overview", "Demographic Analysis", "Behavioral Patterns", "Churn Calculator", "Statistics", "PowerBI Dashboard"],
+    key="main_tabs", on_change="rerun" if fast_start else "ignore"
+)
 
-with tab1:
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        # Churn by Income
-        churn_income = filtered_df.groupby('income_category')['churn'].mean().reset_index()
-        fig_income = px.bar(
-            churn_income,
-            x='income_category',
-            y='churn',
-            title='Churn Rate by Income Category',
-            color='churn',
-            color_continuous_scale='RdYlGn_r'
-        )
-        fig_income.update_layout(xaxis_title='Income Category', yaxis_title='Churn Rate')
-        st.plotly_chart(fig_income, use_container_width=True)
-    
-    with col2:
-        # Churn by Age Bracket
-        churn_age = filtered_df.groupby('age_bracket')['churn'].mean().reset_index()
-        fig_age = px.bar(
-            churn_age,
-            x='age_bracket',
-            y='churn',
-            title='Churn Rate by Age Bracket',
-            color='churn',
-            color_continuous_scale='RdYlGn_r'
-        )
-        fig_age.update_layout(xaxis_title='Age Bracket', yaxis_title='Churn Rate')
-        st.plotly_chart(fig_age, use_container_width=True)
+def tab_runs(tab):
+    return tab.open is not False
 
-with tab2:
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        # Churn by Education
-        churn_edu = filtered_df.groupby('education_level')['churn'].mean().reset_index()
-        fig_edu = px.bar(
-            churn_edu,
-            x='education_level',
-            y='churn',
-            title='Churn Rate by Education Level',
-            color='churn',
-            color_continuous_scale='RdYlGn_r'
-        )
-        fig_edu.update_layout(xaxis_title='Education Level', yaxis_title='Churn Rate')
-        st.plotly_chart(fig_edu, use_container_width=True)
-    
-    with col2:
-        # Churn by Marital Status
-        churn_marital = filtered_df.groupby('marital_status')['churn'].mean().reset_index()
-        fig_marital = px.bar(
-            churn_marital,
-            x='marital_status',
-            y='churn',
-            title='Churn Rate by Marital Status',
-            color='churn',
-            color_continuous_scale='RdYlGn_r'
-        )
-        fig_marital.update_layout(xaxis_title='Marital Status', yaxis_title='Churn Rate')
-        st.plotly_chart(fig_marital, use_container_width=True)
+def segment_download(key, selected_rows, file_stem):
+    # The file is written only when the button is clicked, chunk by chunk from the shared table
+    # and the segment's row positions, to a temporary file Streamlit reads; reruns just redraw the controls
+    extra_columns = ['risk_segment'] + (['churn_score'] if churn_scores is not None else [])
+    col1, col2, col3 = st.columns([3, 1, 1])
+    columns = col1.multiselect(
+        "Columns to export", [*df.columns, *extra_columns], default=[*EXPORT_COLUMNS, *extra_columns], key=f"{key}_columns"
+    )
+    risk_filter = col2.multiselect("Risk segments", SEGMENTS, default=SEGMENTS, key=f"{key}_risk")
+    file_format = col3.radio("Format", list(FORMATS), horizontal=True, key=f"{key}_format")
+    extension, mime = FORMATS[file_format]
 
-with tab3:
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        # Utilization vs Churn
-        fig_util = px.box(
-            filtered_df,
-            x='churn',
-            y='avg_utilization_ratio',
-            color='churn',
-            title='Utilization Ratio vs Churn Status'
-        )
-        st.plotly_chart(fig_util, use_container_width=True)
-    
-    with col2:
-        # Months Inactive vs Churn
-        fig_inactive = px.box(
-            filtered_df,
-            x='churn',
-            y='months_inactive_12_mon',
-            color='churn',
-            title='Months Inactive vs Churn Status'
-        )
-        st.plotly_chart(fig_inactive, use_container_width=True)
-    
-    # Additional behavioral charts
-    col3, col4 = st.columns(2)
-    
-    with col3:
-        # Transaction count vs Churn
-        fig_trans = px.box(
-            filtered_df,
-            x='churn',
-            y='total_trans_ct',
-            color='churn',
-            title='Transaction Count vs Churn Status'
-        )
-        st.plotly_chart(fig_trans, use_container_width=True)
-    
-    with col4:
-        # Number of products vs Churn
-        fig_products = px.box(
-            filtered_df,
-            x='churn',
-            y='no_of_products',
-            color='churn',
-            title='Number of Products vs Churn Status'
-        )
-        st.plotly_chart(fig_products, use_container_width=True)
+    def build_export():
+        rows = selected_rows()
+        if len(risk_filter) < len(SEGMENTS):
+            rows = rows[np.isin(risk_codes[rows], [SEGMENTS.index(segment) for segment in risk_filter])]
+        arrays = {'risk_segment': pd.Categorical.from_codes(risk_codes, SEGMENTS)}
+        if churn_scores is not None:
+            arrays['churn_score'] = churn_scores
+        return export_file(df, rows, columns, extension, arrays=arrays)
 
-with tab4:
-    st.subheader("🏦 Bank Customer Churn Analyzer")
-    st.markdown("Adjust the sliders to filter customers and see the churn percentage for that segment.")
-    
-    # Display dataset info
-    total_customers = len(df)
-    total_churned = df['churn'].sum()
-    overall_churn_rate = (total_churned / total_customers) * 100
-    
-    st.sidebar.header("📊 Dataset Overview")
-    st.sidebar.metric("Total Customers", f"{total_customers:,}")
-    st.sidebar.metric("Churned Customers", f"{total_churned:,}")
-    st.sidebar.metric("Overall Churn Rate", f"{overall_churn_rate:.1f}%")
-    
-    # Get min and max values for sliders
-    utilization_min, utilization_max = 0.0, 1.0
-    months_inactive_min, months_inactive_max = df['months_inactive_12_mon'].min(), df['months_inactive_12_mon'].max()
-    contacts_min, contacts_max = df['contacts_count_12_mon'].min(), df['contacts_count_12_mon'].max()
-    products_min, products_max = df['no_of_products'].min(), df['no_of_products'].max()
-    trans_count_min, trans_count_max = df['total_trans_ct'].min(), df['total_trans_ct'].max()
-    trans_amt_min, trans_amt_max = df['total_trans_amt'].min(), df['total_trans_amt'].max()
-    age_min, age_max = df['age'].min(), df['age'].max()
-    credit_min, credit_max = df['credit_limit'].min(), df['credit_limit'].max()
-    
-    st.subheader("🔧 Filter Customers")
-    
-    # Create two columns for sliders
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.write("**Usage Patterns**")
+    st.download_button(
+        f"⬇️ Download {file_format}", data=build_export, file_name=f"{file_stem}.{extension}", mime=mime,
+        on_click="ignore", disabled=not columns, key=f"{key}_download"
+    )
+
+with tab1:
+    if tab_runs(tab1):
+        with section('churn_overview', sidebar_state):
+            col1, col2 = st.columns(2)
         
-        utilization_range = st.slider(
-            "Average Utilization Ratio",
-            min_value=float(utilization_min),
-            max_value=float(utilization_max),
-            value=(0.0, 1.0),
-            step=0.01,
-            help="Filter by credit utilization ratio"
-        )
+            with col1:
+                # Churn by Income
+                def build_income_chart():
+                    churn_income = interval_table('income_category', cube_slice.group_summary('income_category', ['churn'])).reset_index()
+                    fig_income = px.bar(
+                        churn_income,
+                        x='income_category',
+                        y='churn',
+                        title='Churn Rate by Income Category',
+                        color='churn',
+                        color_continuous_scale='RdYlGn_r',
+                        error_y='error_plus',
+                        error_y_minus='error_minus'
+                    )
+                    fig_income.update_layout(xaxis_title='Income Category', yaxis_title='Churn Rate')
+                    return fig_income
+                show_chart('churn_by_income', sidebar_state, build_income_chart)
         
-        months_inactive_range = st.slider(
-            "Months Inactive (12 months)",
-            min_value=int(months_inactive_min),
-            max_value=int(months_inactive_max),
-            value=(int(months_inactive_min), int(months_inactive_max)),
-            step=1,
-            help="Filter by number of inactive months"
-        )
+            with col2:
+                # Churn by Age Bracket
+                def build_age_chart():
+                    churn_age = interval_table('age_bracket', cube_slice.group_summary('age_bracket', ['churn'])).reset_index()
+                    fig_age = px.bar(
+                        churn_age,
+                        x='age_bracket',
+                        y='churn',
+                        title='Churn Rate by Age Bracket',
+                        color='churn',
+                        color_continuous_scale='RdYlGn_r',
+                        error_y='error_plus',
+                        error_y_minus='error_minus'
+                    )
+                    fig_age.update_layout(xaxis_title='Age Bracket', yaxis_title='Churn Rate')
+                    return fig_age
+                show_chart('churn_by_age_bracket', sidebar_state, build_age_chart)
+
+with tab2:
+    if tab_runs(tab2):
+        with section('demographic_analysis', sidebar_state):
+            col1, col2 = st.columns(2)
         
-        contacts_range = st.slider(
-            "Contacts Count (12 months)",
-            min_value=int(contacts_min),
-            max_value=int(contacts_max),
-            value=(int(contacts_min), int(contacts_max)),
-            step=1,
-            help="Filter by number of bank contacts"
-        )
+            with col1:
+                # Churn by Education
+                def build_edu_chart():
+                    churn_edu = interval_table('education_level', cube_slice.group_summary('education_level', ['churn'])).reset_index()
+                    fig_edu = px.bar(
+                        churn_edu,
+                        x='education_level',
+                        y='churn',
+                        title='Churn Rate by Education Level',
+                        color='churn',
+                        color_continuous_scale='RdYlGn_r',
+                        error_y='error_plus',
+                        error_y_minus='error_minus'
+                    )
+                    fig_edu.update_layout(xaxis_title='Education Level', yaxis_title='Churn Rate')
+                    return fig_edu
+                show_chart('churn_by_education', sidebar_state, build_edu_chart)
         
-        products_range = st.slider(
-            "Number of Products",
-            min_value=int(products_min),
-            max_value=int(products_max),
-            value=(int(products_min), int(products_max)),
-            step=1,
-            help="Filter by number of bank products used"
-        )
-    
-    with col2:
-        st.write("**Transaction & Demographic**")
+            with col2:
+                # Churn by Marital Status
+                def build_marital_chart():
+                    churn_marital = interval_table('marital_status', cube_slice.group_summary('marital_status', ['churn'])).reset_index()
+                    fig_marital = px.bar(
+                        churn_marital,
+                        x='marital_status',
+                        y='churn',
+                        title='Churn Rate by Marital Status',
+                        color='churn',
+                        color_continuous_scale='RdYlGn_r',
+                        error_y='error_plus',
+                        error_y_minus='error_minus'
+                    )
+                    fig_marital.update_layout(xaxis_title='Marital Status', yaxis_title='Churn Rate')
+                    return fig_marital
+                show_chart('churn_by_marital_status', sidebar_state, build_marital_chart)
+
+# The box plot toggle and debug checkbox rerun only this tab
+@st.fragment
+def behavioral_patterns(selection, sidebar_state):
+    with section('behavioral_patterns', sidebar_state):
+        if streaming_mode:
+            # Only the per-churn value sketches exist, so these boxes cover every customer
+            st.caption("Streaming mode: box plots summarize the whole customer base; sidebar filters do not apply.")
+            summarize_boxes = True
+            box_state = {}
+        else:
+            summarize_boxes = st.toggle(
+                "Summarize box plots on the server",
+                value=True,
+                help="Send precomputed quartiles, whiskers and a sample of outliers instead of every filtered customer"
+            )
+            box_state = sidebar_state
         
-        trans_count_range = st.slider(
-            "Transaction Count",
-            min_value=int(trans_count_min),
-            max_value=int(trans_count_max),
-            value=(int(trans_count_min), int(trans_count_max)),
-            step=1,
-            help="Filter by total number of transactions"
-        )
+        def build_raw_box(column, title):
+            # Only the two plotted columns are materialized for the selection
+            return lambda: px.box(
+                selection.frame(['churn', column]),
+                x='churn',
+                y=column,
+                color='churn',
+                title=title
+            )
         
-        trans_amt_range = st.slider(
-            "Total Transaction Amount ($)",
-            min_value=int(trans_amt_min),
-            max_value=int(trans_amt_max),
-            value=(int(trans_amt_min), int(trans_amt_max)),
-            step=100,
-            help="Filter by total transaction amount"
-        )
+        def build_summary_box(column, title):
+            if streaming_mode:
+                return lambda: summary_box_figure(stream_state.box_summaries(column), column, title)
+            return lambda: summary_box_figure(
+                summarize_groups(selection.values(column), selection.values('churn')),
+                column,
+                title
+            )
         
-        age_range = st.slider(
-            "Age",
-            min_value=int(age_min),
-            max_value=int(age_max),
-            value=(int(age_min), int(age_max)),
-            step=1,
-            help="Filter by customer age"
-        )
+        def box_chart(chart_id, column, title):
+            # Precomputed boxes keep the payload constant; raw boxes ship every filtered row
+            if summarize_boxes:
+                show_chart(f'{chart_id}_summary', box_state, build_summary_box(column, title))
+            else:
+                show_chart(chart_id, box_state, build_raw_box(column, title))
         
-        credit_range = st.slider(
-            "Credit Limit ($)",
-            min_value=int(credit_min),
-            max_value=int(credit_max),
-            value=(int(credit_min), int(credit_max)),
-            step=500,
-            help="Filter by credit limit"
-        )
+        box_charts = [
+            ('utilization_box', 'avg_utilization_ratio', 'Utilization Ratio vs Churn Status'),
+            ('months_inactive_box', 'months_inactive_12_mon', 'Months Inactive vs Churn Status'),
+            ('transaction_count_box', 'total_trans_ct', 'Transaction Count vs Churn Status'),
+            ('products_box', 'no_of_products', 'Number of Products vs Churn Status'),
+        ]
         
-        gender_filter = st.selectbox(
-            "Gender",
-            options=["All", "Male", "Female"],
-            index=0,
-            help="Filter by gender"
-        )
-    
-    # Calculate button
-    if st.button("📊 Calculate Churn Percentage", type="primary", use_container_width=True):
+        if not streaming_mode and len(selection) == 0:
+            st.info("No customers match the sidebar filters, so there are no box plots to draw.")
+        else:
+            col1, col2 = st.columns(2)
         
-        # Apply filters
-        filtered_df = df.copy()
+            with col1:
+                # Utilization vs Churn
+                box_chart(*box_charts[0])
         
-        # Apply range filters
-        filters = {
-            'avg_utilization_ratio': utilization_range,
-            'months_inactive_12_mon': months_inactive_range,
-            'contacts_count_12_mon': contacts_range,
-            'no_of_products': products_range,
-            'total_trans_ct': trans_count_range,
-            'total_trans_amt': trans_amt_range,
-            'age': age_range,
-            'credit_limit': credit_range
-        }
+            with col2:
+                # Months Inactive vs Churn
+                box_chart(*box_charts[1])
         
-        for column, (min_val, max_val) in filters.items():
-            filtered_df = filtered_df[
-                (filtered_df[column] >= min_val) & 
-                (filtered_df[column] <= max_val)
-            ]
+            # Additional behavioral charts
+            col3, col4 = st.columns(2)
         
-        # Apply gender filter
-        if gender_filter != "All":
-            # Assuming gender is stored as 'M' and 'F' in your dataframe
-            gender_map = {"Male": "M", "Female": "F"}
-            filtered_df = filtered_df[filtered_df['gender'] == gender_map[gender_filter]]
+            with col3:
+                # Transaction count vs Churn
+                box_chart(*box_charts[2])
         
-        # Calculate results
-        segment_size = len(filtered_df)
+            with col4:
+                # Number of products vs Churn
+                box_chart(*box_charts[3])
+
+        st.markdown("#### 🗺️ Churn Density")
+        if streaming_mode:
+            st.info("Streaming mode keeps no customer rows, so the density grid is unavailable.")
+        else:
+            col5, col6, col7 = st.columns(3)
+            x_column = col5.selectbox("X axis", DENSITY_COLUMNS, index=DENSITY_COLUMNS.index('total_trans_ct'))
+            y_column = col6.selectbox("Y axis", DENSITY_COLUMNS, index=DENSITY_COLUMNS.index('avg_utilization_ratio'))
+            color_by = col7.radio("Color by", ["Churn rate", "Customers"], horizontal=True)
+
+            def build_density_chart():
+                # Bin edges span the whole table, so the grid stays put as the filters change
+                x_edges = axis_edges(df[x_column].to_numpy())
+                y_edges = axis_edges(df[y_column].to_numpy())
+                customers_per_cell, churned_per_cell = bin_counts(
+                    selection.values(x_column), selection.values(y_column), selection.values('churn'),
+                    x_edges, y_edges
+                )
+                return density_figure(
+                    x_edges, y_edges, customers_per_cell, churned_per_cell, x_column, y_column,
+                    color='churn_rate' if color_by == "Churn rate" else 'customers'
+                )
+
+            density_state = {**sidebar_state, 'x': x_column, 'y': y_column, 'color': color_by}
+            show_chart('churn_density', density_state, build_density_chart)
+            st.caption(
+                f"Binned on the server from {len(selection):,} customers; only the grid is sent to the browser. "
+                "Hover a cell for its customer count and churn rate."
+            )
+
+        if not streaming_mode:
+            with st.expander("🛠️ Box plot payload (debug)"):
+                if st.checkbox("Measure payload size", help="Builds both versions of each box plot for the current filters"):
+                    payload = pd.DataFrame([
+                        {
+                            'chart': title,
+                            'raw bytes': len(cached_figure_json(chart_id, sidebar_state, build_raw_box(column, title))),
+                            'summary bytes': len(cached_figure_json(
+                                f'{chart_id}_summary', sidebar_state, build_summary_box(column, title)
+                            )),
+                        }
+                        for chart_id, column, title in box_charts
+                    ])
+                    st.dataframe(payload, hide_index=True, width="stretch")
+                    st.caption(f"Segment size: {len(selection):,} customers")
+            # The fragment keeps `selection` for its reruns; keep only the bitmap
+            selection.release()
+
+
+with tab3:
+    if tab_runs(tab3):
+        behavioral_patterns(selection, sidebar_state)
+
+
+# Calculator widgets rerun only this tab
+@st.fragment
+def churn_calculator(total_customers, overall_churn_rate):
+    with section('churn_calculator'):
+        st.subheader("🏦 Bank Customer Churn Analyzer")
+        st.markdown("Adjust the sliders to filter customers and see the churn percentage for that segment update live.")
         
-        if segment_size > 0:
-            churn_count = filtered_df['churn'].sum()
-            churn_percentage = (churn_count / segment_size) * 100
+        if streaming_mode:
+            st.info("The Churn Calculator needs row-level data and is not available in streaming mode.")
+        else:
+            # Get min and max values for sliders from the sorted indexes instead of scanning columns
+            utilization_min, utilization_max = 0.0, 1.0
+            months_inactive_min, months_inactive_max = range_engine.bounds('months_inactive_12_mon')
+            contacts_min, contacts_max = range_engine.bounds('contacts_count_12_mon')
+            products_min, products_max = range_engine.bounds('no_of_products')
+            trans_count_min, trans_count_max = range_engine.bounds('total_trans_ct')
+            trans_amt_min, trans_amt_max = range_engine.bounds('total_trans_amt')
+            age_min, age_max = range_engine.bounds('age')
+            credit_min, credit_max = range_engine.bounds('credit_limit')
             
-            # Display results
-            st.subheader("📈 Results")
+            st.subheader("🔧 Filter Customers")
             
-            col1, col2, col3 = st.columns(3)
+            # Create two columns for sliders
+            col1, col2 = st.columns(2)
             
             with col1:
-                st.metric(
-                    "Segment Size",
-                    f"{segment_size:,}",
-                    f"{((segment_size/total_customers)*100):.1f}% of total"
+                st.write("**Usage Patterns**")
+                
+                utilization_range = st.slider(
+                    "Average Utilization Ratio",
+                    min_value=float(utilization_min),
+                    max_value=float(utilization_max),
+                    value=(0.0, 1.0),
+                    step=0.01,
+                    help="Filter by credit utilization ratio"
+                )
+                
+                months_inactive_range = st.slider(
+                    "Months Inactive (12 months)",
+                    min_value=int(months_inactive_min),
+                    max_value=int(months_inactive_max),
+                    value=(int(months_inactive_min), int(months_inactive_max)),
+                    step=1,
+                    help="Filter by number of inactive months"
+                )
+                
+                contacts_range = st.slider(
+                    "Contacts Count (12 months)",
+                    min_value=int(contacts_min),
+                    max_value=int(contacts_max),
+                    value=(int(contacts_min), int(contacts_max)),
+                    step=1,
+                    help="Filter by number of bank contacts"
+                )
+                
+                products_range = st.slider(
+                    "Number of Products",
+                    min_value=int(products_min),
+                    max_value=int(products_max),
+                    value=(int(products_min), int(products_max)),
+                    step=1,
+                    help="Filter by number of bank products used"
                 )
             
             with col2:
-                st.metric(
-                    "Churn Count",
-                    f"{churn_count:,}"
+                st.write("**Transaction & Demographic**")
+                
+                trans_count_range = st.slider(
+                    "Transaction Count",
+                    min_value=int(trans_count_min),
+                    max_value=int(trans_count_max),
+                    value=(int(trans_count_min), int(trans_count_max)),
+                    step=1,
+                    help="Filter by total number of transactions"
                 )
-            
-            with col3:
-                st.metric(
-                    "Churn Percentage",
-                    f"{churn_percentage:.1f}%",
-                    f"{churn_percentage - overall_churn_rate:+.1f}% vs overall"
+                
+                trans_amt_range = st.slider(
+                    "Total Transaction Amount ($)",
+                    min_value=int(trans_amt_min),
+                    max_value=int(trans_amt_max),
+                    value=(int(trans_amt_min), int(trans_amt_max)),
+                    step=100,
+                    help="Filter by total transaction amount"
+                )
+                
+                age_range = st.slider(
+                    "Age",
+                    min_value=int(age_min),
+                    max_value=int(age_max),
+                    value=(int(age_min), int(age_max)),
+                    step=1,
+                    help="Filter by customer age"
+                )
+                
+                credit_range = st.slider(
+                    "Credit Limit ($)",
+                    min_value=int(credit_min),
+                    max_value=int(credit_max),
+                    value=(int(credit_min), int(credit_max)),
+                    step=500,
+                    help="Filter by credit limit"
+                )
+                
+                gender_filter = st.selectbox(
+                    "Gender",
+                    options=["All", "Male", "Female"],
+                    index=0,
+                    help="Filter by gender"
                 )
             
-            # Risk assessment
-            st.subheader("🎯 Risk Assessment")
-            if churn_percentage < overall_churn_rate - 5:
-                st.success(f"✅ Below Average Risk ({(overall_churn_rate - churn_percentage):.1f}% lower than overall average)")
-            elif churn_percentage > overall_churn_rate + 5:
-                st.error(f"🔴 Above Average Risk ({(churn_percentage - overall_churn_rate):.1f}% higher than overall average)")
+            # Range filters for the calculator columns
+            filters = {
+                'avg_utilization_ratio': utilization_range,
+                'months_inactive_12_mon': months_inactive_range,
+                'contacts_count_12_mon': contacts_range,
+                'no_of_products': products_range,
+                'total_trans_ct': trans_count_range,
+                'total_trans_amt': trans_amt_range,
+                'age': age_range,
+                'credit_limit': credit_range
+            }
+            
+            # Gender is stored as 'M' and 'F' in the dataframe
+            gender_map = {"Male": "M", "Female": "F"}
+            
+            # Count the segment through the range engine; rows are materialized only for the model scores
+            if churn_scores is not None:
+                segment_rows = range_engine.rows(filters, gender_map.get(gender_filter))
+                segment_size, churn_count = range_engine.count_rows(segment_rows)
+                if segment_size > 0:
+                    expected_percentage = churn_scores[segment_rows].mean() * 100
             else:
-                st.warning(f"⚠️ Average Risk (Close to overall average of {overall_churn_rate:.1f}%)")
+                segment_size, churn_count = range_engine.count(filters, gender_map.get(gender_filter))
             
-            # Show filter summary
-            with st.expander("🔍 View Filter Summary"):
-                st.write("**Applied Filters:**")
-                for column, (min_val, max_val) in filters.items():
-                    st.write(f"- {column.replace('_', ' ').title()}: {min_val} to {max_val}")
-                if gender_filter != "All":
-                    st.write(f"- Gender: {gender_filter}")
+            if segment_size > 0:
+                churn_percentage = (churn_count / segment_size) * 100
                 
-                st.write(f"\n**Segment represents {segment_size/total_customers*100:.1f}% of total customers**")
-        
-        else:
-            st.warning("⚠️ No customers match the selected filters. Please adjust your criteria.")
+                # Display results
+                st.subheader("📈 Results")
+                
+                if churn_scores is not None:
+                    col1, col2, col3, col4 = st.columns(4)
+                else:
+                    col1, col2, col3 = st.columns(3)
+                    col4 = None
+                
+                with col1:
+                    st.metric(
+                        "Segment Size",
+                        f"{segment_size:,}",
+                        f"{((segment_size/total_customers)*100):.1f}% of total"
+                    )
+                
+                with col2:
+                    st.metric(
+                        "Churn Count",
+                        f"{churn_count:,}"
+                    )
+                
+                with col3:
+                    st.metric(
+                        "Churn Percentage",
+                        f"{churn_percentage:.1f}%",
+                        f"{churn_percentage - overall_churn_rate:+.1f}% vs overall"
+                    )
+                
+                if col4 is not None:
+                    with col4:
+                        st.metric(
+                            "Model Expected Churn",
+                            f"{expected_percentage:.1f}%",
+                            f"{expected_percentage - churn_percentage:+.1f}% vs observed",
+                            delta_color="off",
+                            help=f"Mean churn probability from churn model v{churn_model.version}"
+                        )
+                
+                # Risk assessment: the segment differs from the overall rate only when their
+                # confidence intervals do not overlap, so small segments need a wider gap
+                st.subheader("🎯 Risk Assessment")
+                segment_interval, overall_interval = churn_intervals(
+                    [churn_count, round(overall_churn_rate * total_customers / 100)], [segment_size, total_customers],
+                    executor=bootstrap_pool
+                ).itertuples()
+                risk_verdict = compare_intervals(
+                    segment_interval.low, segment_interval.high, overall_interval.low, overall_interval.high
+                )
+                interval_text = (
+                    f"{CONFIDENCE:.0%} interval {segment_interval.low * 100:.1f}% to {segment_interval.high * 100:.1f}%"
+                )
+                if risk_verdict == 'below':
+                    st.success(f"✅ Below Average Risk ({(overall_churn_rate - churn_percentage):.1f}% lower than overall average; {interval_text})")
+                elif risk_verdict == 'above':
+                    st.error(f"🔴 Above Average Risk ({(churn_percentage - overall_churn_rate):.1f}% higher than overall average; {interval_text})")
+                else:
+                    st.warning(f"⚠️ Average Risk (Close to overall average of {overall_churn_rate:.1f}%; {interval_text} overlaps it)")
+                st.caption(
+                    f"Interval from {'a bootstrap of the segment' if segment_interval.method == 'bootstrap' else 'the Wilson score formula'}; "
+                    f"the overall rate's is {overall_interval.low * 100:.1f}% to {overall_interval.high * 100:.1f}%."
+                )
+                
+                # Show filter summary
+                with st.expander("🔍 View Filter Summary"):
+                    st.write("**Applied Filters:**")
+                    for column, (min_val, max_val) in filters.items():
+                        st.write(f"- {column.replace('_', ' ').title()}: {min_val} to {max_val}")
+                    if gender_filter != "All":
+                        st.write(f"- Gender: {gender_filter}")
+                    
+                    st.write(f"\n**Segment represents {segment_size/total_customers*100:.1f}% of total customers**")
+
+                # Sweep two columns across their slider ranges; the other sliders and gender still apply
+                st.subheader("🔥 Churn Rate Sweep")
+                sweep_choice = st.selectbox("Sweep", [*SWEEP_PRESETS, "Custom"])
+                if sweep_choice == "Custom":
+                    col5, col6 = st.columns(2)
+                    x_column = col5.selectbox("Sweep across", CALCULATOR_COLUMNS)
+                    y_column = col6.selectbox("Sweep down", [column for column in CALCULATOR_COLUMNS if column != x_column])
+                else:
+                    x_column, y_column = SWEEP_PRESETS[sweep_choice]
+                # Moving a swept slider reuses the table unless that column's axis is binned
+                counted_ranges = tuple(
+                    (column, tuple(bounds)) for column, bounds in table_ranges(range_engine, (x_column, y_column), filters).items()
+                )
+                sweep_table = profiler.cached_call(
+                    'load_sweep_table', load_sweep_table, range_engine, data_version,
+                    (x_column, y_column), counted_ranges, gender_map.get(gender_filter)
+                )
+                sweep_ranges = {x_column: filters[x_column], y_column: filters[y_column]}
+                labels, lows, highs = sweep_table.grid(sweep_ranges)
+                if len(lows) == 0:
+                    st.info(f"No {x_column} or {y_column} values fall within the selected ranges, so there is nothing to sweep.")
+                else:
+                    sweep_sizes, sweep_churned = sweep_table.evaluate(lows, highs)
+                    show_chart(
+                        'churn_sweep', {**filters, 'gender': gender_filter, 'sweep': (x_column, y_column)},
+                        lambda: sweep_figure(
+                            labels, sweep_sizes, sweep_churned, x_column, y_column, overall_churn_rate / 100
+                        )
+                    )
+                    st.caption(
+                        f"{len(sweep_sizes)} segments evaluated in one pass over cumulative counts of the "
+                        f"{sweep_table.rows:,} customers matching the other filters."
+                    )
+
+                st.subheader("📤 Export Segment")
+                segment_download(
+                    "calculator_export", lambda: range_engine.rows(filters, gender_map.get(gender_filter)), "churn_segment"
+                )
+            
+            else:
+                st.warning("⚠️ No customers match the selected filters. Please adjust your criteria.")
+
+        # Add some insights
+        with st.expander("💡 How to interpret results"):
+            st.markdown("""
+            **Understanding Churn Percentage:**
+            - This shows the percentage of customers who churned **within your selected filters**
+            - Compare against the overall churn rate to see if your segment is higher/lower risk
+            - The risk verdict compares confidence intervals, so a small segment needs a larger gap to count as higher/lower risk
+            
+            **Common Patterns to Explore:**
+            - High utilization + low transactions = Higher risk
+            - Many inactive months = Higher risk  
+            - Few products + high contacts = Higher risk
+            - Low credit limit + high utilization = Higher risk
+            
+            **Usage Tips:**
+            - Start with broad ranges to see baseline churn
+            - Narrow down ranges to identify high-risk segments
+            - Compare different combinations to find patterns
+            """)
+
+
+with tab4:
+    # Display dataset info; sidebar elements cannot be written from inside a fragment
+    total_customers = int(churn_cube.totals[0])
+    total_churned = int(churn_cube.totals[1])
+    overall_churn_rate = (total_churned / total_customers) * 100
     
-    # Add some insights
-    with st.expander("💡 How to interpret results"):
-        st.markdown("""
-        **Understanding Churn Percentage:**
-        - This shows the percentage of customers who churned **within your selected filters**
-        - Compare against the overall churn rate to see if your segment is higher/lower risk
-        
-        **Common Patterns to Explore:**
-        - High utilization + low transactions = Higher risk
-        - Many inactive months = Higher risk  
-        - Few products + high contacts = Higher risk
-        - Low credit limit + high utilization = Higher risk
-        
-        **Usage Tips:**
-        - Start with broad ranges to see baseline churn
-        - Narrow down ranges to identify high-risk segments
-        - Compare different combinations to find patterns
-        """)
+    st.sidebar.header("📊 Dataset Overview")
+    st.sidebar.metric("Total Customers", f"{total_customers:,}")
+    st.sidebar.metric("Churned Customers", f"{total_churned:,}")
+    st.sidebar.metric("Overall Churn Rate", f"{overall_churn_rate:.1f}%")
+    
+    if tab_runs(tab4):
+        churn_calculator(total_customers, overall_churn_rate)
+
+# The ANOVA column picker reruns only this tab
+@st.fragment
+def statistics_view():
+    with section('statistics'):
+        st.subheader("📐 Statistical Tests")
+        if streaming_mode:
+            st.info("Streaming mode keeps no customer rows, so the statistical tests are unavailable.")
+            return
+        st.caption("Tests cover the whole customer base for this data version; sidebar filters do not apply.")
+        with st.spinner("Running statistical tests..."):
+            results = profiler.cached_call('load_stat_tests', load_stat_tests, df, data_version)
+
+        st.markdown("**Chi-square: categorical columns vs churn**")
+        st.dataframe(
+            results['chi_square'].style.format({'chi2': '{:.2f}', 'p_value': '{:.2e}', 'cramers_v': '{:.3f}'}),
+            width="stretch",
+            hide_index=True
+        )
+
+        st.markdown("**One-way ANOVA: numeric columns by category**")
+        def build_eta_chart():
+            eta = results['anova'].pivot(index='numeric', columns='categorical', values='eta_squared')
+            fig_eta = px.imshow(
+                eta.loc[TEST_NUMERICS, [c for c in TEST_CATEGORICALS if c in eta.columns]],
+                color_continuous_scale='Blues',
+                text_auto='.2f',
+                aspect='auto',
+                title='Effect size (eta squared) of each category on each numeric column'
+            )
+            fig_eta.update_layout(xaxis_title='Category', yaxis_title='Numeric column')
+            return fig_eta
+        show_chart('anova_eta_squared', {}, build_eta_chart)
+
+        anova_numeric = st.selectbox("ANOVA results for", ['All numeric columns'] + TEST_NUMERICS)
+        anova_table = results['anova']
+        if anova_numeric != 'All numeric columns':
+            anova_table = anova_table[anova_table['numeric'] == anova_numeric]
+        st.dataframe(
+            anova_table.style.format({'f_statistic': '{:.2f}', 'p_value': '{:.2e}', 'eta_squared': '{:.3f}'}),
+            width="stretch",
+            hide_index=True
+        )
+
+        def build_correlation_chart():
+            fig_corr = px.imshow(
+                results['correlation'],
+                color_continuous_scale='RdBu_r',
+                zmin=-1,
+                zmax=1,
+                text_auto='.2f',
+                aspect='auto',
+                title='Correlation Matrix (numeric columns and churn)'
+            )
+            return fig_corr
+        show_chart('correlation_matrix', {}, build_correlation_chart)
 
 with tab5:
-    st.subheader("📊 PowerBI Dashboard Integration")
+    if tab_runs(tab5):
+        statistics_view()
 
-    # PowerBI embed code
-    powerbi_embed_code = """
-    <iframe title="churn_crushers_dashboard" width="1140" height="541.25" 
-    src="https://app.powerbi.com/reportEmbed?reportId=ee6cc040-bbb3-4dcb-b472-fb5ce9e82201&autoAuth=true&ctid=c233c072-135b-431d-af59-35e05babf941" 
-    frameborder="0" allowFullScreen="true">
-    </iframe>
-    """
+with tab6:
+    if tab_runs(tab6):
+        with section('powerbi_dashboard'):
+            st.subheader("📊 PowerBI Dashboard Integration")
 
-    # Display the PowerBI dashboard
-    components.html(powerbi_embed_code, height=600, scrolling=True)
+            # PowerBI embed code
+            powerbi_embed_code = """
+            <iframe title="churn_crushers_dashboard" width="1140" height="541.25" 
+            src="https://app.powerbi.com/reportEmbed?reportId=ee6cc040-bbb3-4dcb-b472-fb5ce9e82201&autoAuth=true&ctid=c233c072-135b-431d-af59-35e05babf941" 
+            frameborder="0" allowFullScreen="true">
+            </iframe>
+            """
+
+            # Display the PowerBI dashboard
+            components.html(powerbi_embed_code, height=600, scrolling=True)
 
 
 # Segmentation Analysis
 st.header("🎯 Customer Segmentation")
 
-col1, col2 = st.columns(2)
+with section('customer_segmentation', sidebar_state):
+    col1, col2 = st.columns(2)
 
-with col1:
-    # Create risk segments based on multiple factors
-    conditions = [
-        # High risk conditions
-        (filtered_df['avg_utilization_ratio'] > 0.7) | 
-        (filtered_df['months_inactive_12_mon'] > 2) |
-        (filtered_df['no_of_products'] < 2) |
-        (filtered_df['total_trans_ct'] < 20),
-        
-        # Low risk conditions  
-        (filtered_df['avg_utilization_ratio'] < 0.3) & 
-        (filtered_df['months_inactive_12_mon'] < 2) &
-        (filtered_df['no_of_products'] > 2) &
-        (filtered_df['total_trans_ct'] > 40)
-    ]
-    
-    choices = ['High', 'Low']
-    filtered_df['risk_segment'] = np.select(conditions, choices, default='Medium')
-    
-    segment_counts = filtered_df['risk_segment'].value_counts()
-    fig_segment = px.pie(
-        values=segment_counts.values,
-        names=segment_counts.index,
-        title='Customer Risk Segmentation Distribution'
-    )
-    st.plotly_chart(fig_segment, use_container_width=True)
-
-with col2:
-    # Segment churn rates
-    segment_churn = filtered_df.groupby('risk_segment')['churn'].mean().reset_index()
-    fig_segment_churn = px.bar(
-        segment_churn,
-        x='risk_segment',
-        y='churn',
-        title='Churn Rate by Risk Segment',
-        color='churn',
-        color_continuous_scale='RdYlGn_r'
-    )
-    fig_segment_churn.update_layout(yaxis_title='Churn Rate', xaxis_title='Risk Segment')
-    st.plotly_chart(fig_segment_churn, use_container_width=True)
+    # Risk segments come from the cached per-customer codes, counted for the selection;
+    # in streaming mode the cube carries the segment as a dimension
+    segment_measures = ['churn', 'avg_utilization_ratio', 'no_of_products']
+    if streaming_mode:
+        segment_summary = cube_slice.group_summary('risk_segment', segment_measures)
+    elif churn_scores is not None:
+        # Expected churn is the mean model probability over the segment's customers
+        segment_summary = summarize_segments(
+            risk_codes, selection.rows, df,
+            measures=segment_measures + ['expected_churn'],
+            arrays={'expected_churn': churn_scores}
+        )
+    else:
+        segment_summary = summarize_segments(risk_codes, selection.rows, df, measures=segment_measures)
+
+    with col1:
+        def build_segment_chart():
+            segment_counts = segment_summary['count'].sort_values(ascending=False)
+            return px.pie(
+                values=segment_counts.values,
+                names=segment_counts.index,
+                title='Customer Risk Segmentation Distribution'
+            )
+        show_chart('risk_segment_pie', sidebar_state, build_segment_chart)
 
-# Additional segmentation insights
-st.subheader("Segmentation Insights")
-segmentation_col1, segmentation_col2, segmentation_col3 = st.columns(3)
+    with col2:
+        # Segment churn rates
+        def build_segment_churn_chart():
+            segment_churn = interval_table('risk_segment', segment_summary.sort_index()).reset_index()
+            fig_segment_churn = px.bar(
+                segment_churn,
+                x='risk_segment',
+                y='churn',
+                title='Churn Rate by Risk Segment',
+                color='churn',
+                color_continuous_scale='RdYlGn_r',
+                error_y='error_plus',
+                error_y_minus='error_minus'
+            )
+            fig_segment_churn.update_layout(yaxis_title='Churn Rate', xaxis_title='Risk Segment')
+            return fig_segment_churn
+        show_chart('risk_segment_churn', sidebar_state, build_segment_churn_chart)
+
+    # Additional segmentation insights
+    st.subheader("Segmentation Insights")
+    segmentation_col1, segmentation_col2, segmentation_col3 = st.columns(3)
+    segment_sizes = segment_summary['count'].reindex(SEGMENTS, fill_value=0)
 
-with segmentation_col1:
-    high_risk_count = len(filtered_df[filtered_df['risk_segment'] == 'High'])
-    st.metric("High Risk Customers", high_risk_count)
+    with segmentation_col1:
+        high_risk_count = int(segment_sizes['High'])
+        st.metric("High Risk Customers", high_risk_count)
 
-with segmentation_col2:
-    medium_risk_count = len(filtered_df[filtered_df['risk_segment'] == 'Medium'])
-    st.metric("Medium Risk Customers", medium_risk_count)
+    with segmentation_col2:
+        medium_risk_count = int(segment_sizes['Medium'])
+        st.metric("Medium Risk Customers", medium_risk_count)
+
+    with segmentation_col3:
+        low_risk_count = int(segment_sizes['Low'])
+        st.metric("Low Risk Customers", low_risk_count)
+    
+    if 'expected_churn' in segment_summary:
+        st.write(f"**Observed vs expected churn** (churn model v{churn_model.version})")
+        churn_comparison = pd.DataFrame({
+            'Customers': segment_summary['count'],
+            'Observed Churn': (segment_summary['churn'] * 100).map('{:.1f}%'.format),
+            'Expected Churn': (segment_summary['expected_churn'] * 100).map('{:.1f}%'.format),
+        }).reindex([s for s in reversed(SEGMENTS) if s in segment_summary.index]).rename_axis('Risk Segment')
+        st.dataframe(churn_comparison, width="stretch")
 
-with segmentation_col3:
-    low_risk_count = len(filtered_df[filtered_df['risk_segment'] == 'Low'])
-    st.metric("Low Risk Customers", low_risk_count)
+    st.subheader("📤 Export Customers")
+    if streaming_mode:
+        st.info("Exporting customers needs row-level data and is not available in streaming mode.")
+    else:
+        # The selection's bitmap outlives this rerun; its row positions are rebuilt on click and dropped again
+        def selection_rows():
+            rows = selection.rows
+            selection.release()
+            return rows
+        segment_download("segmentation_export", selection_rows, "filtered_customers")
 
 # Retention Strategies
 st.header("💡 Data-Driven Retention Strategies")
 
-strategy_tab1, strategy_tab2, strategy_tab3 = st.tabs(["High Risk", "Medium Risk", "Low Risk"])
+with section('retention_strategies', sidebar_state):
+    strategy_tab1, strategy_tab2, strategy_tab3 = st.tabs(["High Risk", "Medium Risk", "Low Risk"])
 
-with strategy_tab1:
-    st.subheader("🔴 High Risk Customers - Immediate Intervention")
-    st.markdown("""
-    **Characteristics:**
-    - High credit utilization (>70%)
-    - Extended account inactivity (>2 months) 
-    - Limited product engagement (≤2 products)
-    - Low transaction frequency
-    
-    **Retention Strategies:**
-    - **Immediate proactive outreach** by dedicated relationship managers
-    - **Personalized retention offers**: Fee waivers, rate reductions
-    - **Product bundle recommendations**: Cross-sell additional services
-    - **Credit limit increase considerations** for qualified customers
-    - **Loyalty program enrollment** with immediate benefits
-    - **Financial wellness programs** and counseling
-    """)
-    
-    # High risk statistics
-    high_risk_df = filtered_df[filtered_df['risk_segment'] == 'High']
-    if not high_risk_df.empty:
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.metric("High Risk Churn Rate", f"{high_risk_df['churn'].mean()*100:.1f}%")
-        with col2:
-            st.metric("Avg Utilization", f"{high_risk_df['avg_utilization_ratio'].mean()*100:.1f}%")
-        with col3:
-            st.metric("Avg Products", f"{high_risk_df['no_of_products'].mean():.1f}")
-
-with strategy_tab2:
-    st.subheader("🟡 Medium Risk Customers - Preventive Care")
-    st.markdown("""
-    **Characteristics:**
-    - Moderate utilization and activity levels
-    - Some product engagement but room for growth
-    - Occasional periods of lower activity
-    
-    **Retention Strategies:**
-    - **Regular engagement communications**: Monthly newsletters, product updates
-    - **Targeted cross-selling opportunities**: Based on usage patterns
-    - **Customer satisfaction surveys**: Identify pain points early
-    - **Educational content**: Product benefits, financial tips
-    - **Periodic account reviews**: Proactive service check-ins
-    - **Early warning system**: Monitor for risk factor changes
-    """)
-
-with strategy_tab3:
-    st.subheader("🟢 Low Risk Customers - Retention & Growth")
-    st.markdown("""
-    **Characteristics:**
-    - Healthy utilization patterns (<30%)
-    - Consistent account activity
-    - Multiple product relationships
-    - High transaction engagement
-    
-    **Growth Strategies:**
-    - **Upselling premium products**: Premium cards, investment services
-    - **Referral program invitations**: Leverage satisfaction for acquisition
-    - **Exclusive offers and benefits**: VIP treatment, early access
-    - **Relationship manager assignment**: Dedicated support
-    - **Long-term loyalty rewards**: Tiered benefits program
-    - **Wealth management services**: For high-value customers
-    """)
+    with strategy_tab1:
+        st.subheader("🔴 High Risk Customers - Immediate Intervention")
+        st.markdown("""
+        **Characteristics:**
+        - High credit utilization (>70%)
+        - Extended account inactivity (>2 months) 
+        - Limited product engagement (≤2 products)
+        - Low transaction frequency
+        
+        **Retention Strategies:**
+        - **Immediate proactive outreach** by dedicated relationship managers
+        - **Personalized retention offers**: Fee waivers, rate reductions
+        - **Product bundle recommendations**: Cross-sell additional services
+        - **Credit limit increase considerations** for qualified customers
+        - **Loyalty program enrollment** with immediate benefits
+        - **Financial wellness programs** and counseling
+        """)
+        
+        # High risk statistics
+        if 'High' in segment_summary.index:
+            high_risk = segment_summary.loc['High']
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("High Risk Churn Rate", f"{high_risk['churn']*100:.1f}%")
+            with col2:
+                st.metric("Avg Utilization", f"{high_risk['avg_utilization_ratio']*100:.1f}%")
+            with col3:
+                st.metric("Avg Products", f"{high_risk['no_of_products']:.1f}")
+
+    with strategy_tab2:
+        st.subheader("🟡 Medium Risk Customers - Preventive Care")
+        st.markdown("""
+        **Characteristics:**
+        - Moderate utilization and activity levels
+        - Some product engagement but room for growth
+        - Occasional periods of lower activity
+        
+        **Retention Strategies:**
+        - **Regular engagement communications**: Monthly newsletters, product updates
+        - **Targeted cross-selling opportunities**: Based on usage patterns
+        - **Customer satisfaction surveys**: Identify pain points early
+        - **Educational content**: Product benefits, financial tips
+        - **Periodic account reviews**: Proactive service check-ins
+        - **Early warning system**: Monitor for risk factor changes
+        """)
+
+    with strategy_tab3:
+        st.subheader("🟢 Low Risk Customers - Retention & Growth")
+        st.markdown("""
+        **Characteristics:**
+        - Healthy utilization patterns (<30%)
+        - Consistent account activity
+        - Multiple product relationships
+        - High transaction engagement
+        
+        **Growth Strategies:**
+        - **Upselling premium products**: Premium cards, investment services
+        - **Referral program invitations**: Leverage satisfaction for acquisition
+        - **Exclusive offers and benefits**: VIP treatment, early access
+        - **Relationship manager assignment**: Dedicated support
+        - **Long-term loyalty rewards**: Tiered benefits program
+        - **Wealth management services**: For high-value customers
+        """)
 
 # Data summary
 st.sidebar.markdown("---")
 st.sidebar.subheader("Dataset Summary")
-st.sidebar.write(f"Total Records: {len(df)}")
-st.sidebar.write(f"Churn Rate: {df['churn'].mean()*100:.1f}%")
-st.sidebar.write(f"Filtered Records: {len(filtered_df)}")
+st.sidebar.write(f"Total Records: {int(churn_cube.totals[0])}")
+st.sidebar.write(f"Churn Rate: {churn_cube.totals[1] / churn_cube.totals[0] * 100:.1f}%")
+st.sidebar.write(f"Filtered Records: {cube_slice.count}")
+
+cache_stats = figure_cache.stats()
+st.sidebar.caption(
+    f"Figure cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses, "
+    f"{cache_stats['entries']} figures ({cache_stats['bytes'] / 1e6:.1f} MB)"
+)
+
+# The selection's row positions are this rerun's largest temporary allocation
+rerun_memory = {'heap': 0, 'mapped': 0}
+if selection is not None:
+    rerun_memory['heap'] = selection.nbytes() - selection.bits.nbytes
+    selection.release()
+with st.sidebar.expander("🔁 Rerun counter"):
+    st.caption(
+        f"Rerun #{tracker.run_number}. Behavioral Patterns and Churn Calculator widgets rerun only their own tab "
+        "(logged here on the next full run); sidebar filters rerun every section."
+    )
+    st.dataframe(pd.DataFrame(tracker.summary_rows()), hide_index=True, width="stretch")
+    for run in reversed(tracker.runs):
+        changed = [entry['section'] for entry in run['sections'] if entry['inputs_changed']]
+        st.write(
+            f"#{run['run']} {run['kind']}: {len(run['sections'])} sections, "
+            f"inputs changed in {', '.join(changed) if changed else 'none'}"
+        )
 
+with st.sidebar.expander("🧮 Memory"):
+    shared_memory = footprint(stream_state if streaming_mode else customers)
+    # Session state plus the selection bitmap the Behavioral Patterns fragment keeps
+    session_memory = footprint(
+        st.session_state.to_dict(), selection, exclude=[] if streaming_mode else [customers, df]
+    )
+    st.dataframe(
+        readout(shared_memory, session_memory, rerun_memory).round(3), hide_index=True, width="stretch"
+    )
+    st.caption(
+        f"One more user adds about {session_memory['heap'] / 1e3:,.0f} KB. The memory-mapped "
+        f"{shared_memory['mapped'] / 1e6:,.1f} MB are shared by every process on this host; "
+        "heap structures once per server process."
+    )
+
+# The full run ends after the rerun counter and memory panels so their time counts; the profiler panel shows the finished run
+tracker.end_full_run()
+profiler.end_full_run()
+
+if profiling:
+    with st.sidebar.expander("⏱️ Profiler"):
+        last_run = profiler.runs[-1]
+        st.caption(f"Session {profiler.session_id}, last full run {last_run['total_ms']:.0f} ms")
+        st.dataframe(
+            pd.DataFrame(list(last_run['sections'].items()), columns=['section', 'ms']),
+            hide_index=True, width="stretch"
+        )
+        for loader, lookup in last_run['loaders'].items():
+            st.write(f"{loader}: {'cache hit' if lookup['hit'] else 'cache miss'} ({lookup['ms']:.1f} ms)")
+        st.dataframe(pd.DataFrame(last_run['charts']), hide_index=True, width="stretch")
+        st.write("**This session, p50 / p95**")
+        st.dataframe(profiler.session_percentiles().round(2), hide_index=True, width="stretch")
+        st.caption(f"Appending to {profile_log}")
+        for task, seconds in warm_up.seconds.items():
+            st.write(f"Background warm-up {task}: {seconds * 1000:.0f} ms")
+        for task, error in warm_up.failed.items():
+            st.write(f"Background warm-up {task} failed: {error}")
 
+if fast_start and not streaming_mode:
+    # The Statistics tab's tests run once this render is out rather than as part of it
+    warm_up.start(f'load_stat_tests {data_version}', load_stat_tests, df, data_version)
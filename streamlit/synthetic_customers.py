@@ -0,0 +1,245 @@
+"""Synthetic customers in the cleaned BankChurners schema, at any scale.
+
+``fit_model`` learns the structure of the cleaned table:
+
+- the churn rate;
+- per churn group, the card category marginal, the joint gender and income
+  marginal (income depends strongly on gender in this data), and the
+  education and marital status marginals;
+- per churn group and card category, a quantile function for every numeric
+  column, so credit limit follows the card and transaction counts follow
+  churn; strata with few customers fall back to the card category alone;
+- per churn group, the correlation of the numerics' normal scores, used as a
+  Gaussian copula so the numerics stay correlated with each other.
+
+The revolving balance is derived from the sampled utilization and credit
+limit, and the age bracket, utilization category and customer status from
+the sampled columns, exactly as the cleaning pipeline derives them.
+
+``generate_customers`` draws the rows in fixed-size chunks. Every chunk has
+its own seed derived from (seed, chunk index), so the output is identical
+for any number of workers. Workers write their chunks to part files, and the
+parent appends each part to the output as soon as it and every earlier part
+are done, while later chunks are still being drawn; a single worker writes
+its chunks straight into the output. No process holds more than one chunk.
+
+Usage:
+    python streamlit/synthetic_customers.py generate --rows N --output PATH [--workers N] [--seed N]
+    python streamlit/synthetic_customers.py compare PATH [--sample-rows N]
+"""
+import argparse
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr, ndtri
+
+from cleaning_pipeline import age_brackets, utilization_categories
+from data_snapshot import CLEANED_CSV
+
+DEFAULT_CHUNK_ROWS = 1_000_000
+DEFAULT_SEED = 0
+# Synthetic client numbers start above every real one
+CLIENTNUM_BASE = 900_000_000
+QUANTILE_POINTS = 1001
+# Churn and card strata smaller than this use the card category's quantiles
+MIN_STRATUM_ROWS = 30
+NUMERIC_COLUMNS = [
+    'age',
+    'dependencies',
+    'months_on_book',
+    'no_of_products',
+    'months_inactive_12_mon',
+    'contacts_count_12_mon',
+    'credit_limit',
+    'avg_utilization_ratio',
+    'total_trans_amt',
+    'total_trans_ct',
+]
+FLOAT_DECIMALS = {'credit_limit': 1, 'avg_utilization_ratio': 3}
+STATUSES = ['Existing Customer', 'Attrited Customer']
+
+
+def _marginal(series):
+    counts = series.value_counts(normalize=True).sort_index()
+    return {'values': counts.index.tolist(), 'p': counts.to_numpy().tolist()}
+
+
+def _quantiles(df):
+    probs = np.linspace(0, 1, QUANTILE_POINTS)
+    return {column: np.quantile(df[column].to_numpy(dtype=np.float64), probs) for column in NUMERIC_COLUMNS}
+
+
+def fit_model(df):
+    """Fit the generator's model to a cleaned customer table."""
+    churn = (df['customer_status'] == 'Attrited Customer').to_numpy()
+    model = {
+        'columns': df.columns.tolist(),
+        'integer_columns': [c for c in NUMERIC_COLUMNS if pd.api.types.is_integer_dtype(df[c])],
+        'churn_rate': float(churn.mean()),
+        'groups': {},
+        'card_quantiles': {card: _quantiles(group) for card, group in df.groupby('card_category')},
+    }
+    for label in (0, 1):
+        group = df[churn == label]
+        scores = np.column_stack([
+            # Normal scores of the mid-ranks; ties share a score
+            ndtri((group[column].rank(method='average').to_numpy() - 0.5) / len(group))
+            for column in NUMERIC_COLUMNS
+        ])
+        model['groups'][label] = {
+            'card_category': _marginal(group['card_category']),
+            'gender_income': _marginal(group['gender'] + '|' + group['income_category']),
+            'education_level': _marginal(group['education_level']),
+            'marital_status': _marginal(group['marital_status']),
+            'correlation': np.corrcoef(scores, rowvar=False),
+            'quantiles': {
+                card: _quantiles(stratum)
+                for card, stratum in group.groupby('card_category')
+                if len(stratum) >= MIN_STRATUM_ROWS
+            },
+        }
+    return model
+
+
+def _draw(rng, marginal, size):
+    values = np.asarray(marginal['values'], dtype=object)
+    return values[rng.choice(len(values), size=size, p=marginal['p'])]
+
+
+def generate_chunk(model, rows, seed=DEFAULT_SEED, chunk_index=0, first_id=0):
+    """Draw `rows` synthetic customers; the result depends only on (seed, chunk_index)."""
+    rng = np.random.default_rng([seed, chunk_index])
+    churn = (rng.random(rows) < model['churn_rate']).astype(np.int8)
+    data = {column: np.empty(rows, dtype=object) for column in
+            ['card_category', 'gender', 'income_category', 'education_level', 'marital_status']}
+    numeric = {column: np.empty(rows, dtype=np.float64) for column in NUMERIC_COLUMNS}
+    probs = np.linspace(0, 1, QUANTILE_POINTS)
+
+    for label in (0, 1):
+        group = model['groups'][label]
+        rows_in_group = np.flatnonzero(churn == label)
+        n = len(rows_in_group)
+        cards = _draw(rng, group['card_category'], n)
+        gender_income = _draw(rng, group['gender_income'], n).astype(str)
+        gender, income = np.char.partition(gender_income, '|')[:, [0, 2]].T
+        data['card_category'][rows_in_group] = cards
+        data['gender'][rows_in_group] = gender
+        data['income_category'][rows_in_group] = income
+        for column in ('education_level', 'marital_status'):
+            data[column][rows_in_group] = _draw(rng, group[column], n)
+
+        # Gaussian copula: correlated normals -> uniforms -> per-stratum quantiles
+        normals = rng.multivariate_normal(np.zeros(len(NUMERIC_COLUMNS)), group['correlation'], size=n,
+                                          method='eigh')
+        uniforms = ndtr(normals)
+        for card in np.unique(cards):
+            in_card = cards == card
+            quantiles = group['quantiles'].get(card, model['card_quantiles'][card])
+            for i, column in enumerate(NUMERIC_COLUMNS):
+                numeric[column][rows_in_group[in_card]] = np.interp(uniforms[in_card, i], probs, quantiles[column])
+
+    df = pd.DataFrame({'clientnum': CLIENTNUM_BASE + first_id + np.arange(rows, dtype=np.int64)})
+    df['customer_status'] = np.asarray(STATUSES, dtype=object)[churn]
+    for column in model['integer_columns']:
+        numeric[column] = np.rint(numeric[column]).astype(np.int64)
+    for column, decimals in FLOAT_DECIMALS.items():
+        numeric[column] = np.round(numeric[column], decimals)
+    # The balance is the utilization of the limit, so it never exceeds it
+    numeric['total_revolving_bal'] = np.rint(numeric['avg_utilization_ratio'] * numeric['credit_limit']).astype(np.int64)
+    numeric['avg_utilization_ratio'] = np.round(numeric['total_revolving_bal'] / numeric['credit_limit'], 3)
+    for column in model['columns']:
+        if column in numeric:
+            df[column] = numeric[column]
+        elif column in data:
+            df[column] = data[column]
+
+    df['age_bracket'] = age_brackets(df['age'])
+    df['utilization_cat'] = utilization_categories(df['avg_utilization_ratio'])
+    return df[model['columns']]
+
+
+def _write_part(model, part_path, rows, seed, chunk_index, first_id):
+    generate_chunk(model, rows, seed, chunk_index, first_id).to_csv(part_path, header=chunk_index == 0, index=False)
+    return rows
+
+
+def generate_customers(path, rows, source=CLEANED_CSV, seed=DEFAULT_SEED,
+                       chunk_rows=DEFAULT_CHUNK_ROWS, workers=None):
+    """Write `rows` synthetic customers fitted to `source` to the CSV at `path`."""
+    model = fit_model(pd.read_csv(source))
+    starts = list(range(0, rows, chunk_rows))
+    parts = [f'{path}.part-{i:05d}' for i in range(len(starts))]
+    tasks = [
+        (model, part, min(chunk_rows, rows - start), seed, i, start)
+        for i, (part, start) in enumerate(zip(parts, starts))
+    ]
+    try:
+        with open(path, 'wb') as out:
+            if workers == 1:
+                for model_, _, part_rows, part_seed, i, first_id in tasks:
+                    generate_chunk(model_, part_rows, part_seed, i, first_id).to_csv(out, header=i == 0, index=False)
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    futures = [pool.submit(_write_part, *task) for task in tasks]
+                    # Parts are appended in chunk order, each dropped as soon as it is copied
+                    for future, part in zip(futures, parts):
+                        future.result()
+                        with open(part, 'rb') as f:
+                            shutil.copyfileobj(f, out, 1 << 22)
+                        os.remove(part)
+    finally:
+        for part in parts:
+            if os.path.exists(part):
+                os.remove(part)
+    return path
+
+
+def describe_structure(df):
+    """Headline statistics the generator is meant to preserve."""
+    churn = df['customer_status'] == 'Attrited Customer'
+    structure = {'churn rate': churn.mean()}
+    for column in ('income_category', 'education_level', 'marital_status', 'card_category'):
+        for value, share in df[column].value_counts(normalize=True).sort_index().items():
+            structure[f'{column}={value}'] = share
+    for card, mean in df.groupby('card_category')['credit_limit'].mean().items():
+        structure[f'mean credit_limit | {card}'] = mean
+    for label, mean in df.groupby(churn)['total_trans_ct'].mean().items():
+        structure[f"mean total_trans_ct | {'churned' if label else 'existing'}"] = mean
+    structure['corr(total_trans_ct, total_trans_amt)'] = df['total_trans_ct'].corr(df['total_trans_amt'])
+    return pd.Series(structure)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['generate', 'compare'])
+    parser.add_argument('path', nargs='?', help='generated CSV to compare')
+    parser.add_argument('--source', default=CLEANED_CSV, help='cleaned CSV the model is fitted to')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='rows to generate')
+    parser.add_argument('--output', default='data/synthetic_customers.csv', help='CSV to write')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help='rows per chunk and part file')
+    parser.add_argument('--workers', type=int, help='worker processes (default: one per CPU)')
+    parser.add_argument('--sample-rows', type=int, default=1_000_000, help='generated rows read by compare')
+    args = parser.parse_args(argv)
+
+    if args.command == 'generate':
+        start = time.perf_counter()
+        generate_customers(args.output, args.rows, args.source, args.seed, args.chunk_rows, args.workers)
+        seconds = time.perf_counter() - start
+        print(f'Wrote {args.rows:,} rows to {args.output} in {seconds:.1f}s ({args.rows / seconds:,.0f} rows/s)')
+    else:
+        if not args.path:
+            parser.error('compare needs the generated CSV')
+        comparison = pd.DataFrame({
+            'source': describe_structure(pd.read_csv(args.source)),
+            'generated': describe_structure(pd.read_csv(args.path, nrows=args.sample_rows)),
+        })
+        print(comparison.round(3).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from batch_scoring import OUTPUT_COLUMNS, plan_ranges, score_file
+from churn_model import ChurnModel, latest_model_path
+from risk_segments import SEGMENTS, compile_rules
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models')
+
+
+@pytest.fixture(scope='module')
+def model_path():
+    path = latest_model_path(MODEL_DIR)
+    if path is None:
+        pytest.skip('no trained churn model in models/')
+    return path
+
+
+def test_ranges_cover_every_line_once(customers_csv):
+    names, ranges = plan_ranges(customers_csv, chunk_rows=300)
+    with open(customers_csv, 'rb') as f:
+        data = f.read()
+    assert names == data[:data.index(b'\n')].decode().split(',')
+    assert len(ranges) > 1
+    assert ranges[0][0] == data.index(b'\n') + 1 and ranges[-1][1] == len(data)
+    assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+    assert all(data[end - 1:end] == b'\n' for _, end in ranges)
+
+
+@pytest.mark.parametrize('extension', ['csv', 'parquet'])
+def test_scores_match_in_memory_scoring(customers_csv, customers, model_path, tmp_path, extension):
+    if extension == 'parquet':
+        pytest.importorskip('pyarrow')
+    output = str(tmp_path / f'scores.{extension}')
+    stats = score_file(customers_csv, output, workers=2, chunk_rows=300, model_path=model_path)
+    assert stats['rows'] == len(customers) and stats['chunks'] > 1
+
+    scores = pd.read_parquet(output) if extension == 'parquet' else pd.read_csv(output)
+    assert list(scores.columns) == OUTPUT_COLUMNS
+    assert np.array_equal(scores['clientnum'], customers['clientnum'])
+    assert list(scores['risk_segment']) == list(np.array(SEGMENTS)[compile_rules()(customers)])
+    expected = ChurnModel.load(model_path).score(customers)
+    assert np.allclose(scores['score'], expected, atol=1e-6)
+
+
+def test_without_model_scores_are_empty(customers_csv, customers, tmp_path):
+    output = str(tmp_path / 'scores.csv')
+    score_file(customers_csv, output, workers=1, chunk_rows=1000)
+    scores = pd.read_csv(output)
+    assert len(scores) == len(customers)
+    assert scores['score'].isna().all()
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from box_summary import summarize_counts, summarize_groups, summary_box_figure
+
+COLUMNS = ['avg_utilization_ratio', 'months_inactive_12_mon', 'total_trans_ct', 'no_of_products', 'credit_limit']
+
+
+def reference_box(values):
+    # The box px.box draws: linear quartiles, whiskers at the last points within 1.5 IQR
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    outside = values[(values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)]
+    return {
+        'count': len(values),
+        'q1': q1,
+        'median': median,
+        'q3': q3,
+        'lowerfence': inside.min(),
+        'upperfence': inside.max(),
+        'outliers': np.unique(outside).tolist(),
+    }
+
+
+def assert_same_box(summary, expected):
+    for field in ['q1', 'median', 'q3', 'lowerfence', 'upperfence']:
+        assert summary[field] == pytest.approx(expected[field]), field
+    assert summary['count'] == expected['count']
+    assert summary['outliers'] == pytest.approx(expected['outliers'])
+
+
+@pytest.mark.parametrize('column', COLUMNS)
+def test_group_summaries_match_percentiles(customers, column):
+    values, churn = customers[column].to_numpy(), customers['churn'].to_numpy()
+    summaries = summarize_groups(values, churn, max_outliers=len(values))
+    assert [summary['group'] for summary in summaries] == [0, 1]
+    for summary in summaries:
+        assert_same_box(summary, reference_box(values[churn == summary['group']]))
+
+
+@pytest.mark.parametrize('column', COLUMNS)
+def test_count_summaries_match_percentiles(customers, column):
+    values = customers[column].to_numpy()
+    distinct, counts = np.unique(values, return_counts=True)
+    summary = summarize_counts(1, distinct, counts, max_outliers=len(values))
+    assert summary['group'] == 1
+    assert_same_box(summary, reference_box(values))
+
+
+def test_outliers_are_capped():
+    values = np.concatenate([np.zeros(1000), np.arange(1, 301) * 100.0])
+    summary, = summarize_groups(values, np.zeros(len(values), dtype=int), max_outliers=50)
+    assert len(summary['outliers']) == 50
+    assert summary['outliers'] == sorted(summary['outliers'])
+
+
+def test_figure_has_a_box_and_outliers_per_group():
+    values = np.array([1.0, 2, 3, 4, 5, 100, 1, 2, 3])
+    groups = np.array([0, 0, 0, 0, 0, 0, 1, 1, 1])
+    figure = summary_box_figure(summarize_groups(values, groups), 'value', 'Value vs churn')
+    assert [trace.type for trace in figure.data] == ['box', 'scatter', 'box']
+    assert list(figure.data[1].y) == [100.0]
@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+from churn_cube import ChurnCube, check_parity
+from conftest import random_filters
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_slice_matches_pandas(customers, seed):
+    age_range, filters = random_filters(customers, np.random.default_rng(seed))
+    assert check_parity(customers, ChurnCube.from_frame(customers), age_range, filters) == []
+
+
+def test_unfiltered_slice_matches_pandas(customers):
+    age_range = (int(customers['age'].min()), int(customers['age'].max()))
+    assert check_parity(customers, ChurnCube.from_frame(customers), age_range, {}) == []
+
+
+def test_extended_matches_rebuilt_cube(customers):
+    half = len(customers) // 2
+    cube = ChurnCube.from_frame(customers.iloc[:half]).extended(customers.iloc[half:])
+    age_range, filters = random_filters(customers, np.random.default_rng(0))
+    assert check_parity(customers, cube, age_range, filters) == []
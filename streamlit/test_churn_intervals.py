@@ -0,0 +1,42 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from churn_intervals import bootstrap_interval, churn_intervals, wilson_interval
+
+
+@pytest.fixture(scope='module')
+def segments(customers):
+    # Churn counts of random subsets of the fixture customers
+    churn = customers['churn'].to_numpy()
+    rng = np.random.default_rng(0)
+    sizes = rng.integers(200, 1500, size=40)
+    churned = np.array([churn[rng.integers(0, len(churn), size)].sum() for size in sizes])
+    return churned, sizes
+
+
+def test_bootstrap_close_to_wilson(segments):
+    churned, sizes = segments
+    lows, highs = bootstrap_interval(churned, sizes)
+    wilson_lows, wilson_highs = wilson_interval(churned, sizes)
+    assert np.abs(lows - wilson_lows).max() < 0.015
+    assert np.abs(highs - wilson_highs).max() < 0.015
+    rates = churned / sizes
+    assert np.all((lows <= rates) & (rates <= highs))
+
+
+def test_bootstrap_same_with_pool(segments):
+    churned, sizes = segments
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        pooled = bootstrap_interval(churned, sizes, resamples=300, executor=executor)
+    inline = bootstrap_interval(churned, sizes, resamples=300)
+    assert np.array_equal(pooled[0], inline[0]) and np.array_equal(pooled[1], inline[1])
+
+
+def test_wilson_for_large_empty_and_degenerate_segments():
+    intervals = churn_intervals([0, 30, 100, 500, 0], [0, 30, 400, 5000, 50], max_bootstrap_rows=1000)
+    assert list(intervals['method']) == ['wilson', 'wilson', 'bootstrap', 'wilson', 'wilson']
+    assert np.isnan(intervals.loc[0, 'rate'])
+    assert intervals.loc[4, 'low'] == 0 and 0 < intervals.loc[4, 'high'] < 0.1
+    assert intervals.loc[1, 'low'] < 1 and intervals.loc[1, 'high'] == 1
@@ -0,0 +1,53 @@
+import filecmp
+import os
+
+import pandas as pd
+import pytest
+
+from cleaning_pipeline import CLEANED_FILE, SPLIT_FILES, age_brackets, run_pipeline, utilization_categories
+
+REPO = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+RAW_CSV = os.path.join(REPO, 'data', 'raw_data', 'BankChurners.csv')
+PUBLISHED_DIR = os.path.join(REPO, 'data', 'cleaned_data')
+OUTPUT_FILES = [CLEANED_FILE, *SPLIT_FILES.values()]
+
+
+@pytest.fixture
+def run(tmp_path):
+    def run(force=False):
+        report = run_pipeline(RAW_CSV, str(tmp_path / 'cleaned'), str(tmp_path / 'snapshot'),
+                              str(tmp_path / 'manifest.json'), force=force)
+        return {entry['stage']: entry['ran'] for entry in report}
+    run.out_dir = tmp_path / 'cleaned'
+    return run
+
+
+def test_outputs_match_published_files(run):
+    assert run() == {'clean': True, 'split': True, 'snapshot': True}
+    for file in OUTPUT_FILES:
+        assert filecmp.cmp(run.out_dir / file, os.path.join(PUBLISHED_DIR, file), shallow=False), file
+
+
+def test_unchanged_stages_are_skipped(run):
+    run()
+    assert run() == {'clean': False, 'split': False, 'snapshot': False}
+    for file in OUTPUT_FILES:
+        assert filecmp.cmp(run.out_dir / file, os.path.join(PUBLISHED_DIR, file), shallow=False), file
+
+
+def test_touched_output_reruns_its_stage(run):
+    run()
+    with open(run.out_dir / SPLIT_FILES['Attrited Customer'], 'a') as f:
+        f.write('\n')
+    assert run() == {'clean': False, 'split': True, 'snapshot': False}
+    assert filecmp.cmp(run.out_dir / SPLIT_FILES['Attrited Customer'],
+                       os.path.join(PUBLISHED_DIR, SPLIT_FILES['Attrited Customer']), shallow=False)
+    assert run(force=True) == {'clean': True, 'split': True, 'snapshot': True}
+
+
+def test_binning_edges():
+    brackets = age_brackets([26, 29, 30, 49, 50, 69, 70])
+    assert list(brackets[:6]) == ['20s', '20s', '30s', '40s', '50s', '60s']
+    assert pd.isna(brackets[6])
+    assert list(utilization_categories([0.0, 0.299, 0.3, 0.699, 0.7, 1.0])) == \
+        ['Low', 'Low', 'Medium', 'Medium', 'High', 'High']
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_snapshot import append_frame, load_customers, prepare_frame, read_csv_frame
+
+
+def assert_same_frame(actual, expected):
+    assert list(actual.columns) == list(expected.columns)
+    for column in expected.columns:
+        assert actual[column].astype(object).equals(expected[column].astype(object)), column
+        if isinstance(expected[column].dtype, pd.CategoricalDtype):
+            assert list(actual[column].cat.categories) == list(expected[column].cat.categories), column
+
+
+def test_snapshot_round_trip(customers_csv, tmp_path):
+    expected = read_csv_frame(customers_csv)
+    first = load_customers(customers_csv, str(tmp_path / 'snapshot'))
+    second = load_customers(customers_csv, str(tmp_path / 'snapshot'))
+    assert (first.attrs['source'], second.attrs['source']) == ('csv', 'snapshot')
+    assert first.attrs['data_version'] == second.attrs['data_version']
+    assert_same_frame(second, expected)
+
+
+def test_append_matches_whole_file(customers_csv):
+    raw = pd.read_csv(customers_csv)
+    # Rows sorted so the appended half brings categories the first half lacks
+    raw = raw.sort_values('income_category', kind='stable', ignore_index=True)
+    half = len(raw) // 2
+    appended = append_frame(prepare_frame(raw.iloc[:half]), prepare_frame(raw.iloc[half:]))
+    assert_same_frame(appended, prepare_frame(raw))
+
+
+@pytest.mark.parametrize('n_categories', [100, 300, 40_000])
+def test_append_keeps_codes_of_many_categories(n_categories):
+    values = np.array([f'v{i:05d}' for i in range(n_categories)], dtype=object)
+    old = pd.DataFrame({'label': pd.Categorical(values[::2])})
+    new = pd.DataFrame({'label': pd.Categorical(values[1::2])})
+    appended = append_frame(old, new)
+    assert list(appended['label']) == list(values[::2]) + list(values[1::2])
+    assert list(appended['label'].cat.categories) == sorted(values)
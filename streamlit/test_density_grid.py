@@ -0,0 +1,49 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from density_grid import DENSITY_COLUMNS, MAX_BINS, axis_edges, bin_counts, density_figure
+
+
+@pytest.mark.parametrize('x_column, y_column', list(itertools.combinations(DENSITY_COLUMNS, 2)))
+def test_bin_counts_match_histogram2d(customers, x_column, y_column):
+    x, y, churn = (customers[column].to_numpy() for column in (x_column, y_column, 'churn'))
+    x_edges, y_edges = axis_edges(x), axis_edges(y)
+    counts, churned = bin_counts(x, y, churn, x_edges, y_edges)
+    expected_counts, _, _ = np.histogram2d(x, y, bins=[x_edges, y_edges])
+    expected_churned, _, _ = np.histogram2d(x, y, bins=[x_edges, y_edges], weights=churn)
+    assert np.array_equal(counts, expected_counts)
+    assert np.array_equal(churned, expected_churned)
+
+
+@pytest.mark.parametrize('column', DENSITY_COLUMNS)
+def test_edges_span_the_column(customers, column):
+    values = customers[column].to_numpy()
+    edges = axis_edges(values)
+    assert len(edges) - 1 <= MAX_BINS
+    assert edges[0] <= values.min() and values.max() <= edges[-1]
+    if np.issubdtype(values.dtype, np.integer):
+        # Whole-number widths with edges halfway between values
+        assert np.all(np.diff(edges) == np.round(np.diff(edges)))
+        assert edges[0] == values.min() - 0.5
+
+
+def test_subset_counts_add_up(customers):
+    x, y, churn = (customers[column].to_numpy() for column in ('total_trans_ct', 'avg_utilization_ratio', 'churn'))
+    x_edges, y_edges = axis_edges(x), axis_edges(y)
+    rows = np.flatnonzero(customers['gender'].to_numpy() == 'F')
+    others = np.flatnonzero(customers['gender'].to_numpy() != 'F')
+    whole = bin_counts(x, y, churn, x_edges, y_edges)
+    first = bin_counts(x[rows], y[rows], churn[rows], x_edges, y_edges)
+    second = bin_counts(x[others], y[others], churn[others], x_edges, y_edges)
+    assert np.array_equal(whole[0], first[0] + second[0])
+    assert np.array_equal(whole[1], first[1] + second[1])
+
+
+def test_empty_segment_gives_empty_grid():
+    edges = np.linspace(0, 1, 5)
+    counts, churned = bin_counts(np.empty(0), np.empty(0), np.empty(0), edges, edges)
+    assert counts.shape == churned.shape == (4, 4) and counts.sum() == 0
+    figure = density_figure(edges, edges, counts, churned, 'x', 'y')
+    assert figure.data[0].type == 'heatmap'
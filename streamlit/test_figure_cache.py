@@ -0,0 +1,59 @@
+import numpy as np
+
+from figure_cache import FigureCache, normalize_state
+
+
+def test_least_recently_used_figure_evicted_first():
+    cache = FigureCache(max_bytes=30)
+    for key in 'abc':
+        cache.get_or_build(key, lambda: key * 10)
+    # Reading 'a' makes 'b' the least recently used
+    cache.get_or_build('a', lambda: 'unused')
+    cache.get_or_build('d', lambda: 'd' * 10)
+    assert cache.get_or_build('b', lambda: 'rebuilt') == 'rebuilt'
+    assert cache.get_or_build('a', lambda: 'rebuilt') == 'a' * 10
+    assert cache.stats()['evictions'] == 2
+
+
+def test_bytes_stay_within_bound():
+    cache = FigureCache(max_bytes=100)
+    for i in range(20):
+        cache.get_or_build(i, lambda: 'x' * 30)
+        assert cache.stats()['bytes'] <= 100
+    assert cache.stats() == {'entries': 3, 'bytes': 90, 'hits': 0, 'misses': 20, 'evictions': 17}
+
+
+def test_figure_larger_than_bound_is_returned_but_not_stored():
+    cache = FigureCache(max_bytes=10)
+    cache.get_or_build('small', lambda: 'x' * 5)
+    assert cache.get_or_build('large', lambda: 'y' * 11) == 'y' * 11
+    stats = cache.stats()
+    assert (stats['entries'], stats['bytes'], stats['evictions']) == (1, 5, 0)
+    assert cache.get_or_build('small', lambda: 'rebuilt') == 'x' * 5
+
+
+def test_hits_and_misses_counted():
+    cache = FigureCache()
+    builds = []
+    for _ in range(3):
+        cache.get_or_build('chart', lambda: builds.append(1) or '{}')
+    assert len(builds) == 1
+    assert (cache.stats()['hits'], cache.stats()['misses']) == (2, 1)
+
+
+def test_state_key_ignores_selection_and_key_order():
+    first = {'income': ['B', 'A'], 'age_range': (30, 40), 'cards': {'Gold', 'Blue'}}
+    second = {'cards': {'Blue', 'Gold'}, 'age_range': (30, 40), 'income': ['A', 'B']}
+    assert normalize_state(first) == normalize_state(second)
+    assert hash(normalize_state(first)) == hash(normalize_state(second))
+
+
+def test_state_key_unwraps_numpy_scalars():
+    assert normalize_state({'age_range': (np.int64(30), np.float32(40.5)), 'gender': np.str_('M')}) == \
+        normalize_state({'age_range': (30, 40.5), 'gender': 'M'})
+
+
+def test_state_key_keeps_range_order_and_nesting():
+    assert normalize_state({'age_range': (30, 40)}) != normalize_state({'age_range': (40, 30)})
+    nested = normalize_state({'filters': {'b': [2, 1], 'a': 1}})
+    assert nested == (('filters', (('a', 1), ('b', (1, 2)))),)
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from conftest import random_filters
+from filter_index import FilterIndex, pack_mask, popcount, unpack_bits
+
+
+def pandas_mask(df, age_range, filters):
+    # The boolean mask the dashboard built before the index
+    mask = df['age'].between(*age_range)
+    for column, values in filters.items():
+        mask &= df[column].isin(values)
+    return mask.to_numpy()
+
+
+def test_bits_round_trip():
+    mask = np.random.default_rng(0).random(1000) < 0.3
+    bits = pack_mask(mask)
+    assert np.array_equal(unpack_bits(bits, len(mask)), mask)
+    assert popcount(bits) == mask.sum()
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_selection_matches_boolean_mask(customers, seed):
+    age_range, filters = random_filters(customers, np.random.default_rng(seed))
+    selection = FilterIndex(customers).select(age_range, filters)
+    expected = np.flatnonzero(pandas_mask(customers, age_range, filters))
+    assert np.array_equal(selection.rows, expected)
+    assert len(selection) == len(expected)
+    assert selection.frame(['clientnum', 'churn']).equals(customers[['clientnum', 'churn']].iloc[expected])
+
+
+def test_extended_matches_rebuilt_index(customers):
+    half = len(customers) // 2
+    extended = FilterIndex(customers.iloc[:half]).extended(customers)
+    rebuilt = FilterIndex(customers)
+    age_range, filters = random_filters(customers, np.random.default_rng(0))
+    assert np.array_equal(extended.select(age_range, filters).rows, rebuilt.select(age_range, filters).rows)
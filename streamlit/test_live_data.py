@@ -0,0 +1,37 @@
+import shutil
+
+import pytest
+
+from live_data import LiveCustomers, _append_copies, check_parity
+
+
+@pytest.fixture
+def live(customers_csv, tmp_path):
+    # A private copy of the fixture CSV, since the tests append to it
+    csv_path = str(tmp_path / 'customers.csv')
+    shutil.copy(customers_csv, csv_path)
+    live = LiveCustomers(csv_path, str(tmp_path / 'snapshot'), check_seconds=None)
+    yield live
+    live.wait_shared()
+
+
+def test_appended_rows_match_full_reload(live):
+    rows = len(live.version.df)
+    _append_copies(live.path, 150, seed=1)
+    assert live.refresh() == 'appended'
+    assert len(live.version.df) == rows + 150
+    assert check_parity(live) == []
+
+
+def test_snapshot_published_after_append(live):
+    _append_copies(live.path, 20)
+    live.refresh()
+    live.wait_shared()
+    assert live.version.df.attrs.get('snapshot_dir') == live.snapshot_dir
+    assert check_parity(live) == []
+
+
+def test_unchanged_file_keeps_version(live):
+    version = live.version
+    assert live.refresh() == 'unchanged'
+    assert live.version is version
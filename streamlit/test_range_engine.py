@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from range_engine import CALCULATOR_COLUMNS, RangeEngine
+
+
+def random_ranges(engine, rng):
+    # Narrowed ranges on some calculator columns, whole ranges on the rest
+    ranges = {}
+    for column in CALCULATOR_COLUMNS:
+        low, high = engine.bounds(column)
+        if rng.random() < 0.4:
+            low, high = np.sort(rng.uniform(low, high, 2))
+        ranges[column] = (low, high)
+    return ranges
+
+
+def boolean_mask(df, ranges, gender):
+    mask = np.ones(len(df), dtype=bool)
+    for column, (low, high) in ranges.items():
+        mask &= df[column].between(low, high).to_numpy()
+    if gender is not None:
+        mask &= (df['gender'] == gender).to_numpy()
+    return mask
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_count_and_rows_match_boolean_mask(customers, seed):
+    engine = RangeEngine(customers)
+    ranges = random_ranges(engine, np.random.default_rng(seed))
+    gender = [None, 'M', 'F'][seed % 3]
+    mask = boolean_mask(customers, ranges, gender)
+    assert engine.count(ranges, gender) == (int(mask.sum()), int(customers['churn'].to_numpy()[mask].sum()))
+    assert np.array_equal(np.sort(engine.rows(ranges, gender)), np.flatnonzero(mask))
+
+
+def test_extended_matches_rebuilt_engine(customers):
+    half = len(customers) // 2
+    extended = RangeEngine(customers.iloc[:half]).extended(customers)
+    rebuilt = RangeEngine(customers)
+    for column in CALCULATOR_COLUMNS:
+        assert np.array_equal(extended.order[column], rebuilt.order[column])
+    assert extended.totals == rebuilt.totals
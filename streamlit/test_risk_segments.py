@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from risk_segments import RISK_RULES, SEGMENTS, compile_rules, summarize_segments
+
+
+def original_segments(df):
+    # The dashboard's risk segmentation before the rules became data
+    conditions = [
+        # High risk conditions
+        (df['avg_utilization_ratio'] > 0.7) |
+        (df['months_inactive_12_mon'] > 2) |
+        (df['no_of_products'] < 2) |
+        (df['total_trans_ct'] < 20),
+
+        # Low risk conditions
+        (df['avg_utilization_ratio'] < 0.3) &
+        (df['months_inactive_12_mon'] < 2) &
+        (df['no_of_products'] > 2) &
+        (df['total_trans_ct'] > 40)
+    ]
+    choices = ['High', 'Low']
+    return np.select(conditions, choices, default='Medium')
+
+
+def test_compiled_rules_match_original(customers):
+    codes = compile_rules()(customers)
+    assert codes.dtype == np.int8
+    assert np.array_equal(np.array(SEGMENTS)[codes], original_segments(customers))
+
+
+def test_compiled_rules_accept_column_arrays(customers):
+    arrays = {column: customers[column].to_numpy() for column in customers.columns}
+    assert np.array_equal(compile_rules()(arrays), compile_rules()(customers))
+
+
+def test_summary_matches_groupby(customers):
+    codes = compile_rules()(customers)
+    rows = np.flatnonzero(customers['gender'].to_numpy() == 'F')
+    summary = summarize_segments(codes, rows, customers)
+    expected = customers.iloc[rows].groupby(original_segments(customers)[rows])['churn'].agg(['count', 'mean'])
+    for segment, row in summary.iterrows():
+        assert row['count'] == expected.loc[segment, 'count']
+        assert row['churn'] == pytest.approx(expected.loc[segment, 'mean'])
+
+
+@pytest.mark.parametrize('change, message', [
+    ({'segment': 'Severe'}, 'unknown segment'),
+    ({'combine': 'either'}, 'combine must be'),
+    ({'conditions': [('total_trans_ct', '=>', 20)]}, 'unknown operator'),
+    ({'conditions': []}, 'no conditions'),
+])
+def test_invalid_rules_are_rejected(change, message):
+    with pytest.raises(ValueError, match=message):
+        compile_rules([RISK_RULES[0], dict(RISK_RULES[1], **change)])
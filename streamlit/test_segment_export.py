@@ -0,0 +1,63 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from risk_segments import SEGMENTS, compile_rules
+from segment_export import EXPORT_COLUMNS, export_file, write_export
+
+
+@pytest.fixture(scope='module')
+def arrays(customers):
+    # Per-customer arrays as the dashboard exports them next to the table columns
+    return {
+        'risk_segment': pd.Categorical.from_codes(compile_rules()(customers), categories=SEGMENTS),
+        'churn_score': np.linspace(0, 1, len(customers)),
+    }
+
+
+def expected_frame(df, rows, columns, arrays):
+    frame = df.take(rows).reset_index(drop=True)
+    for column, values in arrays.items():
+        frame[column] = values[rows]
+    return frame[columns]
+
+
+def exported(df, rows, columns, file_format, arrays=None, chunk_rows=64):
+    f = io.BytesIO()
+    assert write_export(f, df, rows, columns, file_format, chunk_rows, arrays) == len(rows)
+    return f.getvalue()
+
+
+SELECTIONS = {
+    'several chunks': lambda n: np.arange(0, n, 3),
+    'unsorted': lambda n: np.random.default_rng(0).permutation(n)[:500],
+    'one row': lambda n: np.array([7]),
+    'empty': lambda n: np.array([], dtype=np.intp),
+}
+
+
+@pytest.mark.parametrize('selection', list(SELECTIONS))
+def test_csv_matches_pandas(customers, arrays, selection):
+    rows = SELECTIONS[selection](len(customers))
+    columns = EXPORT_COLUMNS + list(arrays)
+    expected = expected_frame(customers, rows, columns, arrays).to_csv(index=False).encode()
+    assert exported(customers, rows, columns, 'csv', arrays) == expected
+
+
+@pytest.mark.parametrize('selection', list(SELECTIONS))
+def test_parquet_matches_pandas(customers, arrays, selection):
+    pytest.importorskip('pyarrow')
+    rows = SELECTIONS[selection](len(customers))
+    columns = EXPORT_COLUMNS + list(arrays)
+    expected = io.BytesIO()
+    expected_frame(customers, rows, columns, arrays).to_parquet(expected, index=False)
+    table = pd.read_parquet(io.BytesIO(exported(customers, rows, columns, 'parquet', arrays)))
+    pd.testing.assert_frame_equal(table, pd.read_parquet(expected))
+
+
+def test_export_file_holds_the_export(customers):
+    rows = np.arange(0, len(customers), 2)
+    with export_file(customers, rows, chunk_rows=100) as f:
+        assert f.read() == exported(customers, rows, EXPORT_COLUMNS, 'csv', chunk_rows=100)
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from range_engine import CALCULATOR_COLUMNS, RangeEngine
+from segment_sweep import engine_table, table_ranges
+
+
+@pytest.fixture(scope='module')
+def engine(customers):
+    return RangeEngine(customers)
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_sweep_matches_range_engine(engine, seed):
+    rng = np.random.default_rng(seed)
+    ranges = {}
+    for column in CALCULATOR_COLUMNS:
+        low, high = engine.bounds(column)
+        if rng.random() < 0.4:
+            low, high = np.sort(rng.uniform(low, high, 2))
+        ranges[column] = (low, high)
+    x, y = rng.choice(CALCULATOR_COLUMNS, 2, replace=False)
+    gender = [None, 'M', 'F'][seed % 3]
+    table = engine_table(engine, [x, y], table_ranges(engine, [x, y], ranges), gender)
+    # The grid cells partition the swept ranges, so they add up to the calculator's segment
+    labels, lows, highs = table.grid({x: ranges[x], y: ranges[y]})
+    sizes, churned = table.evaluate(lows, highs)
+    assert (int(sizes.sum()), int(churned.sum())) == engine.count(ranges, gender)
+    assert len(sizes) == len(labels[x]) * len(labels[y])
+
+
+def test_every_cell_matches_range_engine(engine):
+    table = engine_table(engine, ['months_inactive_12_mon', 'contacts_count_12_mon'])
+    labels, lows, highs = table.grid()
+    sizes, churned = table.evaluate(lows, highs)
+    cells = [(months, contacts) for months in labels['months_inactive_12_mon']
+             for contacts in labels['contacts_count_12_mon']]
+    for (months, contacts), size, churn in zip(cells, sizes, churned):
+        ranges = {'months_inactive_12_mon': months, 'contacts_count_12_mon': contacts}
+        assert (size, churn) == engine.count(ranges)
+
+
+def test_range_between_bins_gives_empty_grid(engine):
+    table = engine_table(engine, ['age', 'months_inactive_12_mon'])
+    labels, lows, highs = table.grid({'age': (40.2, 40.8)})
+    assert labels == {'age': [], 'months_inactive_12_mon': []}
+    assert lows.shape == highs.shape == (0, 2)
+    assert len(table.evaluate(lows, highs)[0]) == 0
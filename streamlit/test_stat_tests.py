@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from stat_tests import TEST_CATEGORICALS, TEST_NUMERICS, run_tests
+
+
+@pytest.fixture(scope='module')
+def results(customers):
+    return run_tests(customers, workers=4)
+
+
+@pytest.mark.parametrize('column', TEST_CATEGORICALS)
+def test_chi_square_matches_scipy(customers, results, column):
+    table = pd.crosstab(customers[column], customers['churn'])
+    statistic, p_value, dof, _ = stats.chi2_contingency(table, correction=False)
+    row = results['chi_square'].set_index('column').loc[column]
+    assert row['chi2'] == pytest.approx(statistic)
+    assert row['dof'] == dof
+    assert row['p_value'] == pytest.approx(p_value, rel=1e-6, abs=1e-300)
+    assert row['cramers_v'] == pytest.approx(np.sqrt(statistic / (table.to_numpy().sum() * (min(table.shape) - 1))))
+
+
+@pytest.mark.parametrize('column', TEST_CATEGORICALS)
+def test_anova_matches_scipy(customers, results, column):
+    anova = results['anova'].set_index(['categorical', 'numeric'])
+    for numeric in TEST_NUMERICS:
+        groups = [group.to_numpy(dtype=np.float64) for _, group in customers.groupby(column, observed=True)[numeric]]
+        f_statistic, p_value = stats.f_oneway(*groups)
+        row = anova.loc[(column, numeric)]
+        assert row['f_statistic'] == pytest.approx(f_statistic, rel=1e-6), numeric
+        assert row['p_value'] == pytest.approx(p_value, rel=1e-5, abs=1e-300), numeric
+
+
+def test_correlation_matches_pandas(customers, results):
+    columns = TEST_NUMERICS + ['churn']
+    expected = customers[columns].astype(np.float64).corr()
+    assert np.allclose(results['correlation'].to_numpy(), expected.to_numpy())
+
+
+def test_results_sorted_by_effect_size(results):
+    assert results['chi_square']['cramers_v'].is_monotonic_decreasing
+    assert results['anova']['eta_squared'].is_monotonic_decreasing
+    assert (results['chi_square']['significant'] == (results['chi_square']['p_value'] < 0.05)).all()
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from churn_cube import check_parity
+from conftest import random_filters
+from risk_segments import compile_rules, summarize_segments
+from streaming_aggregates import BOX_SKETCH_RESOLUTION, build_state
+
+
+@pytest.fixture(scope='module')
+def state(customers_csv):
+    # Several chunks, so folding them together is part of what is compared
+    return build_state(customers_csv, chunk_rows=300)
+
+
+def test_every_row_folded(state, customers):
+    assert state.rows == len(customers)
+    assert state.chunks == -(-len(customers) // 300)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_streamed_cube_matches_pandas(state, customers, seed):
+    age_range, filters = random_filters(customers, np.random.default_rng(seed))
+    assert check_parity(customers, state.cube, age_range, filters) == []
+
+
+def test_streamed_risk_segments_match_in_memory(state, customers):
+    age_range = (int(customers['age'].min()), int(customers['age'].max()))
+    measures = ['churn', 'no_of_products']
+    streamed = state.cube.slice(age_range, {}).group_summary('risk_segment', measures)
+    expected = summarize_segments(compile_rules()(customers), np.arange(len(customers)), customers, measures)
+    streamed = streamed.reindex(expected.index)
+    assert np.array_equal(streamed['count'], expected['count'])
+    assert np.allclose(streamed[measures], expected[measures])
+
+
+def test_chunking_does_not_change_the_state(state, customers_csv):
+    whole = build_state(customers_csv, chunk_rows=10_000)
+    assert np.allclose(whole.cube.totals, state.cube.totals)
+    assert whole.cube.n_cells == state.cube.n_cells
+    for key, sketch in whole.sketches.items():
+        assert np.array_equal(sketch.keys, state.sketches[key].keys)
+        assert np.array_equal(sketch.counts, state.sketches[key].counts)
+
+
+@pytest.mark.parametrize('column', list(BOX_SKETCH_RESOLUTION))
+def test_sketch_percentiles_match_numpy(state, customers, column):
+    values, churn = customers[column].to_numpy(), customers['churn'].to_numpy()
+    resolution = BOX_SKETCH_RESOLUTION[column]
+    summaries = state.box_summaries(column)
+    assert [summary['group'] for summary in summaries] == [0, 1]
+    for summary in summaries:
+        group_values = values[churn == summary['group']]
+        q1, median, q3 = np.percentile(group_values, [25, 50, 75])
+        assert summary['count'] == len(group_values)
+        assert summary['q1'] == pytest.approx(q1, abs=resolution / 2)
+        assert summary['median'] == pytest.approx(median, abs=resolution / 2)
+        assert summary['q3'] == pytest.approx(q3, abs=resolution / 2)
@@ -0,0 +1,63 @@
+"""Headless runs of the dashboard over the fixture customers."""
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from figure_cache import FigureCache
+from section_profiler import _loader_executions
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DASHBOARD = os.path.join(HERE, 'streamlit_dashboard.py')
+RUN_TIMEOUT = 120
+
+
+@pytest.fixture
+def run_dashboard(customers_csv, tmp_path, monkeypatch):
+    # The banner and model paths are relative to the repository root
+    monkeypatch.chdir(os.path.dirname(HERE))
+    monkeypatch.setenv('CHURN_CLEANED_CSV', customers_csv)
+    monkeypatch.setenv('CHURN_SNAPSHOT_DIR', str(tmp_path / 'snapshot'))
+    monkeypatch.setenv('CHURN_PROFILE_LOG', str(tmp_path / 'profile.jsonl'))
+    monkeypatch.setenv('CHURN_REFRESH_SECONDS', '0')
+
+    def run(**env):
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        app = AppTest.from_file(DASHBOARD, default_timeout=RUN_TIMEOUT)
+        app.run()
+        assert not app.exception, app.exception[0].value
+        return app
+
+    return run
+
+
+@pytest.mark.parametrize('env', [{}, {'CHURN_PROFILE': '1'}, {'CHURN_BOOTSTRAP_WORKERS': '2'}],
+                         ids=['default', 'profile', 'bootstrap'])
+def test_empty_filter_selection_renders_every_section(run_dashboard, env):
+    app = run_dashboard(**env)
+    app.sidebar.multiselect[0].set_value([]).run()
+    assert not app.exception, app.exception[0].value
+    subheaders = [subheader.value for subheader in app.subheader]
+    assert '🔴 High Risk Customers - Immediate Intervention' in subheaders
+    assert 'Dataset Summary' in subheaders
+    assert 'Filtered Records: 0' in [text.value for text in app.sidebar.markdown]
+    assert any('no box plots' in info.value for info in app.info)
+
+
+def test_streaming_mode_states_its_limits(run_dashboard):
+    app = run_dashboard(CHURN_DATA_MODE='streaming')
+    assert app.info[0].value.startswith('Streaming mode:')
+    assert any('sidebar filters do not apply' in caption.value for caption in app.caption)
+
+
+def test_intervals_are_bootstrapped_once_per_filter_state(run_dashboard, monkeypatch):
+    # Rebuild every figure, as after an eviction, so the charts ask for their intervals again
+    monkeypatch.setattr(FigureCache, 'get_or_build', lambda self, key, build_json: build_json())
+    app = run_dashboard()
+    executions = _loader_executions['load_intervals']
+    app.run()
+    assert _loader_executions['load_intervals'] == executions
+    app.sidebar.slider[0].set_value((30, 50)).run()
+    assert not app.exception, app.exception[0].value
+    assert _loader_executions['load_intervals'] > executions
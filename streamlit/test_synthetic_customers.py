@@ -0,0 +1,18 @@
+"""Synthetic customers are the same file for any worker count."""
+import os
+
+import pandas as pd
+
+from synthetic_customers import generate_customers
+
+ROWS = 2500
+CHUNK_ROWS = 700
+
+
+def test_output_does_not_depend_on_workers(customers_csv, tmp_path):
+    paths = [generate_customers(str(tmp_path / f'{workers}.csv'), ROWS, source=customers_csv,
+                                chunk_rows=CHUNK_ROWS, workers=workers) for workers in (1, 2)]
+    serial, parallel = (open(path, 'rb').read() for path in paths)
+    assert serial == parallel
+    assert len(pd.read_csv(paths[0])) == ROWS
+    assert sorted(os.listdir(tmp_path)) == ['1.csv', '2.csv']